@@ -0,0 +1,124 @@
+import logging
+import os.path
+from typing import Optional
+
+import numpy as np
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QWidget, QPushButton, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem
+
+from addons.lib.file_processing import FileResultCache
+from addons.lib.perceptual_hash import compute_hashes, find_duplicate_groups, DEFAULT_MAX_DISTANCE, \
+    HASH_PHASH
+from src.core.addon import Addon
+from src.core.addon_job import AddonJob
+from src.core.main_window import MainWindow
+from src.core.preview_loader import is_previewable
+
+HASH_CACHE_FILE = "perceptual_hashes.pickle"
+
+ADDON_INFO = {
+    "name": "Duplicate finder",
+    "description": "Finds near-duplicate images in the source and destination folders by their perceptual hashes. "
+                   "Requires numpy"
+}
+
+
+def search_duplicates(job: AddonJob, source_files: list, destination_folders: list, cache: FileResultCache,
+                      max_distance: int = DEFAULT_MAX_DISTANCE) -> list:
+    # Hashes the files in a process pool and groups them, runs as a job of the addon
+    file_paths = [file_path for file_path in source_files if is_previewable(file_path)]
+    for folder_path in destination_folders:
+        try:
+            with os.scandir(folder_path) as entries:
+                file_paths.extend(entry.path for entry in entries if is_previewable(entry.path))
+        except OSError as e:
+            logging.warning(f"Could not list {folder_path}: {e}")
+
+    hashes = compute_hashes(file_paths, HASH_PHASH, cache, progress_callback=job.set_progress,
+                            cancelled=job.get_cancel_event())
+    if job.is_cancelled():
+        return []
+    hashed_files = list(hashes)
+    groups = find_duplicate_groups(np.fromiter(hashes.values(), np.uint64, len(hashes)), max_distance)
+    return [[hashed_files[index] for index in group] for group in groups]
+
+
+class DuplicateFinder(Addon):
+    def __init__(self, context: MainWindow):
+        super().__init__(context)
+        self._addon_info = ADDON_INFO
+        self._context: MainWindow = context
+        self._addon_ui = QWidget()
+        self._search = None
+        self._cache = None
+
+    def _build_ui(self):
+        self.btFind = QPushButton()
+        self.btFind.setText("Find duplicates")
+        self.connect_traced(self.btFind.clicked, self._on_find)
+        self.lbStatus = QLabel()
+        self.twGroups = QTreeWidget()
+        self.twGroups.setHeaderHidden(True)
+        self.connect_traced(self.twGroups.itemActivated, self._on_file_activated)
+        vbox = QVBoxLayout()
+        vbox.addWidget(self.btFind)
+        vbox.addWidget(self.lbStatus)
+        vbox.addWidget(self.twGroups)
+        self._addon_ui.setLayout(vbox)
+
+    def _on_find(self):
+        if self._search is not None:
+            self._search.cancel()
+            return
+        if self._cache is None:
+            self._cache = FileResultCache(os.path.join(self._context.get_config_manager().get_config_folder_path(),
+                                                 HASH_CACHE_FILE))
+        file_manager = self._context.get_file_manager()
+        self._search = self.submit_job(search_duplicates, list(file_manager.get_all_files_in_current_source()),
+                                       list(file_manager.get_all_destinations()), self._cache,
+                                       on_finished=self._on_finished, on_progress=self._on_progress,
+                                       on_failed=self._on_failed)
+        self.btFind.setText("Cancel")
+
+    def _on_progress(self, n_done: int, n_total: int):
+        self.lbStatus.setText(f"Hashing {n_done}/{n_total}")
+
+    def _on_failed(self, error: str):
+        self._search = None
+        self.btFind.setText("Find duplicates")
+        self.lbStatus.setText(f"Search failed: {error}")
+
+    def _on_finished(self, groups: Optional[list]):
+        self._search = None
+        if groups is None:
+            groups = []
+        self.btFind.setText("Find duplicates")
+        self.lbStatus.setText(f"{len(groups)} groups of similar files")
+        self.twGroups.clear()
+        for group in sorted(groups, key=len, reverse=True):
+            group_item = QTreeWidgetItem([f"{len(group)} similar files"])
+            for file_path in sorted(group):
+                file_item = QTreeWidgetItem([os.path.basename(file_path)])
+                file_item.setToolTip(0, file_path)
+                file_item.setData(0, Qt.ItemDataRole.UserRole, file_path)
+                group_item.addChild(file_item)
+            self.twGroups.addTopLevelItem(group_item)
+        self.twGroups.expandAll()
+
+    def _on_file_activated(self, item: QTreeWidgetItem):
+        file_path = item.data(0, Qt.ItemDataRole.UserRole)
+        if file_path is None:
+            return
+        index = self._context.get_file_manager().get_index_of_file(file_path)
+        if index is None:
+            logging.info(f"{file_path} is not in the current source")
+            self.lbStatus.setText(f"{os.path.dirname(file_path)} is not the source")
+            return
+        self._context.set_current_file_index(index)
+
+    def init(self):
+        self._build_ui()
+        self._context.add_ui_to_addon_panel(self._addon_ui, self._addon_info)
+
+
+ADDON_CLASS = DuplicateFinder
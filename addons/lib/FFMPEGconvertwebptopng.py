@@ -1,7 +1,11 @@
 import subprocess
 import os
+import threading
 from typing import Optional
 
+# How often a running conversion checks whether it was cancelled, in seconds
+_CANCEL_POLL_INTERVAL = 0.1
+
 
 def pngify(filename: str):
     components = filename.split(".")
@@ -11,7 +15,8 @@ def pngify(filename: str):
         return filename
 
 
-def ffmpeg_conversion_from_webp_to_png(folder, filename, args=None) -> Optional[str]:
+def ffmpeg_conversion_from_webp_to_png(folder, filename, args=None,
+                                       cancelled: Optional[threading.Event] = None) -> Optional[str]:
     pngified = pngify(filename)
     if pngified == filename:
         return None
@@ -19,14 +24,25 @@ def ffmpeg_conversion_from_webp_to_png(folder, filename, args=None) -> Optional[
         "ffmpeg",
         "-i",
         os.path.join(folder, filename),
-        "-y",
+        # Never overwrites an existing png, ffmpeg fails instead
+        "-n",
         os.path.join(folder, pngified)
     ]
-    try:
-        subprocess.run(command, check=True)
-    except subprocess.CalledProcessError as er:
-        print(er.output)
-        return
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    while True:
+        try:
+            output = process.communicate(timeout=_CANCEL_POLL_INTERVAL)[0]
+            break
+        except subprocess.TimeoutExpired:
+            if cancelled is not None and cancelled.is_set():
+                process.kill()
+                process.communicate()
+                if os.path.exists(os.path.join(folder, pngified)):
+                    os.remove(os.path.join(folder, pngified))
+                return None
+    if process.returncode != 0:
+        print(output.decode(errors="replace"))
+        return None
 
     os.remove(f"{os.path.join(folder, filename)}")
     return os.path.join(folder, pngified)
@@ -0,0 +1,108 @@
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Optional
+
+# Files are sent to the worker processes in chunks, one file per task costs more in pickling than in processing
+CHUNK_SIZE = 256
+# Below this many files starting worker processes takes longer than processing them in this one
+MIN_FILES_FOR_PROCESSES = 64
+
+
+class FileResultCache:
+    # Results by path, reused as long as the size and modification time of the file are the same
+    def __init__(self, file_path: Optional[str] = None):
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._results: dict[str, tuple] = {}
+        self._changed = False
+        if file_path is not None and os.path.exists(file_path):
+            try:
+                with open(file_path, "rb") as cache_file:
+                    self._results = pickle.load(cache_file)
+            except Exception as e:
+                logging.warning(f"Could not read the cache {file_path}: {e}")
+
+    def get(self, file_path: str, stat: os.stat_result) -> Any:
+        cached = self._results.get(file_path)
+        if cached is None or cached[0] != stat.st_mtime or cached[1] != stat.st_size:
+            return None
+        return cached[2]
+
+    def put(self, file_path: str, stat: os.stat_result, result: Any):
+        with self._lock:
+            self._results[file_path] = (stat.st_mtime, stat.st_size, result)
+            self._changed = True
+
+    def save(self):
+        if self._file_path is None or not self._changed:
+            return
+        with self._lock:
+            temporary_path = self._file_path + ".tmp"
+            with open(temporary_path, "wb") as cache_file:
+                pickle.dump(self._results, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self._file_path)
+            self._changed = False
+
+
+def process_files(file_paths: list, worker: Callable[..., list], worker_args: tuple = (),
+                  cache: Optional[FileResultCache] = None, n_processes: Optional[int] = None,
+                  progress_callback: Optional[Callable[[int, int], None]] = None,
+                  cancelled: Optional[threading.Event] = None, chunk_size: int = CHUNK_SIZE) -> dict:
+    # Calls worker(chunk_of_file_paths, *worker_args) on all CPU cores, it has to return one result per file,
+    # None for files it could not process. Returns file path -> result, cached results are reused.
+    results = {}
+    to_process = []
+    stats = {}
+    for file_path in file_paths:
+        try:
+            stats[file_path] = os.stat(file_path)
+        except OSError:
+            continue
+        cached_result = cache.get(file_path, stats[file_path]) if cache is not None else None
+        if cached_result is None:
+            to_process.append(file_path)
+        else:
+            results[file_path] = cached_result
+
+    n_done = len(results)
+    n_total = len(stats)
+    if progress_callback is not None:
+        progress_callback(n_done, n_total)
+
+    def add_results(chunk: list, chunk_results: list):
+        nonlocal n_done
+        for file_path, result in zip(chunk, chunk_results):
+            if result is not None:
+                results[file_path] = result
+                if cache is not None:
+                    cache.put(file_path, stats[file_path], result)
+        n_done += len(chunk)
+        if progress_callback is not None:
+            progress_callback(n_done, n_total)
+
+    chunks = [to_process[start:start + chunk_size] for start in range(0, len(to_process), chunk_size)]
+    if len(to_process) < MIN_FILES_FOR_PROCESSES:
+        for chunk in chunks:
+            if cancelled is not None and cancelled.is_set():
+                break
+            add_results(chunk, worker(chunk, *worker_args))
+    else:
+        # Spawned instead of forked, forking a process that runs Qt threads is not safe
+        with ProcessPoolExecutor(n_processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(worker, chunk, *worker_args): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                # Chunks that were already running when cancelled still finish, their results are kept
+                if future.cancelled():
+                    continue
+                add_results(futures[future], future.result())
+                if cancelled is not None and cancelled.is_set():
+                    for pending_future in futures:
+                        pending_future.cancel()
+
+    if cache is not None:
+        cache.save()
+    return results
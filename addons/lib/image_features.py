@@ -0,0 +1,123 @@
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Optional
+
+import numpy as np
+
+from addons.lib.file_processing import FileResultCache, process_files
+from addons.lib.pixels import load_pixels
+
+HISTOGRAM_BINS = 4
+LAYOUT_SIZE = 4
+DEFAULT_CLUSTER_SIZE = 50
+DEFAULT_ITERATIONS = 10
+# Destinations are suggested by this many of the closest already sorted files
+SUGGESTION_NEIGHBOURS = 5
+_FEATURE_IMAGE_SIZE = 32
+# Distances to the centroids are computed for this many files at a time
+_DISTANCE_CHUNK_SIZE = 4096
+
+
+def compute_features(file_path: str) -> Optional[np.ndarray]:
+    # A colour histogram and a tiny version of the image, both scaled to a length of about one
+    pixels = load_pixels(file_path, _FEATURE_IMAGE_SIZE, _FEATURE_IMAGE_SIZE, grayscale=False)
+    if pixels is None:
+        return None
+    bins = np.minimum((pixels * (HISTOGRAM_BINS / 256)).astype(np.int64), HISTOGRAM_BINS - 1)
+    bin_indexes = (bins[:, :, 0] * HISTOGRAM_BINS + bins[:, :, 1]) * HISTOGRAM_BINS + bins[:, :, 2]
+    histogram = np.bincount(bin_indexes.ravel(), minlength=HISTOGRAM_BINS ** 3) / bin_indexes.size
+    block_size = _FEATURE_IMAGE_SIZE // LAYOUT_SIZE
+    layout = pixels.reshape(LAYOUT_SIZE, block_size, LAYOUT_SIZE, block_size, 3).mean(axis=(1, 3)).ravel() / 255
+    return np.concatenate([np.sqrt(histogram), layout / np.sqrt(layout.size)]).astype(np.float32)
+
+
+def _compute_features_of_files(file_paths: list) -> list:
+    # Runs in the worker processes
+    features = []
+    for file_path in file_paths:
+        try:
+            features.append(compute_features(file_path))
+        except Exception as e:
+            logging.warning(f"Could not read {file_path}: {e}")
+            features.append(None)
+    return features
+
+
+def compute_all_features(file_paths: list, cache: Optional[FileResultCache] = None,
+                         n_processes: Optional[int] = None,
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         cancelled: Optional[threading.Event] = None) -> dict:
+    # Returns file path -> feature vector, files that can't be decoded are left out
+    return process_files(file_paths, _compute_features_of_files, (), cache, n_processes, progress_callback,
+                         cancelled)
+
+
+def _get_squared_distances(features: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.maximum((features ** 2).sum(axis=1)[:, None] - 2 * features @ centroids.T +
+                      (centroids ** 2).sum(axis=1)[None, :], 0)
+
+
+def _get_nearest_centroids(features: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # The squared length of the features is the same for every centroid, so it's left out
+    labels = np.empty(len(features), dtype=np.int64)
+    centroid_lengths = (centroids ** 2).sum(axis=1)
+    for start in range(0, len(features), _DISTANCE_CHUNK_SIZE):
+        chunk = features[start:start + _DISTANCE_CHUNK_SIZE]
+        labels[start:start + len(chunk)] = (centroid_lengths - 2 * (chunk @ centroids.T)).argmin(axis=1)
+    return labels
+
+
+def _choose_initial_centroids(features: np.ndarray, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    # k-means++, files far from the centroids chosen so far are more likely to become the next one.
+    # Fewer centroids are returned when there are fewer distinct files.
+    lengths = (features ** 2).sum(axis=1)
+    chosen = [rng.integers(len(features))]
+    closest_distances = np.maximum(lengths - 2 * (features @ features[chosen[0]]) + lengths[chosen[0]], 0)
+    for cluster in range(1, n_clusters):
+        cumulative_distances = np.cumsum(closest_distances)
+        if cumulative_distances[-1] <= 0:
+            break
+        chosen.append(min(int(np.searchsorted(cumulative_distances, rng.random() * cumulative_distances[-1],
+                                              side="right")), len(features) - 1))
+        closest_distances = np.minimum(closest_distances, np.maximum(
+            lengths - 2 * (features @ features[chosen[-1]]) + lengths[chosen[-1]], 0))
+    return features[chosen].copy()
+
+
+def cluster_features(features: np.ndarray, n_clusters: int, n_iterations: int = DEFAULT_ITERATIONS,
+                     seed: int = 0) -> tuple:
+    # k-means, returns the cluster of every row and the centroids of the clusters
+    features = np.asarray(features, dtype=np.float32)
+    n_clusters = max(1, min(n_clusters, len(features)))
+    centroids = _choose_initial_centroids(features, n_clusters, np.random.default_rng(seed))
+    n_clusters = len(centroids)
+    labels = None
+    for iteration in range(n_iterations):
+        new_labels = _get_nearest_centroids(features, centroids)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.stack([np.bincount(labels, weights=features[:, dimension], minlength=n_clusters)
+                         for dimension in range(features.shape[1])], axis=1)
+        # Clusters that lost all their files keep their centroid
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+    return labels, centroids
+
+
+def suggest_destinations(centroids: np.ndarray, sorted_features: np.ndarray, sorted_destinations: list,
+                         n_neighbours: int = SUGGESTION_NEIGHBOURS) -> list:
+    # The destination most of the closest already sorted files went to, None without any sorted files
+    if len(sorted_destinations) == 0:
+        return [None] * len(centroids)
+    n_neighbours = min(n_neighbours, len(sorted_destinations))
+    distances = _get_squared_distances(np.asarray(centroids, dtype=np.float32),
+                                       np.asarray(sorted_features, dtype=np.float32))
+    nearest = np.argpartition(distances, n_neighbours - 1, axis=1)[:, :n_neighbours]
+    suggestions = []
+    for neighbours in nearest:
+        votes = Counter(sorted_destinations[neighbour] for neighbour in neighbours)
+        suggestions.append(votes.most_common(1)[0][0])
+    return suggestions
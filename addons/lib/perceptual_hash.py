@@ -0,0 +1,119 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+from addons.lib.file_processing import FileResultCache, process_files
+from addons.lib.pixels import load_pixels
+
+HASH_DHASH = "dhash"
+HASH_PHASH = "phash"
+DEFAULT_MAX_DISTANCE = 4
+# Pairwise distances inside a bucket are computed in blocks of about this many elements
+_DISTANCE_BLOCK_ELEMENTS = 1 << 22
+_PHASH_SIZE = 32
+
+
+def _bits_to_hash(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _get_dct_matrix(size: int) -> np.ndarray:
+    rows, columns = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+    matrix = np.cos(np.pi * (2 * columns + 1) * rows / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+_DCT_MATRIX = _get_dct_matrix(_PHASH_SIZE)
+
+
+def compute_hash(file_path: str, method: str = HASH_PHASH) -> Optional[int]:
+    # 64 bit hashes, similar images differ in few bits
+    if method == HASH_DHASH:
+        pixels = load_pixels(file_path, 9, 8)
+        if pixels is None:
+            return None
+        return _bits_to_hash(pixels[:, 1:] > pixels[:, :-1])
+    elif method == HASH_PHASH:
+        pixels = load_pixels(file_path, _PHASH_SIZE, _PHASH_SIZE)
+        if pixels is None:
+            return None
+        low_frequencies = (_DCT_MATRIX @ pixels @ _DCT_MATRIX.T)[:8, :8].ravel()
+        return _bits_to_hash(low_frequencies > np.median(low_frequencies[1:]))
+    raise Exception(f"Unknown hash method {method}")
+
+
+def _hash_files(file_paths: list, method: str) -> list:
+    # Runs in the worker processes
+    hashes = []
+    for file_path in file_paths:
+        try:
+            hashes.append(compute_hash(file_path, method))
+        except Exception as e:
+            logging.warning(f"Could not hash {file_path}: {e}")
+            hashes.append(None)
+    return hashes
+
+
+def compute_hashes(file_paths: list, method: str = HASH_PHASH, cache: Optional[FileResultCache] = None,
+                   n_processes: Optional[int] = None,
+                   progress_callback: Optional[Callable[[int, int], None]] = None,
+                   cancelled: Optional[threading.Event] = None) -> dict:
+    # Returns file path -> hash, files that can't be decoded are left out
+    return process_files(file_paths, _hash_files, (method,), cache, n_processes, progress_callback, cancelled)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(*values.shape, 8), axis=-1).sum(axis=-1)
+
+
+def _find_close_pairs(hashes: np.ndarray, indexes: np.ndarray, max_distance: int) -> list:
+    pairs = []
+    bucket_hashes = hashes[indexes]
+    block_size = max(1, _DISTANCE_BLOCK_ELEMENTS // len(indexes))
+    for start in range(0, len(indexes), block_size):
+        block = bucket_hashes[start:start + block_size]
+        distances = _popcount(block[:, None] ^ bucket_hashes[None, :])
+        rows, columns = np.nonzero(distances <= max_distance)
+        # Every pair once
+        upper = columns > rows + start
+        pairs.extend(zip(indexes[rows[upper] + start].tolist(), indexes[columns[upper]].tolist()))
+    return pairs
+
+
+def find_duplicate_groups(hashes: np.ndarray, max_distance: int = DEFAULT_MAX_DISTANCE) -> list:
+    # Groups the indexes of hashes that are at most max_distance bits apart, directly or through others.
+    # If two hashes differ in at most max_distance bits, at least one of max_distance + 1 bands of the
+    # hash is equal in both, so only hashes that share a band are compared.
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    n_bands = min(max_distance + 1, 64)
+    band_edges = np.linspace(0, 64, n_bands + 1).astype(int)
+
+    parents = list(range(len(hashes)))
+
+    def find(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for band_start, band_end in zip(band_edges[:-1], band_edges[1:]):
+        band_mask = np.uint64((1 << int(band_end - band_start)) - 1)
+        band_values = (hashes >> np.uint64(band_start)) & band_mask
+        order = np.argsort(band_values, kind="stable")
+        bucket_edges = np.concatenate(([0], np.flatnonzero(np.diff(band_values[order])) + 1, [len(order)]))
+        shared = np.diff(bucket_edges) > 1
+        for bucket_start, bucket_end in zip(bucket_edges[:-1][shared], bucket_edges[1:][shared]):
+            for first, second in _find_close_pairs(hashes, order[bucket_start:bucket_end], max_distance):
+                first_root, second_root = find(first), find(second)
+                if first_root != second_root:
+                    parents[max(first_root, second_root)] = min(first_root, second_root)
+
+    groups = {}
+    for index in range(len(hashes)):
+        groups.setdefault(find(index), []).append(index)
+    return [group for group in groups.values() if len(group) > 1]
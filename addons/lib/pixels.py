@@ -0,0 +1,31 @@
+from typing import Optional
+
+import numpy as np
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage, QImageReader
+
+_OVERSAMPLING = 4
+# Decoding at a reduced scale keeps JPEG on the fast integer DCT path
+_DECODE_QUALITY = 40
+
+
+def load_pixels(file_path: str, width: int, height: int, grayscale: bool = True) -> Optional[np.ndarray]:
+    # Decoded a few times larger than needed and averaged down, plain scaling to a handful of pixels
+    # samples too few of them and small changes to the image change the result a lot.
+    # Returns an array of height x width, or height x width x 3 for RGB, with values from 0 to 255.
+    decode_width, decode_height = width * _OVERSAMPLING, height * _OVERSAMPLING
+    reader = QImageReader(file_path)
+    reader.setScaledSize(QSize(decode_width, decode_height))
+    reader.setQuality(_DECODE_QUALITY)
+    image = reader.read()
+    if image.isNull():
+        return None
+    image = image.convertToFormat(QImage.Format.Format_Grayscale8 if grayscale else QImage.Format.Format_RGB888)
+    if image.width() != decode_width or image.height() != decode_height:
+        image = image.scaled(decode_width, decode_height, Qt.AspectRatioMode.IgnoreAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    channels = 1 if grayscale else 3
+    pixels = np.frombuffer(image.constBits(), np.uint8, count=image.bytesPerLine() * decode_height)
+    pixels = pixels.reshape(decode_height, image.bytesPerLine())[:, :decode_width * channels].astype(np.float32)
+    pixels = pixels.reshape(height, _OVERSAMPLING, width, _OVERSAMPLING, channels).mean(axis=(1, 3))
+    return pixels[:, :, 0] if grayscale else pixels
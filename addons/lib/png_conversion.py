@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QImageReader, QImageWriter
+
+from addons.lib.FFMPEGconvertwebptopng import ffmpeg_conversion_from_webp_to_png, pngify
+from addons.lib.file_processing import process_files
+
+# Decoding and encoding a large image takes far longer than pickling its path, small chunks keep all cores busy
+CONVERSION_CHUNK_SIZE = 4
+
+
+def get_png_path(file_path: str) -> str:
+    folder, filename = os.path.split(file_path)
+    return os.path.join(folder, pngify(filename))
+
+
+def convert_to_png(file_path: str, cancelled: Optional[threading.Event] = None) -> Optional[str]:
+    # Decoded and encoded in this process, ffmpeg is only started for files Qt can't decode.
+    # Replaces the file with the png and returns its path, None if it was not converted.
+    # An existing png of the same name is never replaced, the file is not converted then.
+    folder, filename = os.path.split(file_path)
+    png_path = get_png_path(file_path)
+    if png_path == file_path:
+        return None
+    if os.path.lexists(png_path):
+        logging.info(f"{png_path} already exists, {file_path} is not converted")
+        return None
+    reader = QImageReader(file_path)
+    if reader.supportsAnimation() and reader.imageCount() > 1:
+        logging.info(f"{file_path} is animated, only a still image can be stored as png")
+        return None
+    image = reader.read()
+    if image.isNull():
+        return ffmpeg_conversion_from_webp_to_png(folder, filename, cancelled=cancelled)
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    writer = QImageWriter(buffer, b"png")
+    if not writer.write(image):
+        logging.warning(f"Could not encode {file_path}: {writer.errorString()}")
+        return None
+    buffer.close()
+    # Written directly under the final name, a temporary file would show up in the source while it exists.
+    # Fails if a png of that name appeared in the meantime, only a png created here is removed again.
+    try:
+        png_file = open(png_path, "xb")
+    except FileExistsError:
+        logging.info(f"{png_path} already exists, {file_path} is not converted")
+        return None
+    try:
+        with png_file:
+            png_file.write(data.data())
+    except BaseException:
+        os.remove(png_path)
+        raise
+    os.remove(file_path)
+    return png_path
+
+
+def _convert_files(file_paths: list) -> list:
+    # Runs in the worker processes
+    converted_files = []
+    for file_path in file_paths:
+        try:
+            converted_files.append(convert_to_png(file_path))
+        except Exception as e:
+            logging.warning(f"Could not convert {file_path}: {e}")
+            converted_files.append(None)
+    return converted_files
+
+
+def convert_all_to_png(file_paths: list, n_processes: Optional[int] = None,
+                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                       cancelled: Optional[threading.Event] = None) -> dict:
+    # Converts the files on all CPU cores, returns old path -> png path of the converted files
+    return process_files(file_paths, _convert_files, (), None, n_processes, progress_callback, cancelled,
+                         CONVERSION_CHUNK_SIZE)
@@ -0,0 +1,190 @@
+import logging
+import math
+import os.path
+import random
+from typing import Optional
+
+import numpy as np
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QWidget, QPushButton, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem, QComboBox
+
+from addons.lib.file_processing import FileResultCache
+from addons.lib.image_features import compute_all_features, cluster_features, suggest_destinations, \
+    DEFAULT_CLUSTER_SIZE
+from src.core.addon import Addon
+from src.core.addon_job import AddonJob
+from src.core.main_window import MainWindow
+from src.core.preview_loader import is_previewable
+
+FEATURE_CACHE_FILE = "image_features.pickle"
+# Files already in a destination folder that are used to suggest it
+DESTINATION_SAMPLE_SIZE = 100
+
+ADDON_INFO = {
+    "name": "Similarity clusters",
+    "description": "Groups similar images of the source and suggests a destination for every group based on the "
+                   "files that are already sorted. Requires numpy"
+}
+
+
+def search_clusters(job: AddonJob, unsorted_files: list, sorted_files: dict, destination_folders: list,
+                    cache: FileResultCache, cluster_size: int = DEFAULT_CLUSTER_SIZE) -> list:
+    # Computes the features in a process pool and clusters them, runs as a job of the addon. Returns a list
+    # of (file paths, suggested destination), largest clusters first.
+
+    # Files already sorted, the ones assigned in this session and a sample of the destination folders
+    reference_files = {file_path: folder_path for file_path, folder_path in sorted_files.items()
+                       if is_previewable(file_path)}
+    for folder_path in destination_folders:
+        try:
+            with os.scandir(folder_path) as entries:
+                folder_files = [entry.path for entry in entries if is_previewable(entry.path)]
+        except OSError as e:
+            logging.warning(f"Could not list {folder_path}: {e}")
+            continue
+        for file_path in random.sample(folder_files, min(len(folder_files), DESTINATION_SAMPLE_SIZE)):
+            reference_files[file_path] = folder_path
+
+    unsorted_files = [file_path for file_path in unsorted_files if is_previewable(file_path)]
+    features = compute_all_features(unsorted_files + list(reference_files), cache,
+                                    progress_callback=job.set_progress, cancelled=job.get_cancel_event())
+    unsorted_files = [file_path for file_path in unsorted_files if file_path in features]
+    if job.is_cancelled() or not unsorted_files:
+        return []
+
+    labels, centroids = cluster_features(np.stack([features[file_path] for file_path in unsorted_files]),
+                                         math.ceil(len(unsorted_files) / cluster_size))
+    reference_files = {file_path: folder_path for file_path, folder_path in reference_files.items()
+                       if file_path in features}
+    reference_features = np.stack([features[file_path] for file_path in reference_files]) if reference_files \
+        else np.empty((0, centroids.shape[1]), dtype=np.float32)
+    suggestions = suggest_destinations(centroids, reference_features, list(reference_files.values()))
+
+    clusters = [([], suggestion) for suggestion in suggestions]
+    for file_path, label in zip(unsorted_files, labels):
+        clusters[label][0].append(file_path)
+    clusters = [cluster for cluster in clusters if cluster[0]]
+    return sorted(clusters, key=lambda cluster: len(cluster[0]), reverse=True)
+
+
+class SimilarityClusters(Addon):
+    def __init__(self, context: MainWindow):
+        super().__init__(context)
+        self._addon_info = ADDON_INFO
+        self._context: MainWindow = context
+        self._addon_ui = QWidget()
+        self._search = None
+        self._cache = None
+
+    def _build_ui(self):
+        self.btFind = QPushButton()
+        self.btFind.setText("Find similar images")
+        self.connect_traced(self.btFind.clicked, self._on_find)
+        self.lbStatus = QLabel()
+        self.twClusters = QTreeWidget()
+        self.twClusters.setHeaderHidden(True)
+        self.connect_traced(self.twClusters.itemActivated, self._on_file_activated)
+        self.connect_traced(self.twClusters.currentItemChanged, self._on_cluster_selected)
+        self.cbDestination = QComboBox()
+        self.btAssign = QPushButton()
+        self.btAssign.setText("Assign group")
+        self.connect_traced(self.btAssign.clicked, self._on_assign)
+        vbox = QVBoxLayout()
+        vbox.addWidget(self.btFind)
+        vbox.addWidget(self.lbStatus)
+        vbox.addWidget(self.twClusters)
+        vbox.addWidget(self.cbDestination)
+        vbox.addWidget(self.btAssign)
+        self._addon_ui.setLayout(vbox)
+
+    def _on_find(self):
+        if self._search is not None:
+            self._search.cancel()
+            return
+        if self._cache is None:
+            self._cache = FileResultCache(os.path.join(self._context.get_config_manager().get_config_folder_path(),
+                                                       FEATURE_CACHE_FILE))
+        file_manager = self._context.get_file_manager()
+        assignments = dict(file_manager.get_all_assignments())
+        unsorted_files = [file_path for file_path in file_manager.get_all_files_in_current_source()
+                          if file_path not in assignments]
+        self._search = self.submit_job(search_clusters, unsorted_files, assignments,
+                                       list(file_manager.get_all_destinations()), self._cache,
+                                       on_finished=self._on_finished, on_progress=self._on_progress,
+                                       on_failed=self._on_failed)
+        self.btFind.setText("Cancel")
+
+    def _on_progress(self, n_done: int, n_total: int):
+        self.lbStatus.setText(f"Reading images {n_done}/{n_total}")
+
+    def _on_failed(self, error: str):
+        self._search = None
+        self.btFind.setText("Find similar images")
+        self.lbStatus.setText(f"Search failed: {error}")
+
+    def _on_finished(self, clusters: Optional[list]):
+        self._search = None
+        if clusters is None:
+            clusters = []
+        self.btFind.setText("Find similar images")
+        self.lbStatus.setText(f"{len(clusters)} groups of similar images")
+        self.twClusters.clear()
+        for file_paths, suggestion in clusters:
+            cluster_item = QTreeWidgetItem([f"{len(file_paths)} files" if suggestion is None else
+                                            f"{len(file_paths)} files -> {os.path.basename(suggestion)}"])
+            cluster_item.setData(0, Qt.ItemDataRole.UserRole, (file_paths, suggestion))
+            for file_path in file_paths:
+                file_item = QTreeWidgetItem([os.path.basename(file_path)])
+                file_item.setToolTip(0, file_path)
+                file_item.setData(0, Qt.ItemDataRole.UserRole, file_path)
+                cluster_item.addChild(file_item)
+            self.twClusters.addTopLevelItem(cluster_item)
+
+    def _get_selected_cluster(self):
+        item = self.twClusters.currentItem()
+        if item is not None and item.parent() is not None:
+            item = item.parent()
+        return item
+
+    def _on_cluster_selected(self, current_item: QTreeWidgetItem, previous_item: QTreeWidgetItem):
+        cluster_item = self._get_selected_cluster()
+        destinations = self._context.get_file_manager().get_all_destinations()
+        self.cbDestination.clear()
+        for folder_path in destinations:
+            self.cbDestination.addItem(os.path.basename(folder_path), folder_path)
+        if cluster_item is None:
+            return
+        file_paths, suggestion = cluster_item.data(0, Qt.ItemDataRole.UserRole)
+        if suggestion in destinations:
+            self.cbDestination.setCurrentIndex(destinations.index(suggestion))
+
+    def _on_assign(self):
+        cluster_item = self._get_selected_cluster()
+        folder_path = self.cbDestination.currentData()
+        if cluster_item is None or folder_path is None:
+            logging.info("No group or destination selected")
+            return
+        file_paths, suggestion = cluster_item.data(0, Qt.ItemDataRole.UserRole)
+        file_manager = self._context.get_file_manager()
+        # Files that left the source since the search can't be assigned anymore
+        file_paths = file_manager.get_files_in_current_source(file_paths)
+        file_manager.add_assignments(file_paths, folder_path)
+        logging.info(f"Assigned {len(file_paths)} files to {folder_path}")
+        self.twClusters.takeTopLevelItem(self.twClusters.indexOfTopLevelItem(cluster_item))
+        self._context.ui_reload_destinations.emit()
+
+    def _on_file_activated(self, item: QTreeWidgetItem):
+        if item.parent() is None:
+            return
+        index = self._context.get_file_manager().get_index_of_file(item.data(0, Qt.ItemDataRole.UserRole))
+        if index is None:
+            logging.info(f"{item.data(0, Qt.ItemDataRole.UserRole)} is not in the current source")
+            return
+        self._context.set_current_file_index(index)
+
+    def init(self):
+        self._build_ui()
+        self._context.add_ui_to_addon_panel(self._addon_ui, self._addon_info)
+
+
+ADDON_CLASS = SimilarityClusters
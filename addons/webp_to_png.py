@@ -1,34 +1,61 @@
 import logging
 import os.path
+from typing import Optional
+
 from PySide6.QtGui import QShortcut
-from addons.lib.FFMPEGconvertwebptopng import ffmpeg_conversion_from_webp_to_png
+from addons.lib.png_conversion import convert_to_png, convert_all_to_png, get_png_path
 from PySide6.QtWidgets import QWidget, QPushButton, QVBoxLayout, QLabel, QMessageBox
 from src.core.addon import Addon
+from src.core.addon_job import AddonJob
 from src.core.main_window import MainWindow
 
+ADDON_INFO = {
+    "name": "Webp to PNG conversion",
+    "description": "Converts the currently viewed .webp file, or all of them in the source, into png format. "
+                   "Files Qt can't decode are converted with FFMPEG, which has to be in path",
+    "extensions": [".webp"],
+    "shortcuts": ["Ctrl+P"]
+}
+
+
+def convert_webp_to_png(job: AddonJob, file_path: str) -> Optional[str]:
+    return convert_to_png(file_path, job.get_cancel_event())
+
+
+def convert_all_webp_to_png(job: AddonJob, file_paths: list) -> dict:
+    return convert_all_to_png(file_paths, progress_callback=job.set_progress, cancelled=job.get_cancel_event())
+
 
 class WebpToPNG(Addon):
     def __init__(self, context: MainWindow):
         super().__init__(context)
-        self._addon_info = {
-            "name": "Webp to PNG conversion",
-            "description": "Converts currently viewed .webp file into png format using FFMPEG. Requires FFMPEG in path"
-        }
+        self._addon_info = ADDON_INFO
         self._context: MainWindow = context
         self._addon_ui = QWidget()
+        # Files with a conversion job
+        self._converting: set[str] = set()
+        self._batch_job = None
+        # A single file can be converted while a batch runs
+        self.set_max_concurrent_jobs(2)
 
     def _build_ui(self):
         self.btConvert = QPushButton()
         self.btConvert.setText("Convert WEBP to PNG")
-        self.btConvert.clicked.connect(self._on_convert)
+        self.connect_traced(self.btConvert.clicked, self._on_convert)
         self.btConvert.setDisabled(True)
+        self.btConvertAll = QPushButton()
+        self.btConvertAll.setText("Convert all WEBP to PNG")
+        self.connect_traced(self.btConvertAll.clicked, self._on_convert_all)
+        self.lbStatus = QLabel()
         vbox = QVBoxLayout()
         vbox.addWidget(self.btConvert)
+        vbox.addWidget(self.btConvertAll)
+        vbox.addWidget(self.lbStatus)
         self._addon_ui.setLayout(vbox)
 
         self._shortcut = QShortcut(self._context)
         self._shortcut.setKey("Ctrl+P")
-        self._shortcut.activated.connect(self._on_convert)
+        self.connect_traced(self._shortcut.activated, self._on_convert)
 
     def _on_update(self):
         if self._context.get_file_manager().get_n_of_source_files() == 0:
@@ -36,7 +63,7 @@ class WebpToPNG(Addon):
             return
         current_file = self._context.get_file_manager().get_file_on_index(self._context.get_current_file_index())
         name, extension = os.path.splitext(current_file)
-        if extension == ".webp":
+        if extension == ".webp" and current_file not in self._converting:
             self.btConvert.setDisabled(False)
         else:
             self.btConvert.setDisabled(True)
@@ -48,31 +75,95 @@ class WebpToPNG(Addon):
         current_file = self._context.get_file_manager().get_file_on_index(self._context.get_current_file_index())
 
         name, extension = os.path.splitext(current_file)
-        folder, filename = os.path.split(current_file)
         if extension != ".webp":
             logging.error(f"Can't convert {extension} file to png")
+            return
+        if current_file in self._converting:
+            logging.info(f"{current_file} is already being converted")
+            return
 
         res = QMessageBox.question(None, "Are you sure",
                                    f"Are you sure you want to convert {current_file} to png format?")
         if res != QMessageBox.StandardButton.Yes:
             return
 
-        converted_file = ffmpeg_conversion_from_webp_to_png(folder, filename)
-        self._swap_assignments(converted_file, current_file)
+        self._converting.add(current_file)
+        self._context.get_file_manager().start_renaming({current_file: get_png_path(current_file)})
+        self.btConvert.setDisabled(True)
+        self.submit_job(convert_webp_to_png, current_file,
+                        on_finished=lambda converted_file, webp_file=current_file:
+                        self._on_converted(webp_file, converted_file),
+                        on_failed=lambda error, webp_file=current_file: self._on_conversion_failed([webp_file], error))
+
+    def _on_convert_all(self):
+        if self._batch_job is not None:
+            self._batch_job.cancel()
+            return
+        # The files of the source that match the current filter
+        file_paths = [file_path for file_path in self._context.get_file_manager().get_all_files_in_current_source()
+                      if os.path.splitext(file_path)[1] == ".webp" and file_path not in self._converting]
+        if not file_paths:
+            logging.info("No webp files")
+            return
+        res = QMessageBox.question(None, "Are you sure",
+                                   f"Are you sure you want to convert {len(file_paths)} webp files to png format?")
+        if res != QMessageBox.StandardButton.Yes:
+            return
+
+        self._converting.update(file_paths)
+        self._context.get_file_manager().start_renaming({file_path: get_png_path(file_path)
+                                                         for file_path in file_paths})
+        self.btConvertAll.setText("Cancel")
+        self._on_update()
+        self._batch_job = self.submit_job(convert_all_webp_to_png, file_paths,
+                                          on_finished=lambda converted_files, webp_files=file_paths:
+                                          self._on_converted_all(webp_files, converted_files),
+                                          on_progress=self._on_progress,
+                                          on_failed=lambda error, webp_files=file_paths:
+                                          self._on_batch_failed(webp_files, error))
+
+    def _on_progress(self, n_done: int, n_total: int):
+        self.lbStatus.setText(f"Converting {n_done}/{n_total}")
+
+    def _on_converted_all(self, webp_files: list, converted_files: Optional[dict]):
+        self._batch_job = None
+        self.btConvertAll.setText("Convert all WEBP to PNG")
+        self._converting.difference_update(webp_files)
+        converted_files = converted_files or {}
+        self.lbStatus.setText(f"Converted {len(converted_files)} of {len(webp_files)} files")
+        # The source list and the assignments are updated once for all files
+        self._context.get_file_manager().finish_renaming({file_path: converted_files.get(file_path)
+                                                          for file_path in webp_files})
         self._context.full_ui_reload.emit()
 
-    def _swap_assignments(self, converted_file, current_file):
-        file_manager = self._context.get_file_manager()
-        file_manager.set_file_on_index(self._context.get_current_file_index(), converted_file)
-        assignment = file_manager.get_assignment(current_file)
-        if assignment:
-            file_manager.remove_assignment(current_file)
-            file_manager.add_assignment(converted_file, assignment)
+    def on_shortcut(self, key: str):
+        self._on_convert()
+
+    def _on_batch_failed(self, webp_files: list, error: str):
+        self._batch_job = None
+        self.btConvertAll.setText("Convert all WEBP to PNG")
+        self.lbStatus.setText("")
+        self._on_conversion_failed(webp_files, error)
+
+    def _on_conversion_failed(self, webp_files: list, error: str):
+        self._converting.difference_update(webp_files)
+        self._context.get_file_manager().finish_renaming(dict.fromkeys(webp_files))
+        QMessageBox.warning(None, "Warning", error)
+        self._on_update()
+
+    def _on_converted(self, webp_file: str, converted_file: Optional[str]):
+        self._converting.discard(webp_file)
+        self._context.get_file_manager().finish_renaming({webp_file: converted_file})
+        if converted_file is None:
+            QMessageBox.warning(None, "Warning", f"Could not convert {webp_file} to png")
+            self._on_update()
+            return
+        self._context.full_ui_reload.emit()
 
     def init(self):
         self._build_ui()
         self._context.add_ui_to_addon_panel(self._addon_ui, self._addon_info)
-        self._context.ui_reload_sources.connect(self._on_update)
+        self.connect_traced(self._context.ui_reload_sources, self._on_update)
 
 
 ADDON_CLASS = WebpToPNG
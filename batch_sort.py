@@ -0,0 +1,66 @@
+import argparse
+import logging
+import os
+import sys
+
+from src.core.apply_engine import DEFAULT_WORKERS_PER_DEVICE
+from src.core.batch_sorter import BatchSorter, DEFAULT_APPLY_BATCH_SIZE, DEFAULT_EVALUATION_WORKERS, load_rules, \
+    parse_rule
+from src.core.move_journal import MoveJournal, DEFAULT_JOURNAL_FILE
+from src.core.user_config import DEFAULT_CONFIG_FOLDER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moves files to destinations by rules, without the window. "
+                                                 "A rule looks like 'ext:jpg,png name:^IMG_ size>2M "
+                                                 "date>=2021-01-01 -> /photos/2021', the first matching rule wins.")
+    parser.add_argument("sources", nargs="+", help="folders to sort")
+    parser.add_argument("--rules", help="file with one rule per line")
+    parser.add_argument("--rule", action="append", default=[], help="a rule, can be given more than once")
+    parser.add_argument("-r", "--recursive", action="store_true", help="sort the sub folders as well")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="only print the moves")
+    parser.add_argument("--workers", type=int, default=DEFAULT_EVALUATION_WORKERS,
+                        help="threads reading the files for the rules")
+    parser.add_argument("--workers-per-device", type=int, default=DEFAULT_WORKERS_PER_DEVICE,
+                        help="threads moving files to each destination device")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_APPLY_BATCH_SIZE,
+                        help="files that are moved together")
+    parser.add_argument("--journal", default=os.path.join(DEFAULT_CONFIG_FOLDER, DEFAULT_JOURNAL_FILE),
+                        help="journal of the moves, the window's one by default so they can be undone there")
+    args = parser.parse_args()
+    logging.basicConfig(format="[%(asctime)s->%(levelname)s->%(module)s" +
+                               "->%(funcName)s]: %(message)s",
+                        datefmt="%H:%M:%S",
+                        level=logging.INFO)
+
+    try:
+        rules = load_rules(args.rules) if args.rules else []
+        rules.extend(parse_rule(rule_text) for rule_text in args.rule)
+    except (OSError, ValueError) as e:
+        logging.error(e)
+        return 2
+    if not rules:
+        logging.error("No rules, use --rules or --rule")
+        return 2
+
+    journal = None
+    if not args.dry_run:
+        os.makedirs(os.path.dirname(os.path.abspath(args.journal)), exist_ok=True)
+        journal = MoveJournal(args.journal)
+    sorter = BatchSorter(rules, args.workers, args.workers_per_device, journal, args.batch_size)
+    result = sorter.run(args.sources, args.recursive, args.dry_run,
+                        lambda file_path, folder_path: print(f"{file_path} -> {folder_path}")
+                        if args.dry_run else None)
+
+    logging.info(f"{sum(result.n_planned.values())} of {result.n_files} files matched a rule")
+    for folder_path, n_files in sorted(result.n_planned.items()):
+        logging.info(f"  {folder_path}: {n_files}")
+    if not args.dry_run:
+        logging.info(f"Moved {len(result.moved)} files, {len(result.failed)} failed")
+        for file_path, error in result.failed:
+            logging.error(f"  {file_path}: {error}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+BENCHMARK_RESULTS_VERSION = 1
+DEFAULT_FILE_COUNTS = [10000]
+DEFAULT_REPEAT = 3
+# A benchmark is a regression when it is this much slower than in the baseline
+DEFAULT_TOLERANCE = 0.2
+CASES = ["listing", "filtering", "navigation", "destinations", "apply"]
+
+# Extensions of the generated source files, roughly in the proportion they come in
+SOURCE_EXTENSIONS = ["jpg"] * 6 + ["png"] * 2 + ["webp", "gif", "pdf", "mp4"]
+# Images decoded while navigating, width x height and format
+NAVIGATION_IMAGES = [(640, 480, "jpg"), (1920, 1080, "jpg"), (4000, 3000, "jpg"), (1280, 720, "png"),
+                     (3000, 2000, "png"), (800, 800, "bmp")]
+NAVIGATION_STEPS = 60
+N_DESTINATIONS = 200
+DESTINATION_RELOADS = 50
+APPLY_FILES = 5000
+APPLY_FILE_SIZE = 64 * 1024
+
+
+def generate_source_tree(folder_path: str, n_files: int, seed: int = 0) -> str:
+    # Files with image extensions and sizes spread between 1 and 64 KiB. The content is never decoded,
+    # so the files are not real images. The tree is reused by later runs with the same parameters.
+    source_folder_path = os.path.join(folder_path, f"source_{n_files}")
+    marker_path = os.path.join(source_folder_path, ".benchmark_tree")
+    if os.path.exists(marker_path):
+        return source_folder_path
+    shutil.rmtree(source_folder_path, ignore_errors=True)
+    os.makedirs(source_folder_path)
+    generator = random.Random(seed)
+    for i in range(n_files):
+        extension = generator.choice(SOURCE_EXTENSIONS)
+        prefix = generator.choice(["IMG_", "DSC", "Screenshot_", "scan_"])
+        # Sparse files, the sizes are real but nothing is written to the disk
+        with open(os.path.join(source_folder_path, f"{prefix}{i:07d}.{extension}"), "wb") as file:
+            file.truncate(generator.randint(1024, 64 * 1024))
+    with open(marker_path, "w") as marker_file:
+        json.dump({"n_files": n_files, "seed": seed}, marker_file)
+    return source_folder_path
+
+
+def generate_images(folder_path: str) -> str:
+    from PySide6.QtGui import QColor, QImage
+
+    image_folder_path = os.path.join(folder_path, "images")
+    marker_path = os.path.join(image_folder_path, ".benchmark_tree")
+    if os.path.exists(marker_path):
+        return image_folder_path
+    shutil.rmtree(image_folder_path, ignore_errors=True)
+    os.makedirs(image_folder_path)
+    for i, (width, height, image_format) in enumerate(NAVIGATION_IMAGES * 5):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(i * 37 % 360, 200, 200))
+        image.save(os.path.join(image_folder_path, f"image_{i:03d}.{image_format}"))
+    open(marker_path, "w").close()
+    return image_folder_path
+
+
+def time_runs(function: Callable[[], Optional[float]], repeat: int,
+              prepare: Optional[Callable[[], None]] = None) -> dict:
+    # function can return the time it measured itself, otherwise the whole call is timed
+    runs = []
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        measured = function()
+        runs.append(measured if measured is not None else time.perf_counter() - start)
+    return {"seconds": statistics.median(runs), "runs": runs}
+
+
+def get_percentiles(durations: list) -> dict:
+    durations = sorted(durations)
+    return {"p50": durations[len(durations) // 2],
+            "p95": durations[min(len(durations) * 95 // 100, len(durations) - 1)], "max": durations[-1]}
+
+
+def benchmark_listing(source_folder_path: str, repeat: int) -> dict:
+    from src.core.file_moving_manager import FileMovingManager
+
+    results = {}
+    first_files = []
+
+    def list_source():
+        manager = FileMovingManager()
+        start = time.perf_counter()
+        manager.set_current_source(source_folder_path)
+        first_files.append(time.perf_counter() - start)
+        manager.wait_for_listing()
+        return time.perf_counter() - start
+
+    results["listing"] = time_runs(list_source, repeat)
+    results["listing.first_file"] = {"seconds": statistics.median(first_files), "runs": first_files}
+    return results
+
+
+def benchmark_filtering(source_folder_path: str, repeat: int) -> dict:
+    from src.core.file_moving_manager import FileMovingManager, FILTER_SYNTAX_GLOB
+
+    manager = FileMovingManager()
+    manager.set_current_source(source_folder_path)
+    manager.wait_for_listing()
+    results = {}
+    filters = {"extension": (r".*\.jpg$", "regex", False), "glob": ("*/IMG_*.png", FILTER_SYNTAX_GLOB, False),
+               "basename": (r"scan_0\d{6}\.pdf$", "regex", True)}
+    for name, (pattern, syntax, match_basename) in filters.items():
+        def refilter():
+            manager.set_filter(".*")
+            start = time.perf_counter()
+            manager.set_filter(pattern, syntax, match_basename)
+            return time.perf_counter() - start
+        results[f"filtering.{name}"] = time_runs(refilter, repeat)
+
+    # Typing a regex one character at a time, every step narrows the previous matches down
+    def type_filter():
+        manager.set_filter(".*")
+        start = time.perf_counter()
+        for length in range(len(".*IMG_00") + 1, len(".*IMG_00123") + 1):
+            manager.set_filter(".*IMG_00123"[:length])
+        return time.perf_counter() - start
+    results["filtering.typing"] = time_runs(type_filter, repeat)
+    return results
+
+
+def create_window(work_folder_path: str):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QMessageBox
+    from src.core.main_window import CoreConfig, MainWindow
+    from src.core.user_config import UserConfig
+
+    application = QApplication.instance() or QApplication([])
+    # Nothing may wait for an answer
+    QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No)
+    QMessageBox.warning = staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.Ok)
+    # The window keeps its config and looks for addons in the working directory. It runs without addons,
+    # and without the thumbnail cache, which would make later runs faster.
+    config_folder_path = os.path.join(work_folder_path, "config")
+    shutil.rmtree(config_folder_path, ignore_errors=True)
+    os.makedirs(os.path.join(work_folder_path, "addons"), exist_ok=True)
+    os.chdir(work_folder_path)
+    UserConfig().save_config("core", CoreConfig(thumbnail_folder=None))
+    window = MainWindow()
+    window.show()
+    return application, window
+
+
+def process_events(wait: bool = False):
+    # Through an event loop object, every call of the static QApplication.processEvents drops a reference
+    # to None in some PySide6 versions and long runs crash
+    from PySide6.QtCore import QEventLoop
+
+    event_loop = QEventLoop()
+    event_loop.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents if wait else
+                             QEventLoop.ProcessEventsFlag.AllEvents)
+
+
+def process_events_until(condition: Callable[[], bool], timeout: float = 30):
+    from PySide6.QtCore import QTimer
+
+    # Sleeps until the next event instead of spinning, the decoding threads need the CPU. The timer
+    # wakes the loop up to check the timeout.
+    wake_timer = QTimer()
+    wake_timer.start(50)
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            raise Exception("Timed out waiting for the window")
+        process_events(True)
+    wake_timer.stop()
+
+
+def benchmark_navigation(window, image_folder_path: str, repeat: int) -> dict:
+    # From the key press until the preview of the next file is on screen
+    window.set_current_folder([image_folder_path])
+    file_manager = window.get_file_manager()
+    process_events_until(lambda: not file_manager.is_listing())
+    preview = window._preview_image
+    step_durations = []
+
+    def navigate():
+        preview.get_preview_cache().clear()
+        start = time.perf_counter()
+        for _ in range(NAVIGATION_STEPS):
+            step_start = time.perf_counter()
+            window._next_file()
+            current_file = file_manager.get_file_on_index(window.get_current_file_index())
+            process_events_until(lambda: not preview._prefetcher.is_pending(current_file))
+            step_durations.append(time.perf_counter() - step_start)
+        return time.perf_counter() - start
+
+    results = {"navigation": time_runs(navigate, repeat)}
+    results["navigation"].update(get_percentiles(step_durations))
+    preview._prefetcher.wait_for_done()
+    return results
+
+
+def benchmark_destinations(window, work_folder_path: str, source_folder_path: str,
+                           repeat: int) -> dict:
+    # Rebuilding the destination panel with many destinations, with an assignment changed before every reload
+    file_manager = window.get_file_manager()
+    window.set_current_folder([source_folder_path])
+    destination_folder_paths = []
+    for i in range(N_DESTINATIONS):
+        destination_folder_path = os.path.join(work_folder_path, "destinations", f"destination_{i:03d}")
+        os.makedirs(destination_folder_path, exist_ok=True)
+        file_manager.add_destination(destination_folder_path)
+        destination_folder_paths.append(destination_folder_path)
+    window._reload_destinations()
+    reload_durations = []
+
+    def reload_destinations():
+        start = time.perf_counter()
+        for i in range(DESTINATION_RELOADS):
+            reload_start = time.perf_counter()
+            file_manager.add_assignment(file_manager.get_file_on_index(0), destination_folder_paths[i])
+            window._reload_destinations()
+            process_events()
+            reload_durations.append(time.perf_counter() - reload_start)
+        return time.perf_counter() - start
+
+    results = {"destinations": time_runs(reload_destinations, repeat)}
+    results["destinations"].update(get_percentiles(reload_durations))
+    file_manager.clear_assignments()
+    file_manager.set_current_source(None)
+    return results
+
+
+def benchmark_apply(work_folder_path: str, repeat: int) -> dict:
+    from src.core.file_moving_manager import FileMovingManager
+
+    apply_folder_path = os.path.join(work_folder_path, "apply")
+    manager = FileMovingManager()
+
+    def prepare():
+        shutil.rmtree(apply_folder_path, ignore_errors=True)
+        os.makedirs(os.path.join(apply_folder_path, "source"))
+        destination_folder_paths = [os.path.join(apply_folder_path, f"destination_{i}") for i in range(10)]
+        for destination_folder_path in destination_folder_paths:
+            os.makedirs(destination_folder_path)
+        content = b"\0" * APPLY_FILE_SIZE
+        for i in range(APPLY_FILES):
+            with open(os.path.join(apply_folder_path, "source", f"file_{i:05d}.jpg"), "wb") as file:
+                file.write(content)
+        manager.set_current_source(os.path.join(apply_folder_path, "source"))
+        manager.wait_for_listing()
+        for i, file_path in enumerate(manager.get_all_files_in_current_source()):
+            manager.add_assignment(file_path, destination_folder_paths[i % len(destination_folder_paths)])
+
+    def apply():
+        result = manager.apply_assignments()
+        if result.failed:
+            raise Exception(f"Could not move {len(result.failed)} files, {result.failed[0]}")
+
+    results = {"apply": time_runs(apply, repeat, prepare)}
+    results["apply"]["files_per_second"] = APPLY_FILES / results["apply"]["seconds"]
+    shutil.rmtree(apply_folder_path, ignore_errors=True)
+    return results
+
+
+def run_benchmarks(work_folder_path: str, file_counts: list, cases: list = CASES,
+                   repeat: int = DEFAULT_REPEAT) -> dict:
+    work_folder_path = os.path.abspath(work_folder_path)
+    os.makedirs(work_folder_path, exist_ok=True)
+    results = {}
+    application = window = None
+    for n_files in file_counts:
+        logging.info(f"Generating {n_files} files")
+        source_folder_path = generate_source_tree(work_folder_path, n_files)
+        case_results = {}
+        if "listing" in cases:
+            case_results.update(benchmark_listing(source_folder_path, repeat))
+        if "filtering" in cases:
+            case_results.update(benchmark_filtering(source_folder_path, repeat))
+        if "destinations" in cases:
+            if window is None:
+                application, window = create_window(work_folder_path)
+            case_results.update(benchmark_destinations(window, work_folder_path, source_folder_path,
+                                                       repeat))
+        for name, result in case_results.items():
+            results[f"{name}@{n_files}"] = result
+            logging.info(f"{name}@{n_files}: {result['seconds']:.4f}s")
+
+    # These don't depend on the size of the source
+    other_results = {}
+    if "navigation" in cases:
+        if window is None:
+            application, window = create_window(work_folder_path)
+        other_results.update(benchmark_navigation(window, generate_images(work_folder_path), repeat))
+    if "apply" in cases:
+        other_results.update(benchmark_apply(work_folder_path, repeat))
+    for name, result in other_results.items():
+        results[name] = result
+        logging.info(f"{name}: {result['seconds']:.4f}s")
+    return results
+
+
+def get_machine() -> dict:
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpu_count": os.cpu_count(),
+            "processor": platform.processor()}
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    # (name, baseline seconds, seconds, ratio, regressed) of every benchmark in both
+    comparison = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        baseline_seconds = baseline[name]["seconds"]
+        ratio = result["seconds"] / baseline_seconds if baseline_seconds > 0 else 1.0
+        comparison.append((name, baseline_seconds, result["seconds"], ratio, ratio > 1 + tolerance))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times listing, filtering, navigation, the destination panel and "
+                                                 "applying on generated files, and compares them to a baseline.")
+    parser.add_argument("--files", type=int, nargs="+", default=DEFAULT_FILE_COUNTS,
+                        help="sizes of the generated sources, e.g. 10000 100000 1000000")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs of every benchmark, the median counts")
+    parser.add_argument("--work-folder", default=os.path.join(tempfile.gettempdir(), "informed-file-sorter-benchmark"),
+                        help="where the files are generated, kept for later runs")
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="how much slower than the baseline is still fine, 0.2 for 20%%")
+    args = parser.parse_args()
+    logging.basicConfig(format="[%(asctime)s->%(levelname)s->%(module)s" +
+                               "->%(funcName)s]: %(message)s",
+                        datefmt="%H:%M:%S",
+                        level=logging.INFO)
+
+    # The window is created in the work folder, the paths are relative to where we started
+    output_path = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    results = run_benchmarks(args.work_folder, args.files, args.cases, args.repeat)
+    report = {"version": BENCHMARK_RESULTS_VERSION, "machine": get_machine(), "created": time.time(),
+              "results": results}
+    if output_path is not None:
+        with open(output_path, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if baseline_path is None:
+        return 0
+    with open(baseline_path, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("machine") != report["machine"]:
+        logging.warning("The baseline was measured on a different machine")
+    regressions = 0
+    for name, baseline_seconds, seconds, ratio, regressed in compare_results(results, baseline["results"],
+                                                                             args.tolerance):
+        print(f"{'REGRESSION' if regressed else 'ok':<10} {name:<32} {baseline_seconds:10.4f}s -> {seconds:10.4f}s "
+              f"({ratio:.2f}x)")
+        regressions += regressed
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
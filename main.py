@@ -1,18 +1,61 @@
+import argparse
 import logging
-from PySide6.QtWidgets import QApplication
+import sys
 
-from src.core.main_window import MainWindow
+from src.core.startup_timing import StartupTimer
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="log how long the start up and the imports of the modules took")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record timed spans and write them to FILE on exit, for chrome://tracing or Perfetto")
+    parser.add_argument("--timing-overlay", action="store_true",
+                        help="show the latencies of the last frames over the preview")
+    args, qt_arguments = parser.parse_known_args()
     logging.basicConfig(format="[%(asctime)s->%(levelname)s->%(module)s" +
                                "->%(funcName)s]: %(message)s",
                         datefmt="%H:%M:%S",
                         level=logging.INFO)
-    app = QApplication()
+    startup_timer = None
+    if args.startup_timing:
+        startup_timer = StartupTimer()
+        startup_timer.start_import_timing()
+
+    # Imported here so the import times can be measured
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+    from src.core import tracing
+    from src.core.main_window import MainWindow
+
+    if startup_timer is not None:
+        startup_timer.mark("Imports")
+    if args.trace:
+        tracing.enable_tracing()
+    app = QApplication(sys.argv[:1] + qt_arguments)
+    if startup_timer is not None:
+        startup_timer.mark("QApplication")
     window = MainWindow()
+    if startup_timer is not None:
+        startup_timer.mark("Main window")
+    if args.timing_overlay:
+        window.get_ui().actionTiming_overlay.setChecked(True)
     window.show()
-    return app.exec()
+    if startup_timer is not None:
+        startup_timer.mark("Show")
+
+        def on_first_event_loop_tick():
+            startup_timer.mark("First event loop tick")
+            startup_timer.stop_import_timing()
+            startup_timer.log_report(window.get_addon_manager().get_load_times())
+
+        QTimer.singleShot(0, on_first_event_loop_tick)
+    exit_code = app.exec()
+    if args.trace:
+        tracing.get_tracer().export_chrome_trace(args.trace)
+        logging.info(f"Trace written to {args.trace}")
+    return exit_code
 
 
 if __name__ == "__main__":
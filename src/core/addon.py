@@ -1,7 +1,14 @@
+from typing import Callable, Optional
+
+from src.core import tracing
+from src.core.addon_job import AddonJob, JobRunner
+
+
 class Addon:
     def __init__(self, context: "MainWindow"):
         self._addon_info = {}
         self._context: "MainWindow" = context
+        self._jobs = JobRunner()
 
 
     @classmethod
@@ -12,5 +19,38 @@ class Addon:
     def unload(self):
         pass
 
+    def on_shortcut(self, key: str):
+        # Called for a shortcut from ADDON_INFO that loaded the addon, the addon's own shortcut missed it
+        pass
+
     def get_info(self):
         return self._addon_info
+
+    def connect_traced(self, signal, slot: Callable):
+        # Connects slot so its calls show up in traces as addon.<class>.<slot>
+        signal.connect(self.traced(slot))
+
+    def traced(self, callback: Callable) -> Callable:
+        return tracing.traced_slot(callback, f"addon.{type(self).__name__}.{getattr(callback, '__name__', 'callback')}",
+                                   "addon")
+
+    def submit_job(self, function: Callable, *args, in_process: bool = False,
+                   on_finished: Optional[Callable] = None, on_progress: Optional[Callable[[int, int], None]] = None,
+                   on_failed: Optional[Callable[[str], None]] = None) -> AddonJob:
+        # Runs function off the GUI thread, see AddonJob. The callbacks are called on the GUI thread.
+        on_finished, on_progress, on_failed = [self.traced(callback) if callback is not None else None
+                                               for callback in (on_finished, on_progress, on_failed)]
+        return self._jobs.submit(function, args, in_process, on_finished, on_progress, on_failed)
+
+    def get_jobs(self) -> list:
+        return self._jobs.get_jobs()
+
+    def set_max_concurrent_jobs(self, max_jobs: int):
+        self._jobs.set_max_jobs(max_jobs)
+
+    def cancel_jobs(self):
+        self._jobs.cancel_all()
+
+    def stop_jobs(self):
+        # Cancels the jobs and waits for the running ones
+        self._jobs.shut_down()
@@ -0,0 +1,144 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from typing import Callable, Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+# How often a job waiting for a worker process checks whether it was cancelled, in seconds
+_CANCEL_POLL_INTERVAL = 0.1
+
+
+class _JobTask(QRunnable):
+    def __init__(self, job: "AddonJob"):
+        super().__init__()
+        self._job = job
+
+    def run(self):
+        self._job.run()
+
+
+class AddonJob(QObject):
+    # One call of function on a worker thread of the addon, or in a worker process if an executor is given.
+    # Thread jobs are called as function(job, *args) and can report progress and check for cancellation
+    # through the job, process jobs as function(*args). The signals are delivered on the GUI thread,
+    # so results can be handed back to the UI and the file manager from the connected callbacks.
+    progress = Signal(int, int)
+    # The result, None if the job was cancelled before it started. Cancelled thread jobs finish with
+    # whatever their function returns, e.g. the part of the work that was done.
+    finished = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, function: Callable, args: tuple = (), executor: Optional[ProcessPoolExecutor] = None):
+        super().__init__()
+        self._function = function
+        self._args = args
+        self._executor = executor
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._result = None
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def get_cancel_event(self) -> threading.Event:
+        return self._cancelled
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def get_result(self):
+        return self._result
+
+    def set_progress(self, n_done: int, n_total: int):
+        self.progress.emit(n_done, n_total)
+
+    def wait_for_done(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def run(self):
+        try:
+            if self._cancelled.is_set():
+                self.finished.emit(None)
+            elif self._executor is None:
+                self._result = self._function(self, *self._args)
+                self.finished.emit(self._result)
+            else:
+                self._run_in_process()
+        except Exception as e:
+            logging.exception(f"Job {getattr(self._function, '__name__', self._function)} failed")
+            self.failed.emit(str(e))
+        finally:
+            self._done.set()
+
+    def _run_in_process(self):
+        future = self._executor.submit(self._function, *self._args)
+        while True:
+            try:
+                self._result = future.result(_CANCEL_POLL_INTERVAL)
+                break
+            except TimeoutError:
+                # A running process can't be interrupted, its result is dropped
+                if self._cancelled.is_set():
+                    future.cancel()
+                    self.finished.emit(None)
+                    return
+        self.finished.emit(self._result)
+
+
+class JobRunner:
+    # The jobs of one addon. At most max_jobs of them run at a time, the rest wait in a queue.
+    def __init__(self, max_jobs: int = 1, max_processes: Optional[int] = None):
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max_jobs)
+        self._max_processes = max_processes
+        self._executor = None
+        self._jobs: list[AddonJob] = []
+
+    def set_max_jobs(self, max_jobs: int):
+        self._pool.setMaxThreadCount(max_jobs)
+
+    def submit(self, function: Callable, args: tuple = (), in_process: bool = False,
+               on_finished: Optional[Callable] = None, on_progress: Optional[Callable[[int, int], None]] = None,
+               on_failed: Optional[Callable[[str], None]] = None) -> AddonJob:
+        if in_process and self._executor is None:
+            # Spawned instead of forked, forking a process that runs Qt threads is not safe
+            self._executor = ProcessPoolExecutor(self._max_processes, mp_context=multiprocessing.get_context("spawn"))
+        job = AddonJob(function, args, self._executor if in_process else None)
+        if on_finished is not None:
+            job.finished.connect(on_finished)
+        if on_progress is not None:
+            job.progress.connect(on_progress)
+        if on_failed is not None:
+            job.failed.connect(on_failed)
+        job.finished.connect(lambda result, finished_job=job: self._forget(finished_job))
+        job.failed.connect(lambda error, failed_job=job: self._forget(failed_job))
+        self._jobs.append(job)
+        self._pool.start(_JobTask(job))
+        return job
+
+    def get_jobs(self) -> list:
+        # Jobs that are queued or running
+        return list(self._jobs)
+
+    def cancel_all(self):
+        for job in self._jobs:
+            job.cancel()
+
+    def wait_for_done(self):
+        self._pool.waitForDone()
+
+    def shut_down(self):
+        self.cancel_all()
+        self.wait_for_done()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _forget(self, job: AddonJob):
+        if job in self._jobs:
+            self._jobs.remove(job)
@@ -1,39 +1,138 @@
+import ast
 import importlib
 import logging
-from typing import Any
+import time
+from typing import Any, Optional
+
+from PySide6.QtGui import QShortcut
+from PySide6.QtWidgets import QPushButton
+
 from src.core.addon import Addon
 import os
 
 DEFAULT_ADDON_FOLDER = "addons"
 
 
+def read_addon_info(file_path: str) -> Optional[dict]:
+    # The module level ADDON_INFO dict, read without importing the addon
+    with open(file_path, "rb") as addon_file:
+        module = ast.parse(addon_file.read(), file_path)
+    for statement in module.body:
+        if isinstance(statement, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "ADDON_INFO"
+                                                     for target in statement.targets):
+            try:
+                return ast.literal_eval(statement.value)
+            except ValueError:
+                logging.warning(f"ADDON_INFO of {file_path} has to be a literal")
+                return None
+    return None
+
+
 class AddonLoader:
+    # Addons are imported on first use: when their panel is opened, one of their shortcuts is pressed or a
+    # file with one of their extensions is shown. Until then only their ADDON_INFO is read. Addons without
+    # an ADDON_INFO are imported right away.
     def __init__(self, context: Any, addon_folder: str = DEFAULT_ADDON_FOLDER):
         self._all_addons: dict[str, Addon] = {}
         self._addon_folder = addon_folder
         self._context = context
+        self._addon_infos: dict[str, dict] = {}
+        self._pending_addons: dict[str, list] = {}
+        # name -> seconds spent importing and initialising the addon
+        self._load_times: dict[str, float] = {}
 
     def load_addons(self):
         self.reload_addons()
+        self._context.ui_reload_sources.connect(self._on_file_shown)
 
     def reload_addons(self):
         addon_modules = os.listdir(self._addon_folder)
 
-        for path in addon_modules:
+        for path in sorted(addon_modules):
             name, extension = os.path.splitext(path)
             name = os.path.basename(name)
-            if extension == ".py" and name != "__init__":
-                module = importlib.import_module(f"addons.{name}")
-                try:
-                    addon_class = getattr(module, "ADDON_CLASS")
-                except AttributeError as e:
-                    logging.warning(f"Addon {name} is missing its addon class")
-                else:
-                    self._all_addons[name] = addon_class(self._context)
-                    self._all_addons[name].init()
-                    logging.info(f"Loaded addon {self._all_addons[name].get_info()['name']}")
+            if extension != ".py" or name == "__init__" or name in self._all_addons:
+                continue
+            try:
+                addon_info = read_addon_info(os.path.join(self._addon_folder, path))
+            except (OSError, SyntaxError) as e:
+                logging.warning(f"Addon {name} could not be read: {e}")
+                continue
+            if addon_info is None:
+                logging.info(f"Addon {name} has no ADDON_INFO, loading it now")
+                self.load_addon(name)
+                continue
+
+            self._addon_infos[name] = addon_info
+            if name in self._pending_addons:
+                continue
+            placeholder = QPushButton()
+            placeholder.setText("Open")
+            placeholder.setToolTip(addon_info.get("description", ""))
+            placeholder.clicked.connect(lambda checked=False, addon_name=name: self.load_addon(addon_name))
+            self._context.add_addon_placeholder(placeholder, addon_info)
+            self._pending_addons[name] = []
+            for key in addon_info.get("shortcuts", []):
+                shortcut = QShortcut(self._context)
+                shortcut.setKey(key)
+                shortcut.activated.connect(lambda addon_name=name, shortcut_key=key:
+                                           self._on_placeholder_shortcut(addon_name, shortcut_key))
+                self._pending_addons[name].append(shortcut)
+
+    def load_addon(self, name: str) -> Optional[Addon]:
+        if name in self._all_addons:
+            return self._all_addons[name]
+        for shortcut in self._pending_addons.pop(name, []):
+            shortcut.setEnabled(False)
+            shortcut.deleteLater()
+
+        start_time = time.perf_counter()
+        try:
+            module = importlib.import_module(f"addons.{name}")
+        except ImportError as e:
+            logging.warning(f"Addon {name} could not be loaded: {e}")
+            return None
+        try:
+            addon_class = getattr(module, "ADDON_CLASS")
+        except AttributeError as e:
+            logging.warning(f"Addon {name} is missing its addon class")
+            return None
+        addon = addon_class(self._context)
+        self._all_addons[name] = addon
+        addon.init()
+        self._load_times[name] = time.perf_counter() - start_time
+        logging.info(f"Loaded addon {addon.get_info()['name']} in {self._load_times[name] * 1000:.0f} ms")
+        return addon
+
+    def get_addon(self, name: str) -> Optional[Addon]:
+        return self._all_addons.get(name)
+
+    def get_addon_infos(self) -> dict:
+        return self._addon_infos
+
+    def get_load_times(self) -> dict:
+        return self._load_times
+
+    def _on_placeholder_shortcut(self, name: str, key: str):
+        addon = self.load_addon(name)
+        if addon is not None:
+            addon.on_shortcut(key)
 
+    def _on_file_shown(self):
+        if not self._pending_addons:
+            return
+        file_manager = self._context.get_file_manager()
+        if file_manager.get_n_of_source_files() == 0:
+            return
+        current_file = file_manager.get_file_on_index(self._context.get_current_file_index())
+        extension = os.path.splitext(current_file)[1].lower()
+        for name in list(self._pending_addons):
+            if extension in self._addon_infos[name].get("extensions", []):
+                # The addon missed this reload, it is repeated once it is connected
+                if self.load_addon(name) is not None:
+                    self._context.ui_reload_sources.emit()
 
     def unload_addons(self):
         for addon_name in self._all_addons:
             self._all_addons[addon_name].unload()
+            self._all_addons[addon_name].stop_jobs()
@@ -0,0 +1,258 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from src.core import tracing
+from src.core.move_journal import MoveJournal, JournalBatch
+
+DEFAULT_WORKERS_PER_DEVICE = 4
+PROGRESS_INTERVAL = 0.1
+_COPY_CHUNK_SIZE = 1 << 30
+# Errors after which the next, more widely supported, way of copying is tried
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP}
+# Errors of renameat2 when the kernel or the file system doesn't support RENAME_NOREPLACE
+_RENAME_FALLBACK_ERRNOS = {errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+_AT_FDCWD = -100
+_RENAME_NOREPLACE = 1
+
+
+@dataclass
+class ApplyProgress:
+    n_done: int = 0
+    n_total: int = 0
+    bytes_done: int = 0
+    elapsed: float = 0.0
+
+    def get_bytes_per_second(self) -> float:
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass
+class ApplyResult:
+    moved: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+    batch_id: Optional[int] = None
+
+
+def get_destination_path(file_path: str, folder_path: str) -> str:
+    return os.path.join(folder_path, os.path.basename(file_path))
+
+
+def get_resume_assignments(batch: JournalBatch) -> dict:
+    return {source_path: os.path.dirname(destination_path) for source_path, destination_path in
+            batch.get_pending_moves()}
+
+
+def get_undo_assignments(batch: JournalBatch) -> dict:
+    return {destination_path: os.path.dirname(source_path) for source_path, destination_path in
+            batch.get_done_moves()}
+
+
+def _copy_with_copy_file_range(source_fd: int, destination_fd: int, offset: int) -> int:
+    return os.copy_file_range(source_fd, destination_fd, _COPY_CHUNK_SIZE, offset, offset)
+
+
+def _copy_with_sendfile(source_fd: int, destination_fd: int, offset: int) -> int:
+    return os.sendfile(destination_fd, source_fd, offset, _COPY_CHUNK_SIZE)
+
+
+def _copy_file_contents(source_file, destination_file):
+    # Let the kernel copy the data when it can, falling back to reading and writing it ourselves
+    copy_functions = []
+    if hasattr(os, "copy_file_range"):
+        copy_functions.append(_copy_with_copy_file_range)
+    if hasattr(os, "sendfile"):
+        copy_functions.append(_copy_with_sendfile)
+
+    for copy_function in copy_functions:
+        copied = 0
+        try:
+            while True:
+                n_bytes = copy_function(source_file.fileno(), destination_file.fileno(), copied)
+                if n_bytes == 0:
+                    return
+                copied += n_bytes
+        except OSError as e:
+            if copied > 0 or e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    shutil.copyfileobj(source_file, destination_file)
+
+
+def copy_file(source_path: str, destination_path: str):
+    with open(source_path, "rb") as source_file:
+        # Fails if the destination exists, it is only removed again when this call created it
+        destination_file = open(destination_path, "xb")
+        try:
+            with destination_file:
+                _copy_file_contents(source_file, destination_file)
+                # The source is removed right after, the copy has to be on the disk by then
+                os.fsync(destination_file.fileno())
+            shutil.copystat(source_path, destination_path)
+        except BaseException:
+            os.remove(destination_path)
+            raise
+
+
+def _load_renameat2():
+    library_name = ctypes.util.find_library("c")
+    if not library_name:
+        return None
+    try:
+        renameat2 = ctypes.CDLL(library_name, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    return renameat2
+
+
+_renameat2 = _load_renameat2()
+
+
+def _rename_no_replace(source_path: str, destination_path: str):
+    # Renames files and folders, fails with FileExistsError instead of replacing the destination
+    if _renameat2 is not None:
+        if _renameat2(_AT_FDCWD, os.fsencode(source_path), _AT_FDCWD, os.fsencode(destination_path),
+                      _RENAME_NOREPLACE) == 0:
+            return
+        error = ctypes.get_errno()
+        if error not in _RENAME_FALLBACK_ERRNOS:
+            raise OSError(error, os.strerror(error), source_path, None, destination_path)
+    if stat.S_ISREG(os.lstat(source_path).st_mode):
+        # Linking fails if the destination exists, so regular files don't race with other moves to the same name
+        try:
+            os.link(source_path, destination_path, follow_symlinks=False)
+        except OSError as e:
+            if e.errno in (errno.EEXIST, errno.EXDEV):
+                raise
+        else:
+            try:
+                os.unlink(source_path)
+            except BaseException:
+                os.unlink(destination_path)
+                raise
+            return
+    if os.path.lexists(destination_path):
+        raise FileExistsError(errno.EEXIST, "Destination already exists", destination_path)
+    os.rename(source_path, destination_path)
+
+
+def move_file(source_path: str, destination_path: str):
+    # Unlike os.rename, existing files are never overwritten. Only moves to another device copy the file.
+    try:
+        _rename_no_replace(source_path, destination_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_file(source_path, destination_path)
+        os.unlink(source_path)
+
+
+class ApplyEngine:
+    def __init__(self, workers_per_device: int = DEFAULT_WORKERS_PER_DEVICE):
+        self._workers_per_device = workers_per_device
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def plan(self, assignments: dict) -> tuple:
+        # Groups moves by destination device, each device gets its own workers. Files moved to the same
+        # destination path as an earlier one are rejected, (source path, reason) for each of them.
+        device_of_folder = {}
+        groups = {}
+        rejected = []
+        planned_destinations = set()
+        for file_path, folder_path in assignments.items():
+            destination_path = get_destination_path(file_path, folder_path)
+            normalized_destination_path = os.path.normcase(destination_path)
+            if normalized_destination_path in planned_destinations:
+                rejected.append((file_path, f"Another file is moved to {destination_path}"))
+                continue
+            planned_destinations.add(normalized_destination_path)
+            if folder_path not in device_of_folder:
+                try:
+                    device_of_folder[folder_path] = os.stat(folder_path).st_dev
+                except OSError:
+                    device_of_folder[folder_path] = None
+            groups.setdefault(device_of_folder[folder_path], []).append((file_path, destination_path))
+        return groups, rejected
+
+    def run(self, assignments: dict,
+            progress_callback: Optional[Callable[[ApplyProgress], None]] = None,
+            journal: Optional[MoveJournal] = None, batch_id: Optional[int] = None,
+            reverts: Optional[int] = None) -> ApplyResult:
+        # With a journal, the moves are recorded in a new batch, or in batch_id when resuming one
+        with tracing.span("apply", "apply", {"n_files": len(assignments)}):
+            return self._run(assignments, progress_callback, journal, batch_id, reverts)
+
+    def _run(self, assignments: dict, progress_callback: Optional[Callable[[ApplyProgress], None]],
+             journal: Optional[MoveJournal], batch_id: Optional[int], reverts: Optional[int]) -> ApplyResult:
+        self._cancelled.clear()
+        result = ApplyResult()
+        progress = ApplyProgress(n_total=len(assignments))
+        start_time = time.monotonic()
+        last_report = 0.0
+
+        def move(source_path: str, destination_path: str) -> int:
+            if self._cancelled.is_set():
+                raise InterruptedError("Cancelled")
+            with tracing.span("move", "apply"):
+                size = os.lstat(source_path).st_size
+                move_file(source_path, destination_path)
+            return size
+
+        def report(force: bool = False):
+            nonlocal last_report
+            now = time.monotonic()
+            if progress_callback is None or (not force and now - last_report < PROGRESS_INTERVAL):
+                return
+            last_report = now
+            progress.elapsed = now - start_time
+            progress_callback(ApplyProgress(progress.n_done, progress.n_total, progress.bytes_done, progress.elapsed))
+
+        plan, rejected = self.plan(assignments)
+        progress.n_done += len(rejected)
+        result.failed.extend(rejected)
+        if journal is not None and batch_id is None:
+            batch_id = journal.begin_batch([move for moves in plan.values() for move in moves], reverts)
+        result.batch_id = batch_id
+
+        executors = []
+        futures = {}
+        try:
+            for device, moves in plan.items():
+                executor = ThreadPoolExecutor(max_workers=self._workers_per_device)
+                executors.append(executor)
+                for source_path, destination_path in moves:
+                    futures[executor.submit(move, source_path, destination_path)] = (source_path, destination_path)
+
+            for future in as_completed(futures):
+                source_path, destination_path = futures[future]
+                progress.n_done += 1
+                try:
+                    progress.bytes_done += future.result()
+                    result.moved.append((source_path, destination_path))
+                    if journal is not None:
+                        journal.record_done(batch_id, source_path)
+                except InterruptedError:
+                    pass
+                except OSError as e:
+                    logging.error(f"Could not move {source_path} to {destination_path}: {e}")
+                    result.failed.append((source_path, str(e)))
+                report()
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+            if journal is not None:
+                journal.end_batch(batch_id)
+        report(True)
+        return result
@@ -0,0 +1,37 @@
+from typing import Optional
+
+from PySide6.QtCore import QObject, QThreadPool, Signal
+
+from src.core.apply_engine import ApplyEngine, DEFAULT_WORKERS_PER_DEVICE
+from src.core.move_journal import MoveJournal
+
+
+class ApplyTask(QObject):
+    # Runs the apply engine off the GUI thread, the signals are delivered on the GUI thread
+    progress = Signal(object)
+    finished = Signal(object)
+
+    def __init__(self, assignments: dict, workers_per_device: int = DEFAULT_WORKERS_PER_DEVICE,
+                 journal: Optional[MoveJournal] = None, batch_id: Optional[int] = None,
+                 reverts: Optional[int] = None):
+        super().__init__()
+        self._assignments = assignments
+        self._journal = journal
+        self._batch_id = batch_id
+        self._reverts = reverts
+        self._engine = ApplyEngine(workers_per_device)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+    def start(self):
+        self._pool.start(self._run)
+
+    def cancel(self):
+        self._engine.cancel()
+
+    def wait_for_done(self):
+        self._pool.waitForDone()
+
+    def _run(self):
+        result = self._engine.run(self._assignments, self.progress.emit, self._journal, self._batch_id, self._reverts)
+        self.finished.emit(result)
@@ -0,0 +1,199 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from src.core.apply_engine import DEFAULT_WORKERS_PER_DEVICE
+from src.core.file_moving_manager import FileMovingManager
+from src.core.metadata_index import FileMetadata, parse_metadata_filter, read_metadata
+from src.core.move_journal import MoveJournal
+
+RULE_SEPARATOR = "->"
+# Files whose rules are evaluated together
+EVALUATION_CHUNK_SIZE = 512
+DEFAULT_EVALUATION_WORKERS = 8
+# Moves are applied every this many matched files, so moving starts long before the walk ends
+DEFAULT_APPLY_BATCH_SIZE = 10000
+# Conditions on these fields are answered by stat, the others need the file header
+_STAT_FIELDS = {"size", "mtime"}
+
+
+@dataclass
+class SortingRule:
+    # Files matching everything that is set go to destination
+    destination: str
+    name_pattern: Optional[re.Pattern] = None
+    path_pattern: Optional[re.Pattern] = None
+    extensions: Optional[set] = None
+    conditions: list = field(default_factory=list)
+
+    def needs_header(self) -> bool:
+        return any(condition.field not in _STAT_FIELDS for condition in self.conditions)
+
+    def matches(self, file_path: str, metadata: Optional[FileMetadata]) -> bool:
+        if self.extensions is not None and os.path.splitext(file_path)[1][1:].lower() not in self.extensions:
+            return False
+        if self.name_pattern is not None and self.name_pattern.match(os.path.basename(file_path)) is None:
+            return False
+        if self.path_pattern is not None and self.path_pattern.match(file_path) is None:
+            return False
+        return all(condition.matches(metadata) for condition in self.conditions)
+
+
+def parse_rule(text: str) -> SortingRule:
+    # "ext:jpg,png name:^IMG_ size>2M date>=2021-01-01 -> /photos/2021". name: and path: are regexes
+    # matched against the file name and the full path, the rest are metadata conditions.
+    # Raises ValueError for rules that can't be understood.
+    if RULE_SEPARATOR not in text:
+        raise ValueError(f"Rule {text} has no destination, use <conditions> {RULE_SEPARATOR} <destination>")
+    predicates, destination = text.rsplit(RULE_SEPARATOR, 1)
+    destination = destination.strip()
+    if not destination:
+        raise ValueError(f"Rule {text} has no destination")
+    rule = SortingRule(os.path.abspath(os.path.expanduser(destination)))
+    metadata_conditions = []
+    for predicate in predicates.split():
+        try:
+            if predicate.startswith("name:"):
+                rule.name_pattern = re.compile(predicate[len("name:"):])
+            elif predicate.startswith("path:"):
+                rule.path_pattern = re.compile(predicate[len("path:"):])
+            elif predicate.startswith("ext:"):
+                rule.extensions = {extension.lower().lstrip(".")
+                                   for extension in predicate[len("ext:"):].split(",") if extension}
+            else:
+                metadata_conditions.append(predicate)
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in {predicate}: {e}")
+    rule.conditions = parse_metadata_filter(" ".join(metadata_conditions))
+    return rule
+
+
+def load_rules(file_path: str) -> list:
+    # One rule per line, empty lines and lines starting with # are skipped
+    rules = []
+    with open(file_path, "r") as rules_file:
+        for line_number, line in enumerate(rules_file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                rules.append(parse_rule(line))
+            except ValueError as e:
+                raise ValueError(f"{file_path}:{line_number}: {e}")
+    return rules
+
+
+def iter_files(source_folders: list, recursive: bool = False, excluded_folders: Optional[set] = None) -> Iterator:
+    # Yields the files as they are found, without listing the whole tree first
+    excluded_folders = {os.path.abspath(folder_path) for folder_path in excluded_folders or ()}
+    folders = [os.path.abspath(folder_path) for folder_path in reversed(source_folders)]
+    while folders:
+        folder_path = folders.pop()
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            yield entry.path
+                        elif recursive and entry.is_dir(follow_symlinks=False) and \
+                                entry.path not in excluded_folders:
+                            folders.append(entry.path)
+                    except OSError as e:
+                        logging.warning(f"Could not read {entry.path}: {e}")
+        except OSError as e:
+            logging.warning(f"Could not list {folder_path}: {e}")
+
+
+@dataclass
+class BatchSortResult:
+    n_files: int = 0
+    # Destination folder -> number of files that matched its rule
+    n_planned: dict = field(default_factory=dict)
+    moved: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+
+
+class BatchSorter:
+    # Sorts files by the first rule they match, without the UI. The moves go through FileMovingManager,
+    # the same assignment and apply path as in the window, and are journaled when a journal is given.
+    def __init__(self, rules: list, evaluation_workers: int = DEFAULT_EVALUATION_WORKERS,
+                 workers_per_device: int = DEFAULT_WORKERS_PER_DEVICE, journal: Optional[MoveJournal] = None,
+                 apply_batch_size: int = DEFAULT_APPLY_BATCH_SIZE):
+        self._rules = rules
+        self._needs_header = any(rule.needs_header() for rule in rules)
+        self._evaluation_workers = evaluation_workers
+        self._workers_per_device = workers_per_device
+        self._journal = journal
+        self._apply_batch_size = apply_batch_size
+        self._file_manager = FileMovingManager()
+
+    def find_destination(self, file_path: str) -> Optional[str]:
+        metadata = None
+        try:
+            stat = os.stat(file_path)
+            # Reading the header is the slow part, it's skipped when stat answers every condition
+            metadata = read_metadata(file_path, stat) if self._needs_header else \
+                FileMetadata(stat.st_size, stat.st_mtime)
+        except OSError as e:
+            logging.warning(f"Could not read {file_path}: {e}")
+        for rule in self._rules:
+            if rule.matches(file_path, metadata):
+                # Files already in their destination stay
+                if os.path.dirname(file_path) == rule.destination:
+                    return None
+                return rule.destination
+        return None
+
+    def run(self, source_folders: list, recursive: bool = False, dry_run: bool = False,
+            on_planned: Optional[Callable[[str, str], None]] = None) -> BatchSortResult:
+        result = BatchSortResult()
+        destinations = {rule.destination for rule in self._rules}
+
+        with ThreadPoolExecutor(self._evaluation_workers) as executor:
+            # The next chunk is walked while the previous one is evaluated
+            evaluating = None
+            chunk = []
+            for file_path in iter_files(source_folders, recursive, destinations):
+                chunk.append(file_path)
+                if len(chunk) >= EVALUATION_CHUNK_SIZE:
+                    submitted = (chunk, executor.map(self.find_destination, chunk))
+                    if evaluating is not None:
+                        self._collect(*evaluating, result, dry_run, on_planned)
+                    evaluating = submitted
+                    chunk = []
+            if evaluating is not None:
+                self._collect(*evaluating, result, dry_run, on_planned)
+            self._collect(chunk, executor.map(self.find_destination, chunk), result, dry_run, on_planned)
+        if not dry_run:
+            self._apply(result)
+        return result
+
+    def _collect(self, chunk: list, folder_paths: Iterator, result: BatchSortResult, dry_run: bool,
+                 on_planned: Optional[Callable[[str, str], None]]):
+        result.n_files += len(chunk)
+        for file_path, folder_path in zip(chunk, folder_paths):
+            if folder_path is None:
+                continue
+            result.n_planned[folder_path] = result.n_planned.get(folder_path, 0) + 1
+            if on_planned is not None:
+                on_planned(file_path, folder_path)
+            if not dry_run:
+                self._file_manager.add_assignment(file_path, folder_path)
+        if not dry_run and self._file_manager.get_n_of_assignments() >= self._apply_batch_size:
+            self._apply(result)
+
+    def _apply(self, result: BatchSortResult):
+        if self._file_manager.get_n_of_assignments() == 0:
+            return
+        for folder_path in set(self._file_manager.get_all_assignments().values()):
+            os.makedirs(folder_path, exist_ok=True)
+        apply_result = self._file_manager.apply_assignments(workers_per_device=self._workers_per_device,
+                                                            journal=self._journal)
+        result.moved.extend(apply_result.moved)
+        result.failed.extend(apply_result.failed)
+        # Failed files are reported once instead of being retried with every batch
+        for file_path, error in apply_result.failed:
+            self._file_manager.remove_assignment(file_path)
@@ -1,84 +1,740 @@
-import logging
+import fnmatch
 import os
 import re
-from typing import Optional
+import threading
+from array import array
+from contextlib import nullcontext
+from itertools import compress, islice
+from operator import attrgetter
+from typing import Callable, Optional
+
+from src.core import tracing
+from src.core.apply_engine import ApplyEngine, ApplyProgress, ApplyResult, DEFAULT_WORKERS_PER_DEVICE
+from src.core.file_table import FileTable
+from src.core.metadata_index import MetadataIndex, SORT_KEYS, SORT_NAME, get_name_sort_key
+from src.core.move_journal import MoveJournal
+from src.core.session_store import SessionStore
+from src.core.source_traversal import SourceRoot, walk_sources
+
+LISTING_BATCH_SIZE = 1000
+# Destination index of files that are not assigned
+NO_ASSIGNMENT = -1
+
+FILTER_SYNTAX_REGEX = "regex"
+FILTER_SYNTAX_GLOB = "glob"
+
+_QUANTIFIER_CHARACTERS = "*+?{"
+# Regexes that re.match accepts for every path, the default filter among them
+_MATCH_ALL_PATTERNS = ("", ".*")
+
+
+def compile_filter(pattern: str, syntax: str = FILTER_SYNTAX_REGEX) -> re.Pattern:
+    if syntax == FILTER_SYNTAX_GLOB:
+        return re.compile(fnmatch.translate(pattern))
+    elif syntax == FILTER_SYNTAX_REGEX:
+        return re.compile(pattern)
+    raise Exception(f"Unknown filter syntax {syntax}")
+
+
+def is_filter_refinement(old_pattern: str, new_pattern: str) -> bool:
+    # Filters use re.match, so appending to a regex can only narrow the matches down, as long as
+    # the addition does not alternate with or quantify what was already there
+    if not new_pattern.startswith(old_pattern) or old_pattern.endswith("\\"):
+        return False
+    addition = new_pattern[len(old_pattern):]
+    if "{" in old_pattern and "}" in addition:
+        return False
+    return "|" not in addition and not addition.startswith(tuple(_QUANTIFIER_CHARACTERS))
 
 
 class FileMovingManager:
-    def __init__(self, default_filter: str = ".*"):
+    def __init__(self, default_filter: str = ".*", filter_syntax: str = FILTER_SYNTAX_REGEX,
+                 filter_match_basename: bool = False, session_store: Optional[SessionStore] = None,
+                 metadata_index: Optional[MetadataIndex] = None):
         self._current_source_folder_path = None
-        self._source_files = []
+        # Set for every source, _current_source_folder_path only when a single folder is listed without sub folders
+        self._current_source_roots: list[SourceRoot] = []
+        # Folders whose files are in the source
+        self._listed_folders: set[str] = set()
+        # Files are kept as IDs of the file table, their paths are built when they are asked for.
+        # Every listed file, the filter is applied to it in memory.
+        self._files = FileTable()
+        self._all_source_files = array("i")
+        self._source_files = array("i")
+        # Indexed by file ID, whether the file is in _all_source_files
+        self._listed = bytearray()
         self._regex_filter = default_filter
+        self._filter_syntax = filter_syntax
+        self._filter_match_basename = filter_match_basename
+        self._filter_pattern = compile_filter(default_filter, filter_syntax)
+
+        # Sorting and metadata conditions are applied from the index, files are never statted for them
+        self._metadata_index = metadata_index
+        self._sort_key: Optional[str] = None
+        self._sort_reverse = False
+        self._metadata_conditions = []
+        self._order_outdated = False
+
+        # The source folder is listed in a background thread, the list grows while it runs
+        self._lock = threading.RLock()
+        self._listing_generation = 0
+        self._listing_thread: Optional[threading.Thread] = None
+        self._changed_while_listing = set()
+        # Old path -> new path of files that are being replaced on disk, see start_renaming
+        self._renaming: dict[str, str] = {}
 
         self._destination_folder_paths = []
-        self._file_assignments = {}
+        # Indexed by file ID, the index of the assigned folder in _assigned_folders or NO_ASSIGNMENT
+        self._file_assignments = array("i")
+        self._assigned_file_sizes = array("q")
+        self._n_assignments = 0
+        # Folders files are assigned to, with the number and the size of the files assigned to each of them
+        self._assigned_folders: list[str] = []
+        self._assigned_folder_indexes: dict[str, int] = {}
+        self._destination_counts: list[int] = []
+        self._destination_sizes: list[int] = []
+        self._assignments_version = 0
+
+        # Assignments and destinations are written through to the session store as they change
+        self._session_store = session_store
+        if session_store is not None:
+            self._destination_folder_paths = [folder_path for folder_path in session_store.load_destinations()
+                                              if os.path.isdir(folder_path)]
 
     def refresh_sources(self):
-        self.set_current_source(self._current_source_folder_path)
+        self.set_current_sources(self._current_source_roots)
 
     def get_regex_filter(self) -> str:
         return self._regex_filter
 
     def set_regex_filter(self, new_regex: str):
-        self._regex_filter = new_regex
+        self.set_filter(new_regex, self._filter_syntax, self._filter_match_basename)
 
-    def add_assignment(self, file_path: str, new_folder_path: str):
-        self._file_assignments[file_path] = new_folder_path
+    def get_filter_syntax(self) -> str:
+        return self._filter_syntax
 
-    def get_assignment(self, file_path: str) -> Optional[str]:
-        if file_path in self._file_assignments:
-            return self._file_assignments[file_path]
+    def get_filter_match_basename(self) -> bool:
+        return self._filter_match_basename
+
+    def set_filter(self, pattern: str, syntax: str = FILTER_SYNTAX_REGEX, match_basename: bool = False):
+        # Raises re.error for invalid patterns, the current filter is kept in that case
+        new_filter_pattern = compile_filter(pattern, syntax)
+        with self._lock, tracing.span("filter", "sources", {"pattern": pattern}):
+            narrowing = (syntax == self._filter_syntax == FILTER_SYNTAX_REGEX and
+                         match_basename == self._filter_match_basename and
+                         is_filter_refinement(self._regex_filter, pattern))
+            self._regex_filter = pattern
+            self._filter_syntax = syntax
+            self._filter_match_basename = match_basename
+            self._filter_pattern = new_filter_pattern
+            if narrowing:
+                self._source_files = self._filter_files(self._source_files)
+            else:
+                self._source_files = self._filter_files(self._all_source_files)
+
+    def add_assignment(self, file_path: str, new_folder_path: str, file_size: Optional[int] = None):
+        with self._lock:
+            file_id = self._add_file(file_path)
+            folder_index = self._file_assignments[file_id]
+            if folder_index != NO_ASSIGNMENT and self._assigned_folders[folder_index] == new_folder_path:
+                return
+            if file_size is None and self._metadata_index is not None:
+                metadata = self._metadata_index.get_metadata(file_path)
+                if metadata is not None:
+                    file_size = metadata.size
+            if file_size is None:
+                try:
+                    file_size = os.stat(file_path).st_size
+                except OSError:
+                    file_size = 0
+            self._assign(file_id, new_folder_path, file_size)
+            if self._session_store is not None:
+                self._session_store.record_assignment(self._current_source_folder_path or os.path.dirname(file_path),
+                                                      file_path, new_folder_path, file_size)
+
+    def add_assignments(self, file_paths: list, new_folder_path: str):
+        # Assigns many files at once, the session store writes them in one transaction
+        with self._lock, self._session_batch():
+            for file_path in file_paths:
+                self.add_assignment(file_path, new_folder_path)
+
+    def _assign(self, file_id: int, new_folder_path: str, file_size: int):
+        self._unassign_file(file_id)
+        folder_index = self._assigned_folder_indexes.get(new_folder_path)
+        if folder_index is None:
+            folder_index = len(self._assigned_folders)
+            self._assigned_folders.append(new_folder_path)
+            self._assigned_folder_indexes[new_folder_path] = folder_index
+            self._destination_counts.append(0)
+            self._destination_sizes.append(0)
+        self._file_assignments[file_id] = folder_index
+        self._assigned_file_sizes[file_id] = file_size
+        self._n_assignments += 1
+        self._assignments_version += 1
+        self._destination_counts[folder_index] += 1
+        self._destination_sizes[folder_index] += file_size
+
+    def _unassign(self, file_path: str, record: bool = True):
+        with self._lock:
+            file_id = self._files.get_id(file_path)
+            if file_id is None or not self._unassign_file(file_id):
+                return
+            self._release_if_unused(file_id)
+            if record and self._session_store is not None:
+                self._session_store.record_unassignment(file_path)
+
+    def _unassign_file(self, file_id: int) -> bool:
+        # Returns whether the file was assigned
+        folder_index = self._file_assignments[file_id]
+        if folder_index == NO_ASSIGNMENT:
+            return False
+        self._file_assignments[file_id] = NO_ASSIGNMENT
+        self._n_assignments -= 1
+        self._assignments_version += 1
+        self._destination_counts[folder_index] -= 1
+        self._destination_sizes[folder_index] -= self._assigned_file_sizes[file_id]
+        self._assigned_file_sizes[file_id] = 0
+        return True
+
+    def _restore_session(self, source_folder_path: str):
+        if self._session_store is None:
+            return
+        with self._lock:
+            for file_path, folder_path, file_size in self._session_store.load_assignments(source_folder_path):
+                file_id = self._add_file(file_path)
+                if self._file_assignments[file_id] == NO_ASSIGNMENT:
+                    self._assign(file_id, folder_path, file_size)
+
+    def _add_file(self, file_path: str) -> int:
+        file_id = self._files.add(file_path)
+        if file_id >= len(self._listed):
+            self._grow_file_arrays()
+        return file_id
+
+    def _add_files(self, file_paths: list) -> array:
+        file_ids = self._files.add_all(file_paths)
+        self._grow_file_arrays()
+        return file_ids
+
+    def _grow_file_arrays(self):
+        # The arrays indexed by file ID cover every ID of the file table
+        n_missing = self._files.get_capacity() - len(self._listed)
+        if n_missing > 0:
+            self._listed.extend(bytes(n_missing))
+            self._assigned_file_sizes.extend(array("q", [0]) * n_missing)
+            self._file_assignments.extend(array("i", [NO_ASSIGNMENT]) * n_missing)
+
+    def _release_if_unused(self, file_id: int):
+        # Files that are neither listed nor assigned are forgotten, their IDs are reused
+        if not self._listed[file_id] and self._file_assignments[file_id] == NO_ASSIGNMENT:
+            self._files.release(file_id)
+
+    def _get_assigned_files(self, folder_index: Optional[int] = None) -> list:
+        # The files assigned to the folder, or to any folder without one, in one pass over the assignments
+        if not self._n_assignments:
+            return []
+        if folder_index is None:
+            is_assigned = map(NO_ASSIGNMENT.__ne__, self._file_assignments)
         else:
-            return None
+            is_assigned = map(folder_index.__eq__, self._file_assignments)
+        return list(compress(range(len(self._file_assignments)), is_assigned))
+
+    def get_sort(self) -> tuple:
+        return self._sort_key, self._sort_reverse
+
+    def set_sort(self, key: Optional[str], reverse: bool = False):
+        # Without a key the files keep the order they are in
+        if key is not None and key not in SORT_KEYS:
+            raise Exception(f"Unknown sort key {key}")
+        if key not in (None, SORT_NAME) and self._metadata_index is None:
+            raise Exception(f"Sorting by {key} needs the metadata index")
+        with self._lock:
+            self._sort_key = key
+            self._sort_reverse = reverse
+            self._apply_order()
+
+    def get_metadata_filter(self) -> list:
+        return self._metadata_conditions
+
+    def set_metadata_filter(self, conditions: list):
+        # Conditions from parse_metadata_filter, all of them have to match
+        if conditions and self._metadata_index is None:
+            raise Exception("Filtering by metadata needs the metadata index")
+        with self._lock:
+            self._metadata_conditions = conditions
+            self._apply_order()
+
+    def is_indexing_metadata(self) -> bool:
+        return self._metadata_index is not None and self._metadata_index.is_indexing()
+
+    def update_order(self) -> bool:
+        # Sorts and filters again once more files or their metadata are known, returns whether anything was done
+        with self._lock:
+            if not self._order_outdated:
+                return False
+            self._apply_order()
+        return True
+
+    def _apply_order(self):
+        with tracing.span("order", "sources", {"n_files": len(self._all_source_files)}):
+            self._sort_and_filter()
+
+    def _sort_and_filter(self):
+        if self._sort_key == SORT_NAME:
+            key_function = get_name_sort_key
+        elif self._sort_key is not None:
+            key_function = self._metadata_index.get_sort_key(self._sort_key)
+        if self._sort_key is not None:
+            file_ids = self._all_source_files
+            keys = [key_function(file_path) for file_path in self._files.get_paths(file_ids)]
+            order = sorted(range(len(file_ids)), key=keys.__getitem__, reverse=self._sort_reverse)
+            if self._sort_reverse:
+                # Files without metadata stay at the end
+                order = [index for index in order if not keys[index][0]] + \
+                        [index for index in order if keys[index][0]]
+            self._all_source_files = array("i", [file_ids[index] for index in order])
+        self._source_files = self._filter_files(self._all_source_files)
+        self._order_outdated = False
+
+    def _mark_order_outdated(self):
+        with self._lock:
+            if self._sort_key is not None or self._metadata_conditions:
+                self._order_outdated = True
+
+    def _session_batch(self):
+        return self._session_store.batch() if self._session_store is not None else nullcontext()
+
+    def get_assignments_version(self) -> int:
+        # Changes whenever any assignment does, so views can skip refreshing when nothing happened
+        return self._assignments_version
+
+    def get_n_of_assignments(self) -> int:
+        return self._n_assignments
+
+    def get_n_of_assignments_to(self, folder_path: str) -> int:
+        folder_index = self._assigned_folder_indexes.get(folder_path)
+        return 0 if folder_index is None else self._destination_counts[folder_index]
+
+    def get_size_of_assignments_to(self, folder_path: str) -> int:
+        folder_index = self._assigned_folder_indexes.get(folder_path)
+        return 0 if folder_index is None else self._destination_sizes[folder_index]
+
+    def get_files_assigned_to(self, folder_path: str) -> set:
+        with self._lock:
+            folder_index = self._assigned_folder_indexes.get(folder_path)
+            if folder_index is None:
+                return set()
+            return set(self._files.get_paths(self._get_assigned_files(folder_index)))
+
+    def get_assignment(self, file_path: str) -> Optional[str]:
+        # The listing thread changes the file table, it is only read under the lock
+        with self._lock:
+            file_id = self._files.get_id(file_path)
+            if file_id is None:
+                return None
+            folder_index = self._file_assignments[file_id]
+            return None if folder_index == NO_ASSIGNMENT else self._assigned_folders[folder_index]
 
     def get_file_on_index(self, index) -> str:
-        return self._source_files[index]
+        with self._lock:
+            return self._files.get_path(self._source_files[index])
+
+    def get_index_of_file(self, file_path: str) -> Optional[int]:
+        with self._lock:
+            file_id = self._files.get_id(file_path)
+            if file_id is None:
+                return None
+            try:
+                return self._source_files.index(file_id)
+            except ValueError:
+                return None
+
+    def get_files_in_current_source(self, file_paths: list) -> list:
+        # The given files that are in the current source, one pass over the source for all of them
+        with self._lock:
+            in_source = bytearray(self._files.get_capacity())
+            for file_id in self._source_files:
+                in_source[file_id] = 1
+            file_ids = (self._files.get_id(file_path) for file_path in file_paths)
+            return [file_path for file_path, file_id in zip(file_paths, file_ids)
+                    if file_id is not None and in_source[file_id]]
 
     def set_file_on_index(self, index, file_path):
-        self._source_files[index] = file_path
+        with self._lock:
+            old_file_id = self._source_files[index]
+            file_id = self._add_file(file_path)
+            self._source_files[index] = file_id
+            self._all_source_files[self._all_source_files.index(old_file_id)] = file_id
+            self._listed[old_file_id] = 0
+            self._listed[file_id] = 1
+            self._release_if_unused(old_file_id)
 
     def get_all_assignments(self) -> dict:
-        return self._file_assignments
+        # File path -> folder path, built when it is asked for
+        with self._lock:
+            return {self._files.get_path(file_id): self._assigned_folders[folder_index]
+                    for file_id, folder_index in enumerate(self._file_assignments) if folder_index != NO_ASSIGNMENT}
 
     def add_destination(self, folder_path: str):
-        self._destination_folder_paths.append(folder_path)
+        if folder_path not in self._destination_folder_paths:
+            self._destination_folder_paths.append(folder_path)
+            if self._session_store is not None:
+                self._session_store.record_destination(folder_path)
 
     def remove_destination(self, folder_path_to_remove: str):
         # check if the folder is used
-        for file_path in self._file_assignments:
-            if self._file_assignments[file_path] == folder_path_to_remove:
-                raise Exception(f"{file_path} is assigned to this folder!")
+        if self.get_n_of_assignments_to(folder_path_to_remove) > 0:
+            folder_index = self._assigned_folder_indexes[folder_path_to_remove]
+            assigned_file_path = self._files.get_path(self._file_assignments.index(folder_index))
+            raise Exception(f"{assigned_file_path} is assigned to this folder!")
         self._destination_folder_paths.remove(folder_path_to_remove)
+        if self._session_store is not None:
+            self._session_store.record_destination_removal(folder_path_to_remove)
 
     def set_current_source(self, source_folder_path: Optional[str]):
+        with self._lock:
+            self._listing_generation += 1
+            self._clear_listing()
+            self._changed_while_listing = set()
+            self._listing_thread = None
+
         if not source_folder_path:
-            self._source_files = []
             self._current_source_folder_path = None
-        elif os.path.isdir(source_folder_path):
-            self._source_files = [os.path.join(source_folder_path, file_path) for file_path in
-                                  os.listdir(source_folder_path)]
+            self._current_source_roots = []
+            self._listed_folders = set()
+            if self._metadata_index is not None:
+                self._metadata_index.set_folder(None)
+            return
+        elif not os.path.isdir(source_folder_path):
+            raise Exception("Invalid source")
+        self._current_source_folder_path = source_folder_path
+        self._current_source_roots = [SourceRoot(source_folder_path, 0)]
+        self._listed_folders = {source_folder_path}
+        if self._metadata_index is not None:
+            self._metadata_index.set_folders([], self._mark_order_outdated)
+        self._restore_session(source_folder_path)
 
-            self._current_source_folder_path = source_folder_path
+        # The first match is listed right away, so it can be shown while the rest is still being listed
+        entries = os.scandir(source_folder_path)
+        listed_entries = []
+        for entry in entries:
+            listed_entries.append(entry)
+            file_id = self._add_file(entry.path)
+            self._all_source_files.append(file_id)
+            self._listed[file_id] = 1
+            if self._matches_filter(entry.path):
+                self._source_files.append(file_id)
+                break
         else:
-            raise Exception("Invalid source")
+            entries.close()
+            self._index_entries(source_folder_path, listed_entries, True, self._listing_generation)
+            self._drop_unlisted_assignments(self._listing_generation)
+            self._mark_order_outdated()
+            return
+        self._index_entries(source_folder_path, listed_entries, False, self._listing_generation)
 
-        def regex_filter(path):
-            return bool(re.match(self._regex_filter, path))
+        self._listing_thread = threading.Thread(target=self._list_remaining_files,
+                                                args=(source_folder_path, entries, self._listing_generation),
+                                                daemon=True)
+        self._listing_thread.start()
 
-        self._source_files = list(filter(regex_filter, self._source_files))
+    def _list_remaining_files(self, folder_path: str, entries, generation: int):
+        with entries:
+            while True:
+                batch = list(islice(entries, LISTING_BATCH_SIZE))
+                if generation != self._listing_generation:
+                    return
+                last = len(batch) < LISTING_BATCH_SIZE
+                self._extend_listing(list(map(attrgetter("path"), batch)), generation)
+                self._index_entries(folder_path, batch, last, generation)
+                if last:
+                    break
+        self._drop_unlisted_assignments(generation)
+        if generation == self._listing_generation:
+            self._mark_order_outdated()
 
-    def apply_assignments(self):
-        for file_path in self._file_assignments:
-            base_name = os.path.basename(file_path)
-            new_file_path = os.path.join(self._file_assignments[file_path], base_name)
-            try:
-                os.rename(file_path, new_file_path)
-            except FileExistsError:
-                logging.error(f"Could not move {file_path} to {new_file_path}")
-                raise
+    def _index_entries(self, folder_path: str, entries: list, last: bool, generation: int):
+        # The metadata index reads the entries of the listing instead of listing the folder again
+        with self._lock:
+            if generation == self._listing_generation and self._metadata_index is not None:
+                self._metadata_index.add_entries(folder_path, entries, last)
+
+    def get_current_sources(self) -> list:
+        return list(self._current_source_roots)
+
+    def get_listed_folders(self) -> list:
+        return sorted(self._listed_folders)
+
+    def set_current_sources(self, roots: list):
+        # Lists several folders, each with its sub folders down to the max_depth of its SourceRoot.
+        # The folders are listed in parallel, the files are added in the same order every time, see walk_sources.
+        if not roots or (len(roots) == 1 and roots[0].max_depth == 0):
+            self.set_current_source(roots[0].folder_path if roots else None)
+            return
+        for root in roots:
+            if not os.path.isdir(root.folder_path):
+                raise Exception(f"Invalid source {root.folder_path}")
+        with self._lock:
+            self._listing_generation += 1
+            self._clear_listing()
+            self._changed_while_listing = set()
+            self._current_source_folder_path = None
+            self._current_source_roots = list(roots)
+            self._listed_folders = set()
+            if self._metadata_index is not None:
+                self._metadata_index.set_folders([], self._mark_order_outdated)
+            self._listing_thread = threading.Thread(target=self._walk_sources,
+                                                    args=(list(roots), self._listing_generation), daemon=True)
+        self._listing_thread.start()
+
+    def _walk_sources(self, roots: list, generation: int):
+        def on_folder_listed(folder_path: str, file_entries: list):
+            # Assignments are stored by the folder of the file, they are restored folder by folder
+            with self._lock:
+                if generation != self._listing_generation:
+                    return
+                self._listed_folders.add(folder_path)
+                self._restore_session(folder_path)
+            self._index_entries(folder_path, file_entries, True, generation)
+
+        # Files moved to a destination inside a source don't show up again
+        if walk_sources(roots, lambda file_paths: self._extend_listing(file_paths, generation), on_folder_listed,
+                        lambda: generation != self._listing_generation, set(self._destination_folder_paths)):
+            self._drop_unlisted_assignments(generation)
+            if generation == self._listing_generation:
+                self._mark_order_outdated()
+
+    def _extend_listing(self, file_paths: list, generation: int):
+        with self._lock:
+            if generation != self._listing_generation:
+                return
+            if self._changed_while_listing:
+                file_paths = [file_path for file_path in file_paths if file_path not in self._changed_while_listing]
+            file_ids = self._add_files(file_paths)
+            first_id = file_ids[0] if file_ids else 0
+            if file_ids == array("i", range(first_id, first_id + len(file_ids))):
+                # New files get consecutive IDs
+                self._listed[first_id:first_id + len(file_ids)] = b"\1" * len(file_ids)
+            else:
+                for file_id in file_ids:
+                    self._listed[file_id] = 1
+            self._all_source_files.extend(file_ids)
+            self._source_files.extend(self._filter_files(file_ids, file_paths))
+
+    def _clear_listing(self):
+        # Files that are only known from the listing are forgotten, the assigned ones move to a new file table
+        self._all_source_files = array("i")
+        self._source_files = array("i")
+        assigned_files = self._get_assigned_files()
+        files = FileTable()
+        file_ids = files.add_all(self._files.get_paths(assigned_files))
+        file_assignments = array("i", [NO_ASSIGNMENT]) * files.get_capacity()
+        assigned_file_sizes = array("q", [0]) * files.get_capacity()
+        for file_id, old_file_id in zip(file_ids, assigned_files):
+            file_assignments[file_id] = self._file_assignments[old_file_id]
+            assigned_file_sizes[file_id] = self._assigned_file_sizes[old_file_id]
+        self._files = files
+        self._listed = bytearray(files.get_capacity())
+        self._file_assignments = file_assignments
+        self._assigned_file_sizes = assigned_file_sizes
+
+    def _drop_unlisted_assignments(self, generation: int):
+        # Restored assignments of files that were moved or deleted while the program was closed
+        with self._lock:
+            if generation != self._listing_generation:
+                return
+            stale_files = [self._files.get_path(file_id) for file_id in self._get_assigned_files()
+                           if not self._listed[file_id] and self._files.get_folder(file_id) in self._listed_folders]
+            with self._session_batch():
+                for file_path in stale_files:
+                    self._unassign(file_path)
+
+    def stop_listing(self):
+        # Waits until the listing and indexing threads stopped, they don't change anything afterwards
+        with self._lock:
+            self._listing_generation += 1
+            listing_thread = self._listing_thread
+        if listing_thread is not None:
+            listing_thread.join()
+        if self._metadata_index is not None:
+            self._metadata_index.stop()
+
+    def is_listing(self) -> bool:
+        listing_thread = self._listing_thread
+        return listing_thread is not None and listing_thread.is_alive()
+
+    def wait_for_listing(self):
+        listing_thread = self._listing_thread
+        if listing_thread is not None:
+            listing_thread.join()
+        if self._metadata_index is not None and (self._sort_key is not None or self._metadata_conditions):
+            self._metadata_index.wait_for_indexing()
+        self.update_order()
+
+    def _matches_file(self, file_id: int) -> bool:
+        return self._matches_filter(self._files.get_path(file_id))
+
+    def _filter_files(self, file_ids: array, file_paths: Optional[list] = None) -> array:
+        # The listing passes the paths it has, otherwise they are built for all files at once. Without metadata
+        # conditions the pattern is matched without a Python call per file.
+        if self._metadata_conditions:
+            if file_paths is None:
+                file_paths = self._files.get_paths(file_ids)
+            return array("i", compress(file_ids, map(self._matches_filter, file_paths)))
+        if self._filter_pattern.pattern in _MATCH_ALL_PATTERNS:
+            return array("i", file_ids)
+        if self._filter_match_basename:
+            file_paths = self._files.get_names(file_ids)
+        elif file_paths is None:
+            file_paths = self._files.get_paths(file_ids)
+        return array("i", compress(file_ids, map(self._filter_pattern.match, file_paths)))
+
+    def _matches_filter(self, file_path: str) -> bool:
+        if self._metadata_conditions:
+            metadata = self._metadata_index.get_metadata(file_path)
+            if not all(condition.matches(metadata) for condition in self._metadata_conditions):
+                return False
+        if self._filter_match_basename:
+            file_path = file_path[file_path.rfind(os.sep) + 1:]
+        return self._filter_pattern.match(file_path) is not None
+
+    def add_source_files(self, file_paths: list):
+        if self._renaming:
+            new_file_paths = set(self._renaming.values())
+            file_paths = [file_path for file_path in file_paths if file_path not in new_file_paths]
+        if self._current_source_folder_path is None:
+            # Sub folders are walked into, they are not files of the source
+            file_paths = [file_path for file_path in file_paths if not os.path.isdir(file_path)]
+        if self._metadata_index is not None:
+            self._metadata_index.update_files(file_paths)
+        with self._lock:
+            for file_path in file_paths:
+                file_id = self._add_file(file_path)
+                if self._listed[file_id]:
+                    continue
+                self._listed[file_id] = 1
+                self._all_source_files.append(file_id)
+                if self._matches_file(file_id):
+                    self._source_files.append(file_id)
+                if self.is_listing():
+                    self._changed_while_listing.add(file_path)
+        # New files are added at the end, until they are sorted in
+        self._mark_order_outdated()
+
+    def remove_source_files(self, file_paths: list):
+        # Files that are gone can't be moved anymore, so their assignments go as well
+        to_remove = set(file_paths).difference(self._renaming)
+        with self._lock:
+            file_ids = {file_id for file_id in map(self._files.get_id, to_remove) if file_id is not None}
+            if file_ids:
+                self._all_source_files = array("i", [file_id for file_id in self._all_source_files
+                                                     if file_id not in file_ids])
+                self._source_files = array("i", [file_id for file_id in self._source_files if file_id not in file_ids])
+            with self._session_batch():
+                for file_id in file_ids:
+                    self._listed[file_id] = 0
+                    if self._unassign_file(file_id) and self._session_store is not None:
+                        self._session_store.record_unassignment(self._files.get_path(file_id))
+                    self._release_if_unused(file_id)
+            if self.is_listing():
+                self._changed_while_listing.update(to_remove)
+        if self._metadata_index is not None:
+            self._metadata_index.remove_files(list(to_remove))
+
+    def start_renaming(self, renamed_files: dict):
+        # Old path -> new path of files that are about to be replaced on disk. Until finish_renaming the
+        # files are not removed or added when the change is noticed, so they don't lose their assignments.
+        with self._lock:
+            self._renaming.update(renamed_files)
+
+    def finish_renaming(self, renamed_files: dict):
+        # Old path -> new path of the files given to start_renaming, None for the ones that were not renamed
+        with self._lock:
+            for file_path in renamed_files:
+                self._renaming.pop(file_path, None)
+        self.rename_source_files({file_path: new_file_path for file_path, new_file_path in renamed_files.items()
+                                  if new_file_path is not None})
+
+    def rename_source_files(self, renamed_files: dict):
+        # Old path -> new path for files that were replaced on disk, e.g. by a conversion.
+        # The files keep their place in the source and their assignments.
+        if self._metadata_index is not None:
+            self._metadata_index.remove_files(list(renamed_files))
+            self._metadata_index.update_files(list(renamed_files.values()))
+        with self._lock:
+            # A new path that was already added when it appeared on disk is not listed twice
+            new_file_ids = {}
+            listed_twice = set()
+            for file_path, new_file_path in renamed_files.items():
+                file_id = self._files.get_id(file_path)
+                if file_id is None:
+                    continue
+                new_file_id = self._add_file(new_file_path)
+                if self._listed[new_file_id]:
+                    listed_twice.add(file_id)
+                else:
+                    new_file_ids[file_id] = new_file_id
+            self._all_source_files = array("i", [new_file_ids.get(file_id, file_id)
+                                                 for file_id in self._all_source_files if file_id not in listed_twice])
+            source_files = array("i")
+            for file_id in self._source_files:
+                if file_id in listed_twice:
+                    continue
+                if file_id in new_file_ids:
+                    file_id = new_file_ids[file_id]
+                    if not self._matches_file(file_id):
+                        continue
+                source_files.append(file_id)
+            self._source_files = source_files
+            for file_id, new_file_id in new_file_ids.items():
+                if self._listed[file_id]:
+                    self._listed[file_id] = 0
+                    self._listed[new_file_id] = 1
+            for file_id in listed_twice:
+                self._listed[file_id] = 0
+            for file_id in listed_twice.union(new_file_ids, new_file_ids.values()):
+                self._release_if_unused(file_id)
+
+            with self._session_batch():
+                for file_path, new_file_path in renamed_files.items():
+                    folder_path = self.get_assignment(file_path)
+                    if folder_path is not None:
+                        self._unassign(file_path)
+                        self.add_assignment(new_file_path, folder_path)
+            if self.is_listing():
+                self._changed_while_listing.update(renamed_files)
+                self._changed_while_listing.update(renamed_files.values())
+        self._mark_order_outdated()
+
+    def sync_source(self):
+        # Brings the listing up to date without reordering the files that are still there
+        if not self._current_source_roots or self.is_listing():
+            return
+        if self._current_source_folder_path is not None:
+            on_disk = {os.path.join(self._current_source_folder_path, file_path) for file_path in
+                       os.listdir(self._current_source_folder_path)}
+        else:
+            on_disk = set()
+            walk_sources(self._current_source_roots, on_disk.update,
+                         excluded_folders=set(self._destination_folder_paths))
+        known_files = set(self._files.get_paths(self._all_source_files))
+        self.remove_source_files([file_path for file_path in known_files if file_path not in on_disk])
+        self.add_source_files(sorted(file_path for file_path in on_disk if file_path not in known_files))
+
+    def apply_assignments(self, progress_callback: Optional[Callable[[ApplyProgress], None]] = None,
+                          workers_per_device: int = DEFAULT_WORKERS_PER_DEVICE,
+                          journal: Optional[MoveJournal] = None) -> ApplyResult:
+        result = ApplyEngine(workers_per_device).run(self.get_all_assignments(), progress_callback, journal)
+        self.finish_applying(result)
+        return result
+
+    def finish_applying(self, result: ApplyResult):
+        # Moved files leave the source, failed ones keep their assignments so they can be retried
+        self.remove_source_files([file_path for file_path, new_file_path in result.moved])
 
     def get_all_files_in_current_source(self) -> list:
-        return self._source_files
+        with self._lock:
+            return self._files.get_paths(self._source_files)
 
     def get_n_of_source_files(self):
         return len(self._source_files)
@@ -87,7 +743,18 @@ class FileMovingManager:
         return self._destination_folder_paths
 
     def remove_assignment(self, file_path: str):
-        self._file_assignments.pop(file_path)
+        self._unassign(file_path)
 
     def clear_assignments(self):
-        self._file_assignments.clear()
+        with self._lock:
+            self._assignments_version += 1
+            assigned_files = self._get_assigned_files()
+            if self._session_store is not None:
+                self._session_store.record_clear(self._files.get_paths(assigned_files))
+            for file_id in assigned_files:
+                self._unassign_file(file_id)
+                self._release_if_unused(file_id)
+            self._assigned_folders = []
+            self._assigned_folder_indexes = {}
+            self._destination_counts = []
+            self._destination_sizes = []
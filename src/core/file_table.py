@@ -0,0 +1,172 @@
+import os
+from array import array
+from collections import deque
+from operator import add, itemgetter
+from typing import Iterable, Optional, Sequence
+
+# Ends every path when paths are joined to split them, it can't be part of a file name
+_PATH_END = "\0"
+
+
+def _get_items(values, indexes) -> tuple:
+    # The values at the indexes, looked up in one call
+    if len(indexes) == 1:
+        return values[indexes[0]],
+    return itemgetter(*indexes)(values) if indexes else ()
+
+
+class FileTable:
+    # Interns file paths as integer IDs. A path is kept as the ID of its folder and its name, the folder is
+    # stored once in a table, a path is built again when it is asked for. IDs of released paths are reused.
+    # Paths are added and built for many files at once, so most of the work runs in C rather than per file.
+    def __init__(self):
+        self._folders: list[str] = []
+        self._folder_ids: dict[str, int] = {}
+        # Indexed by folder ID, name -> file ID of the files in the folder
+        self._folder_files: list[dict[str, int]] = []
+        # Indexed by file ID, the folder is -1 and the name None for released IDs
+        self._file_folders = array("i")
+        self._names: list[Optional[str]] = []
+        self._free_ids = array("i")
+        self._n_files = 0
+
+    def __len__(self) -> int:
+        return self._n_files
+
+    def get_capacity(self) -> int:
+        # All IDs are lower than this, arrays indexed by file ID need this many entries
+        return len(self._file_folders)
+
+    def add(self, file_path: str) -> int:
+        folder_path, name = self._split(file_path)
+        folder_id = self._get_folder_id(folder_path)
+        file_id = self._folder_files[folder_id].get(name)
+        return self._add_new([folder_id], [name])[0] if file_id is None else file_id
+
+    def add_all(self, file_paths: Iterable[str]) -> array:
+        # Returns the IDs of the paths, known paths keep theirs
+        path_folders, names = self._split_all(file_paths)
+        if not names:
+            return array("i")
+        file_ids = list(map(dict.get, map(self._folder_files.__getitem__, path_folders), names))
+        if file_ids.count(None) == len(names):
+            return self._add_new(path_folders, names)
+        new_indexes = [index for index, file_id in enumerate(file_ids) if file_id is None]
+        if new_indexes:
+            new_ids = self._add_new([path_folders[index] for index in new_indexes], _get_items(names, new_indexes))
+            for index, file_id in zip(new_indexes, new_ids):
+                file_ids[index] = file_id
+        return array("i", file_ids)
+
+    def get_id(self, file_path: str) -> Optional[int]:
+        folder_path, name = self._split(file_path)
+        folder_id = self._folder_ids.get(folder_path)
+        return None if folder_id is None else self._folder_files[folder_id].get(name)
+
+    def get_path(self, file_id: int) -> str:
+        return self._folders[self._file_folders[file_id]] + self._names[file_id]
+
+    def get_paths(self, file_ids: Iterable[int]) -> list:
+        if not isinstance(file_ids, (array, list)):
+            file_ids = list(file_ids)
+        names = _get_items(self._names, file_ids)
+        if len(self._folders) == 1:
+            return list(map(self._folders[0].__add__, names))
+        folder_ids = _get_items(self._file_folders, file_ids)
+        if folder_ids and folder_ids.count(folder_ids[0]) == len(folder_ids):
+            # All files of one folder, as when a single folder is listed
+            return list(map(self._folders[folder_ids[0]].__add__, names))
+        return list(map(add, map(self._folders.__getitem__, folder_ids), names))
+
+    def get_names(self, file_ids: Iterable[int]) -> list:
+        if not isinstance(file_ids, (array, list)):
+            file_ids = list(file_ids)
+        return list(_get_items(self._names, file_ids))
+
+    def get_name(self, file_id: int) -> str:
+        return self._names[file_id]
+
+    def get_folder(self, file_id: int) -> str:
+        return os.path.dirname(self.get_path(file_id))
+
+    def release(self, file_id: int):
+        if self._file_folders[file_id] < 0:
+            return
+        del self._folder_files[self._file_folders[file_id]][self._names[file_id]]
+        self._file_folders[file_id] = -1
+        self._names[file_id] = None
+        self._free_ids.append(file_id)
+        self._n_files -= 1
+
+    def _add_new(self, path_folders: Sequence[int], names: Sequence[str]) -> array:
+        # Adds paths that aren't in the table yet, released IDs are given out first, then the IDs after the last one
+        first_id = len(self._file_folders)
+        if not self._free_ids:
+            folder_files = [self._folder_files[folder_id] for folder_id in set(path_folders)]
+            n_folder_files = sum(map(len, folder_files))
+            new_ids = range(first_id, first_id + len(names))
+            if len(folder_files) == 1:
+                folder_files[0].update(zip(names, new_ids))
+            else:
+                deque(map(dict.__setitem__, map(self._folder_files.__getitem__, path_folders), names, new_ids),
+                      maxlen=0)
+            if sum(map(len, folder_files)) - n_folder_files == len(names):
+                self._file_folders.extend(path_folders)
+                self._names.extend(names)
+                self._n_files += len(names)
+                return array("i", new_ids)
+            for folder_id, name in zip(path_folders, names):
+                self._folder_files[folder_id].pop(name, None)
+
+        # Duplicates within the call get the ID of their first occurrence
+        file_ids = array("i")
+        for folder_id, name in zip(path_folders, names):
+            files = self._folder_files[folder_id]
+            file_id = files.get(name)
+            if file_id is None:
+                if self._free_ids:
+                    file_id = self._free_ids.pop()
+                    self._file_folders[file_id] = folder_id
+                    self._names[file_id] = name
+                else:
+                    file_id = len(self._file_folders)
+                    self._file_folders.append(folder_id)
+                    self._names.append(name)
+                files[name] = file_id
+                self._n_files += 1
+            file_ids.append(file_id)
+        return file_ids
+
+    def _get_folder_id(self, folder_path: str) -> int:
+        folder_id = self._folder_ids.get(folder_path)
+        if folder_id is None:
+            folder_id = len(self._folders)
+            self._folders.append(folder_path)
+            self._folder_ids[folder_path] = folder_id
+            self._folder_files.append({})
+        return folder_id
+
+    @staticmethod
+    def _split(file_path: str) -> tuple:
+        # The folder keeps its separator, so any path is built again exactly as it was given
+        separator = file_path.rfind(os.sep)
+        if os.altsep:
+            separator = max(separator, file_path.rfind(os.altsep))
+        return file_path[:separator + 1], file_path[separator + 1:]
+
+    def _split_all(self, file_paths: Iterable[str]) -> tuple:
+        # The folder IDs and the names of the paths, as _split gives them. Listing passes the files of one folder,
+        # those are split without making a folder string for each of them.
+        file_paths = file_paths if isinstance(file_paths, list) else list(file_paths)
+        if not os.altsep and file_paths:
+            # Every path starts with the folder and has no more separators than it
+            folder_path = self._split(file_paths[0])[0]
+            joined_paths = _PATH_END.join(file_paths)
+            if joined_paths.count(_PATH_END + folder_path) == len(file_paths) - 1 and \
+                    joined_paths.count(os.sep) == folder_path.count(os.sep) * len(file_paths):
+                path_folders = array("i", [self._get_folder_id(folder_path)]) * len(file_paths)
+                return path_folders, list(map(itemgetter(slice(len(folder_path), None)), file_paths))
+        folder_paths, names = zip(*map(self._split, file_paths)) if file_paths else ((), ())
+        for folder_path in dict.fromkeys(folder_paths):
+            self._get_folder_id(folder_path)
+        return array("i", map(self._folder_ids.__getitem__, folder_paths)), list(names)
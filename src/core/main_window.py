@@ -1,24 +1,50 @@
 import logging
 import os
+import re
 from dataclasses import dataclass
 from typing import Optional
 
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Signal, QTimer
 from PySide6.QtWidgets import QMainWindow, QMessageBox, QInputDialog, QFileDialog, QWidget, QSpacerItem, QSizePolicy, \
     QLabel
-from src.core.file_moving_manager import FileMovingManager
+from src.core import tracing
+from src.core.apply_engine import ApplyProgress, ApplyResult, DEFAULT_WORKERS_PER_DEVICE, get_resume_assignments, \
+    get_undo_assignments
+from src.core.apply_task import ApplyTask
+from src.core.metadata_index import MetadataIndex, DEFAULT_METADATA_FOLDER, SORT_KEYS, parse_metadata_filter
+from src.core.move_journal import MoveJournal, DEFAULT_JOURNAL_FILE
+from src.core.file_moving_manager import FileMovingManager, FILTER_SYNTAX_REGEX, FILTER_SYNTAX_GLOB
+from src.core.preview_cache import DEFAULT_PREVIEW_CACHE_SIZE_MB
+from src.core.session_store import SessionStore, DEFAULT_SESSION_FILE
+from src.core.source_traversal import SourceRoot
+from src.core.source_watcher import SourceWatcher
+from src.core.thumbnail_cache import ThumbnailCache, DEFAULT_THUMBNAIL_FOLDER, DEFAULT_THUMBNAIL_CACHE_SIZE_MB
 from src.core.user_config import UserConfig
 from src.ui.destination_container_view import DestinationContainerLayout
-from src.ui.destination_folder_view import DestinationFolderView
+from src.ui.destination_folder_view import format_size
 from src.ui.main_window_view import Ui_MainWindow
 from src.ui.preview_picture_view import PreviewPictureView
+from src.ui.timing_overlay import TimingOverlay
 from src.core.addon_loader import AddonLoader
 
 
 @dataclass
 class CoreConfig:
     filter: str = ".*"
+    filter_syntax: str = FILTER_SYNTAX_REGEX
+    filter_match_basename: bool = False
     zoom_level: float = 1.0
+    prefetch_count: int = 3
+    apply_workers_per_device: int = DEFAULT_WORKERS_PER_DEVICE
+    preview_cache_size_mb: int = DEFAULT_PREVIEW_CACHE_SIZE_MB
+    thumbnail_folder: Optional[str] = DEFAULT_THUMBNAIL_FOLDER
+    thumbnail_cache_size_mb: int = DEFAULT_THUMBNAIL_CACHE_SIZE_MB
+    sort_key: Optional[str] = None
+    sort_reverse: bool = False
+    metadata_filter: str = ""
+    # Dropped folders are listed with their sub folders, down to source_max_depth levels if it is set
+    include_sub_folders: bool = False
+    source_max_depth: Optional[int] = None
 
 
 class MainWindow(QMainWindow):
@@ -36,12 +62,34 @@ class MainWindow(QMainWindow):
         self._config: Optional[CoreConfig] = None
         self.reload_config()
 
-        self._file_m_manager = FileMovingManager(self._config.filter)
+        self._move_journal = MoveJournal(os.path.join(self._config_manager.get_config_folder_path(),
+                                                      DEFAULT_JOURNAL_FILE))
+        self._session_store = SessionStore(os.path.join(self._config_manager.get_config_folder_path(),
+                                                        DEFAULT_SESSION_FILE))
+        self._metadata_index = MetadataIndex(os.path.join(self._config_manager.get_config_folder_path(),
+                                                          DEFAULT_METADATA_FOLDER))
+        self._file_m_manager = FileMovingManager(self._config.filter, self._config.filter_syntax,
+                                                 self._config.filter_match_basename, self._session_store,
+                                                 self._metadata_index)
+        self._file_m_manager.set_sort(self._config.sort_key, self._config.sort_reverse)
+        try:
+            self._file_m_manager.set_metadata_filter(parse_metadata_filter(self._config.metadata_filter))
+        except ValueError as e:
+            logging.warning(f"Ignoring the saved metadata filter: {e}")
         self._current_file_index = 0
+        self._source_watcher = SourceWatcher()
+        self._listed_files = 0
+        self._shown_assignments_version = -1
+        self._apply_task: Optional[ApplyTask] = None
+        self._shown_destinations = 0
+        self._listing_timer = QTimer(self)
+        self._listing_timer.setInterval(200)
+        self._listing_timer.timeout.connect(self._on_listing_progress)
 
         self._finalize_ui()
         self._set_up_triggers()
 
+        self._addon_placeholders: dict[str, QWidget] = {}
         self._addon_manager = AddonLoader(self)
         self._addon_manager.load_addons()
         self._finalize_addon_ui()
@@ -49,10 +97,22 @@ class MainWindow(QMainWindow):
         self.ui_reload_sources.connect(self._reload_sources)
         self.ui_reload_destinations.connect(self._reload_destinations)
         self.full_ui_reload.connect(self._reload_all)
+        # Destinations of the last session
+        self.ui_reload_destinations.emit()
+
+        # Asked once the window is up
+        QTimer.singleShot(0, self._recover_interrupted_apply)
 
     def get_current_file_index(self) -> int:
         return self._current_file_index
 
+    def set_current_file_index(self, index: int):
+        if not 0 <= index < self._file_m_manager.get_n_of_source_files():
+            raise Exception(f"No file on index {index}")
+        tracing.start_frame()
+        self._current_file_index = index
+        self._reload_all()
+
     def get_file_manager(self) -> FileMovingManager:
         return self._file_m_manager
 
@@ -65,7 +125,18 @@ class MainWindow(QMainWindow):
     def get_ui(self):
         return self._ui
 
+    def add_addon_placeholder(self, placeholder: QWidget, addon_info: dict):
+        # Shown until the addon is loaded, its UI takes the place of the placeholder
+        self.add_ui_to_addon_panel(placeholder, addon_info)
+        self._addon_placeholders[addon_info["name"]] = placeholder
+
     def add_ui_to_addon_panel(self, ui_element: QWidget, addon_info: dict):
+        placeholder = self._addon_placeholders.pop(addon_info["name"], None)
+        if placeholder is not None:
+            self._ui.vlAddonsBar.insertWidget(self._ui.vlAddonsBar.indexOf(placeholder), ui_element)
+            self._ui.vlAddonsBar.removeWidget(placeholder)
+            placeholder.deleteLater()
+            return
         label = QLabel(f"{addon_info['name']}")
         self._ui.vlAddonsBar.addWidget(label)
         self._ui.vlAddonsBar.addWidget(ui_element)
@@ -80,6 +151,9 @@ class MainWindow(QMainWindow):
     def save_config(self):
         self._config.zoom_level = self._preview_image.get_zoom()
         self._config.filter = self._file_m_manager.get_regex_filter()
+        self._config.filter_syntax = self._file_m_manager.get_filter_syntax()
+        self._config.filter_match_basename = self._file_m_manager.get_filter_match_basename()
+        self._config.sort_key, self._config.sort_reverse = self._file_m_manager.get_sort()
         self._config_manager.save_config("core", self._config)
 
     def _set_up_triggers(self):
@@ -91,40 +165,63 @@ class MainWindow(QMainWindow):
         self._ui.actionZoom_out.triggered.connect(self.on_zoom_out)
         self._ui.actionDelete_file.triggered.connect(self.on_delete_file)
         self._ui.actionFilter.triggered.connect(self.on_change_filter)
+        self._ui.actionMetadata_filter.triggered.connect(self.on_change_metadata_filter)
+        self._ui.actionSort.triggered.connect(self.on_change_sort)
         self._ui.actionOpen_new_destination.triggered.connect(self.on_add_destination)
         self._ui.actionReload_source.triggered.connect(self._refresh_sources)
+        self._ui.actionInclude_sub_folders.setChecked(self._config.include_sub_folders)
+        self._ui.actionInclude_sub_folders.toggled.connect(self.on_include_sub_folders)
+        self._ui.actionTiming_overlay.toggled.connect(self._timing_overlay.set_enabled)
         self._destination_container.folders_dropped.connect(self.on_add_destination_dropped)
+        self._destination_container.destination_clicked.connect(self.on_assign_destination)
+        self._destination_container.destination_removed.connect(self.on_delete_destination)
         self._ui.actionClear_assignments.triggered.connect(self.on_clear_assignments)
+        self._ui.actionUndo_apply.triggered.connect(self.on_undo_apply)
+        self._source_watcher.files_added.connect(self._on_source_files_added)
+        self._source_watcher.files_removed.connect(self._on_source_files_removed)
+        self._source_watcher.rescan_needed.connect(self._on_source_rescan_needed)
 
     def _finalize_ui(self):
-        self._preview_image = PreviewPictureView(self._config.zoom_level)
+        thumbnail_cache = None
+        if self._config.thumbnail_folder:
+            thumbnail_cache = ThumbnailCache(self._config.thumbnail_folder,
+                                             self._config.thumbnail_cache_size_mb * 1024 * 1024)
+        self._preview_image = PreviewPictureView(self._config.zoom_level, self._config.preview_cache_size_mb,
+                                                 thumbnail_cache)
         self._destination_container = DestinationContainerLayout()
         self._ui.hlDestinations.layout().addWidget(self._destination_container)
         self._ui.vbPreviewContainer.layout().addWidget(self._preview_image)
+        self._timing_overlay = TimingOverlay()
+        self._preview_image.layout().addWidget(self._timing_overlay)
 
         h = self.geometry().height()
         self._ui.spPreview.setSizes([h * 0.60, h * 0.40])
 
     def set_current_folder(self, folder_paths: list):
-        folder_path = folder_paths[0]
-        try:
-            self._file_m_manager.set_current_source(folder_path)
-        except NotADirectoryError:
-            logging.info(f"{folder_path} is not a directory")
+        # Every dropped folder is a source, their files are listed one folder after another
+        source_folder_paths = []
+        for folder_path in folder_paths:
+            if os.path.isdir(folder_path):
+                source_folder_paths.append(folder_path)
+            else:
+                logging.info(f"{folder_path} is not a directory")
+        if not source_folder_paths:
             return
-        logging.info(f"New folder: {folder_path}")
+        max_depth = self._config.source_max_depth if self._config.include_sub_folders else 0
+        self._file_m_manager.set_current_sources([SourceRoot(folder_path, max_depth)
+                                                  for folder_path in source_folder_paths])
+        logging.info(f"New folders: {', '.join(source_folder_paths)}")
+        # Sub folders are watched once they are listed
+        self._source_watcher.set_folders(source_folder_paths)
         self._current_file_index = 0
         self._reload_all()
+        self._start_listing_progress()
 
     def on_zoom_in(self):
         self._preview_image.zoom_in()
-        if self._file_m_manager.get_n_of_source_files() > 0:
-            self.ui_reload_sources.emit()
 
     def on_zoom_out(self):
         self._preview_image.zoom_out()
-        if self._file_m_manager.get_n_of_source_files() > 0:
-            self.ui_reload_sources.emit()
 
     def on_delete_file(self):
         if self._file_m_manager.get_n_of_source_files() == 0:
@@ -138,8 +235,8 @@ class MainWindow(QMainWindow):
 
             if self._current_file_index > 0:
                 self._current_file_index -= 1
-            self._file_m_manager.refresh_sources()
-            self._file_m_manager.remove_assignment(current_file_path)
+            self._file_m_manager.remove_source_files([current_file_path])
+            self._preview_image.get_preview_cache().invalidate(current_file_path)
             self._reload_all()
 
     def on_add_destination(self):
@@ -156,14 +253,82 @@ class MainWindow(QMainWindow):
                 logging.info(f"{folder_path} is not a folder")
         self.ui_reload_destinations.emit()
 
+    def on_include_sub_folders(self, include_sub_folders: bool):
+        self._config.include_sub_folders = include_sub_folders
+        current_sources = self._file_m_manager.get_current_sources()
+        if current_sources:
+            self.set_current_folder([root.folder_path for root in current_sources])
+
     def on_change_filter(self):
-        new_regex, succ = QInputDialog.getText(None, "Change filter", "Type in regex pattern to match path files",
-                                               text=self._file_m_manager.get_regex_filter())
-        if succ:
-            self._file_m_manager.set_regex_filter(new_regex)
-            self._file_m_manager.refresh_sources()
-            self._current_file_index = 0
-            self._reload_all()
+        # The prefixes "name:" and "glob:" switch to matching file names and glob syntax
+        current_filter = self._file_m_manager.get_regex_filter()
+        if self._file_m_manager.get_filter_syntax() == FILTER_SYNTAX_GLOB:
+            current_filter = "glob:" + current_filter
+        if self._file_m_manager.get_filter_match_basename():
+            current_filter = "name:" + current_filter
+        new_filter, succ = QInputDialog.getText(None, "Change filter",
+                                                "Type in regex pattern to match path files\n"
+                                                "(prefix with name: to match file names, glob: for glob patterns)",
+                                                text=current_filter)
+        if not succ:
+            return
+
+        match_basename = False
+        syntax = FILTER_SYNTAX_REGEX
+        if new_filter.startswith("name:"):
+            match_basename = True
+            new_filter = new_filter[len("name:"):]
+        if new_filter.startswith("glob:"):
+            syntax = FILTER_SYNTAX_GLOB
+            new_filter = new_filter[len("glob:"):]
+        try:
+            self._file_m_manager.set_filter(new_filter, syntax, match_basename)
+        except re.error as e:
+            logging.warning(e)
+            QMessageBox.warning(None, "Warning", f"Invalid filter: {e}")
+            return
+        self._current_file_index = 0
+        self._reload_all()
+
+    def on_change_metadata_filter(self):
+        new_filter, succ = QInputDialog.getText(None, "Filter by metadata",
+                                                "Conditions that all have to match, for example\n"
+                                                "size>2M width>=1920 resolution>=12M date>=2021-06-01 "
+                                                "mtime<2024-01-01 format=jpeg",
+                                                text=self._config.metadata_filter)
+        if not succ:
+            return
+        try:
+            self._file_m_manager.set_metadata_filter(parse_metadata_filter(new_filter))
+        except ValueError as e:
+            logging.warning(e)
+            QMessageBox.warning(None, "Warning", f"Invalid metadata filter: {e}")
+            return
+        self._config.metadata_filter = new_filter.strip()
+        self._current_file_index = 0
+        self._reload_all()
+
+    def on_change_sort(self):
+        # "listing order" lists the folder again, the order it was listed in is not kept
+        sort_options = ["listing order"] + [f"{key} {direction}" for key in SORT_KEYS
+                                            for direction in ("ascending", "descending")]
+        sort_key, sort_reverse = self._file_m_manager.get_sort()
+        current_option = 0
+        if sort_key is not None:
+            current_option = sort_options.index(f"{sort_key} {'descending' if sort_reverse else 'ascending'}")
+        new_option, succ = QInputDialog.getItem(None, "Sort", "Sort files by", sort_options, current_option, False)
+        if not succ:
+            return
+
+        current_file = self._get_current_file()
+        if new_option == sort_options[0]:
+            self._file_m_manager.set_sort(None)
+            self._refresh_sources()
+            return
+        new_key, direction = new_option.split(" ")
+        self._file_m_manager.set_sort(new_key, direction == "descending")
+        self._restore_current_file(current_file)
+        self._reload_all()
 
     def on_delete_destination(self, folder_path: str):
         try:
@@ -191,23 +356,152 @@ class MainWindow(QMainWindow):
         self.ui_reload_destinations.emit()
 
     def on_confirm_changes(self):
-        n_files = len(self._file_m_manager.get_all_assignments())
+        n_files = self._file_m_manager.get_n_of_assignments()
         res = QMessageBox.question(None, f"Are you sure?", f"Are you sure you want to move {n_files} files?")
         if res == QMessageBox.StandardButton.Yes:
             logging.info("Applying changes")
-            self._file_m_manager.apply_assignments()
-            self._file_m_manager.clear_assignments()
-            self._file_m_manager.refresh_sources()
-            self._reload_all()
+            self._start_apply_task(dict(self._file_m_manager.get_all_assignments()))
+
+    def on_undo_apply(self):
+        batch = self._move_journal.get_last_undoable_batch()
+        if batch is None or self._apply_task is not None:
+            logging.info("Nothing to undo")
+            return
+        n_files = len(batch.done)
+        res = QMessageBox.question(None, f"Are you sure?", f"Are you sure you want to move {n_files} files back?")
+        if res == QMessageBox.StandardButton.Yes:
+            logging.info(f"Undoing apply {batch.batch_id}")
+            self._start_apply_task(get_undo_assignments(batch), reverts=batch.batch_id)
+
+    def _recover_interrupted_apply(self):
+        batch = self._move_journal.get_interrupted_batch()
+        if batch is not None:
+            self._move_journal.resolve_pending_moves(batch)
+            res = QMessageBox.question(None, "Interrupted apply",
+                                       f"Moving files was interrupted, {len(batch.done)} of {len(batch.moves)} "
+                                       f"files were moved. Do you want to move the rest?\n"
+                                       f"Choosing no moves the files back.")
+            if res == QMessageBox.StandardButton.Yes:
+                logging.info(f"Resuming apply {batch.batch_id}")
+                self._start_apply_task(get_resume_assignments(batch), batch_id=batch.batch_id)
+            else:
+                logging.info(f"Rolling back apply {batch.batch_id}")
+                self._move_journal.end_batch(batch.batch_id)
+                self._start_apply_task(get_undo_assignments(batch), reverts=batch.batch_id)
+        else:
+            self._move_journal.compact()
+
+    def _start_apply_task(self, assignments: dict, batch_id: Optional[int] = None, reverts: Optional[int] = None):
+        self._ui.actionConfirm.setEnabled(False)
+        self._ui.actionUndo_apply.setEnabled(False)
+        self._apply_task = ApplyTask(assignments, self._config.apply_workers_per_device, self._move_journal,
+                                     batch_id, reverts)
+        self._apply_task.progress.connect(self._on_apply_progress)
+        self._apply_task.finished.connect(self._on_apply_finished)
+        self._apply_task.start()
+
+    def _on_apply_progress(self, progress: ApplyProgress):
+        self.statusBar().showMessage(f"Moving files {progress.n_done}/{progress.n_total}, "
+                                     f"{format_size(progress.get_bytes_per_second())}/s")
+
+    def _on_apply_finished(self, result: ApplyResult):
+        self._apply_task = None
+        self._ui.actionConfirm.setEnabled(True)
+        self._ui.actionUndo_apply.setEnabled(True)
+        current_file = self._get_current_file()
+        self._file_m_manager.finish_applying(result)
+        self._restore_current_file(current_file)
+        self._reload_all()
+
+        self.statusBar().showMessage(f"Moved {len(result.moved)} files", 5000)
+        if result.failed:
+            failures = "\n".join(f"{file_path}: {error}" for file_path, error in result.failed[:10])
+            QMessageBox.warning(None, "Warning", f"Could not move {len(result.failed)} files:\n{failures}")
 
     def on_clear_assignments(self):
-        n_files = len(self._file_m_manager.get_all_assignments())
+        n_files = self._file_m_manager.get_n_of_assignments()
         res = QMessageBox.question(None, f"Are you sure?", f"Are you sure you want to clear {n_files} files?")
         if res == QMessageBox.StandardButton.Yes:
             logging.info("Clearing changes")
             self._file_m_manager.clear_assignments()
             self._reload_all()
 
+    def _start_listing_progress(self):
+        self._listed_files = self._file_m_manager.get_n_of_source_files()
+        if self._file_m_manager.is_listing() or self._file_m_manager.is_indexing_metadata():
+            self._listing_timer.start()
+        else:
+            self._on_listing_progress()
+
+    def _on_listing_progress(self):
+        # Sorting and metadata filters are applied again once the listing or the metadata index is complete
+        current_file = self._get_current_file()
+        if self._file_m_manager.update_order():
+            self._restore_current_file(current_file)
+            self._listed_files = -1
+
+        n_files = self._file_m_manager.get_n_of_source_files()
+        if self._file_m_manager.is_listing():
+            self.statusBar().showMessage(f"Listing files... {n_files} found")
+            if self._listed_files <= 0 and n_files > 0:
+                self._reload_all()
+            self._listed_files = n_files
+            return
+        if self._file_m_manager.is_indexing_metadata():
+            self.statusBar().showMessage(f"Reading metadata... {self._metadata_index.get_n_of_indexed_files()} files")
+            if self._listed_files != n_files:
+                self._listed_files = n_files
+                self._reload_all()
+            return
+
+        self._listing_timer.stop()
+        self.statusBar().showMessage(f"{n_files} files", 5000)
+        if len(self._file_m_manager.get_current_sources()) > 1 or self._config.include_sub_folders:
+            self._source_watcher.set_folders(self._file_m_manager.get_listed_folders())
+        # The neighbours of the first file include the last one, which is only known now
+        if self._listed_files != n_files:
+            self._listed_files = n_files
+            self.ui_reload_sources.emit()
+
+    def _get_current_file(self) -> Optional[str]:
+        if self._file_m_manager.get_n_of_source_files() == 0:
+            return None
+        return self._file_m_manager.get_file_on_index(self._current_file_index)
+
+    def _restore_current_file(self, previous_file: Optional[str]) -> bool:
+        # Keeps the same file on screen after the source list changed, returns whether it had to change
+        new_index = None
+        if previous_file is not None:
+            new_index = self._file_m_manager.get_index_of_file(previous_file)
+        if new_index is None:
+            new_index = max(min(self._current_file_index, self._file_m_manager.get_n_of_source_files() - 1), 0)
+        self._current_file_index = new_index
+        return self._get_current_file() != previous_file
+
+    def _on_source_files_added(self, file_paths: list):
+        current_file = self._get_current_file()
+        for file_path in file_paths:
+            self._preview_image.get_preview_cache().invalidate(file_path)
+        self._file_m_manager.add_source_files(file_paths)
+        self._file_m_manager.update_order()
+        self._restore_current_file(current_file)
+        self._reload_all()
+
+    def _on_source_files_removed(self, file_paths: list):
+        current_file = self._get_current_file()
+        n_files = self._file_m_manager.get_n_of_source_files()
+        for file_path in file_paths:
+            self._preview_image.get_preview_cache().invalidate(file_path)
+        self._file_m_manager.remove_source_files(file_paths)
+        if self._restore_current_file(current_file) or n_files != self._file_m_manager.get_n_of_source_files():
+            self._reload_all()
+
+    def _on_source_rescan_needed(self):
+        current_file = self._get_current_file()
+        self._file_m_manager.sync_source()
+        self._restore_current_file(current_file)
+        self._reload_all()
+
     def _reload_all(self):
         self.ui_reload_sources.emit()
         self.ui_reload_destinations.emit()
@@ -216,15 +510,36 @@ class MainWindow(QMainWindow):
         self._file_m_manager.refresh_sources()
         self._current_file_index = 0
         self._reload_sources()
+        self._start_listing_progress()
 
     def _reload_sources(self):
+        with tracing.span("reload_sources", "ui"):
+            self._show_current_file()
+
+    def _show_current_file(self):
         if self._file_m_manager.get_n_of_source_files() > 0:
             current_file = self._file_m_manager.get_file_on_index(self._current_file_index)
-            self._preview_image.set_preview(current_file)
+            self._preview_image.set_preview(current_file, self._get_neighbour_files())
         else:
             self._preview_image.no_files_found()
 
+    def _get_neighbour_files(self) -> list:
+        # Closest files first, alternating between the next and the previous one
+        n_files = self._file_m_manager.get_n_of_source_files()
+        neighbour_indexes = []
+        for distance in range(1, self._config.prefetch_count + 1):
+            for index in (self._current_file_index + distance, self._current_file_index - distance):
+                index %= n_files
+                if index != self._current_file_index and index not in neighbour_indexes:
+                    neighbour_indexes.append(index)
+        return [self._file_m_manager.get_file_on_index(index) for index in neighbour_indexes]
+
     def _reload_destinations(self):
+        with tracing.span("reload_destinations", "ui",
+                          {"n_destinations": len(self._file_m_manager.get_all_destinations())}):
+            self._show_destinations()
+
+    def _show_destinations(self):
         if self._file_m_manager.get_n_of_source_files() > 0:
             current_file = self._file_m_manager.get_file_on_index(self._current_file_index)
             try:
@@ -233,28 +548,25 @@ class MainWindow(QMainWindow):
                 assigned_folder = ""
         else:
             assigned_folder = ""
-        all_destinations = self._file_m_manager.get_all_destinations()
-
-        for i in range(self._destination_container.layout().count()):
-            widget = self._destination_container.layout().itemAt(0).widget()
-            widget.setParent(None)
-            widget.deleteLater()
 
-        for i, destination_path in enumerate(all_destinations):
-            destination_widget = None
-            if destination_path == assigned_folder:
-                destination_widget = DestinationFolderView(destination_path, True, i)
-            else:
-                destination_widget = DestinationFolderView(destination_path, False, i)
-
-            destination_widget.onClickWPath.connect(self.on_assign_destination)
-            destination_widget.onRemoveWPath.connect(self.on_delete_destination)
-            self._destination_container.layout().addWidget(destination_widget)
+        all_destinations = self._file_m_manager.get_all_destinations()
+        self._destination_container.set_destinations(all_destinations)
+        self._destination_container.set_highlighted(assigned_folder)
+
+        assignments_version = self._file_m_manager.get_assignments_version()
+        if assignments_version != self._shown_assignments_version or len(all_destinations) != self._shown_destinations:
+            self._shown_assignments_version = assignments_version
+            self._shown_destinations = len(all_destinations)
+            for destination_path in all_destinations:
+                self._destination_container.set_pending(destination_path,
+                                                        self._file_m_manager.get_n_of_assignments_to(destination_path),
+                                                        self._file_m_manager.get_size_of_assignments_to(destination_path))
 
     def _next_file(self):
         if self._file_m_manager.get_n_of_source_files() == 0:
             logging.info("No files")
             return
+        tracing.start_frame()
         self._current_file_index += 1
         self._current_file_index %= self._file_m_manager.get_n_of_source_files()
         self._reload_all()
@@ -263,6 +575,7 @@ class MainWindow(QMainWindow):
         if self._file_m_manager.get_n_of_source_files() == 0:
             logging.info("No files")
             return
+        tracing.start_frame()
         self._current_file_index -= 1
         self._current_file_index += self._file_m_manager.get_n_of_source_files()
         self._current_file_index %= self._file_m_manager.get_n_of_source_files()
@@ -271,11 +584,20 @@ class MainWindow(QMainWindow):
     def clear_selection(self):
         self._current_file_index = 0
         self._file_m_manager.set_current_source(None)
+        self._source_watcher.set_folders([])
 
     def closeEvent(self, event) -> None:
+        if self._apply_task is not None:
+            QMessageBox.warning(None, "Warning", "Files are still being moved")
+            event.ignore()
+            return
         res = QMessageBox.question(None, "Are you sure", f"Do you want to save your config?")
         if res == QMessageBox.StandardButton.Yes:
             self.save_config()
+        self._addon_manager.unload_addons()
+        # The listing threads write restored and dropped assignments to the session store
+        self._file_m_manager.stop_listing()
+        self._session_store.close()
         return super().closeEvent(event)
 
     def _finalize_addon_ui(self):
@@ -0,0 +1,476 @@
+import datetime
+import hashlib
+import logging
+import os
+import pickle
+import re
+import struct
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from PySide6.QtGui import QImageReader
+
+DEFAULT_METADATA_FOLDER = "metadata"
+METADATA_CACHE_VERSION = 1
+INDEXING_BATCH_SIZE = 1000
+
+SORT_NAME = "name"
+SORT_SIZE = "size"
+SORT_MTIME = "mtime"
+SORT_CAPTURE_TIME = "capture_time"
+SORT_RESOLUTION = "resolution"
+SORT_FORMAT = "format"
+SORT_KEYS = [SORT_NAME, SORT_SIZE, SORT_MTIME, SORT_CAPTURE_TIME, SORT_RESOLUTION, SORT_FORMAT]
+
+# The EXIF block of a JPEG is at its start, the image data is never read
+_EXIF_READ_SIZE = 64 * 1024
+_EXIF_DATE_TIME = 0x0132
+_EXIF_IFD_POINTER = 0x8769
+_EXIF_DATE_TIME_ORIGINAL = 0x9003
+_EXIF_TYPE_ASCII = 2
+_EXIF_TYPE_LONG = 4
+_EXIF_FORMATS = {"jpeg", "tiff"}
+_FORMAT_ALIASES = {"jpg": "jpeg", "tif": "tiff"}
+
+_CONDITION_SYNTAX = re.compile(r"^(\w+)\s*(<=|>=|!=|=|<|>)\s*(.+)$")
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+_COUNT_UNITS = {"": 1, "k": 1000, "m": 1000 ** 2, "g": 1000 ** 3}
+
+
+@dataclass
+class FileMetadata:
+    size: int
+    mtime: float
+    width: int = 0
+    height: int = 0
+    capture_time: Optional[float] = None
+    format: str = ""
+
+    def get_resolution(self) -> int:
+        return self.width * self.height
+
+
+def _parse_exif_date(value: bytes) -> Optional[float]:
+    try:
+        return datetime.datetime.strptime(value.rstrip(b"\0 ").decode(), "%Y:%m:%d %H:%M:%S").timestamp()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _read_ifd(tiff: bytes, offset: int, byte_order: str) -> dict:
+    # Only the ASCII and LONG entries are needed, anything pointing outside the read block is skipped
+    entries = {}
+    if offset + 2 > len(tiff):
+        return entries
+    n_entries = struct.unpack_from(byte_order + "H", tiff, offset)[0]
+    for entry_offset in range(offset + 2, min(offset + 2 + n_entries * 12, len(tiff) - 11), 12):
+        tag, value_type, count = struct.unpack_from(byte_order + "HHI", tiff, entry_offset)
+        if value_type == _EXIF_TYPE_LONG:
+            entries[tag] = struct.unpack_from(byte_order + "I", tiff, entry_offset + 8)[0]
+        elif value_type == _EXIF_TYPE_ASCII:
+            if count <= 4:
+                entries[tag] = tiff[entry_offset + 8:entry_offset + 8 + count]
+            else:
+                value_offset = struct.unpack_from(byte_order + "I", tiff, entry_offset + 8)[0]
+                entries[tag] = tiff[value_offset:value_offset + count]
+    return entries
+
+
+def _read_tiff_capture_time(tiff: bytes) -> Optional[float]:
+    if tiff[:4] == b"II*\0":
+        byte_order = "<"
+    elif tiff[:4] == b"MM\0*":
+        byte_order = ">"
+    else:
+        return None
+    ifd0 = _read_ifd(tiff, struct.unpack_from(byte_order + "I", tiff, 4)[0], byte_order)
+    if isinstance(ifd0.get(_EXIF_IFD_POINTER), int):
+        exif_ifd = _read_ifd(tiff, ifd0[_EXIF_IFD_POINTER], byte_order)
+        if isinstance(exif_ifd.get(_EXIF_DATE_TIME_ORIGINAL), bytes):
+            capture_time = _parse_exif_date(exif_ifd[_EXIF_DATE_TIME_ORIGINAL])
+            if capture_time is not None:
+                return capture_time
+    if isinstance(ifd0.get(_EXIF_DATE_TIME), bytes):
+        return _parse_exif_date(ifd0[_EXIF_DATE_TIME])
+    return None
+
+
+def read_capture_time(file_path: str) -> Optional[float]:
+    # Reads DateTimeOriginal, or DateTime, from the EXIF block of JPEG and TIFF based files
+    try:
+        with open(file_path, "rb") as file:
+            header = file.read(_EXIF_READ_SIZE)
+    except OSError:
+        return None
+    try:
+        if header[:4] in (b"II*\0", b"MM\0*"):
+            return _read_tiff_capture_time(header)
+        if header[:2] != b"\xff\xd8":
+            return None
+        offset = 2
+        while offset + 4 <= len(header) and header[offset] == 0xff:
+            marker = header[offset + 1]
+            segment_length = struct.unpack_from(">H", header, offset + 2)[0]
+            # Start of scan, the image data follows
+            if marker == 0xda:
+                return None
+            if marker == 0xe1 and header[offset + 4:offset + 10] == b"Exif\0\0":
+                return _read_tiff_capture_time(header[offset + 10:offset + 2 + segment_length])
+            offset += 2 + segment_length
+    except struct.error:
+        pass
+    return None
+
+
+def get_format_name(name: str) -> str:
+    name = name.lower()
+    return _FORMAT_ALIASES.get(name, name)
+
+
+def read_metadata(file_path: str, stat: os.stat_result) -> FileMetadata:
+    # QImageReader only reads the header to get the size, the image is not decoded
+    metadata = FileMetadata(stat.st_size, stat.st_mtime)
+    reader = QImageReader(file_path)
+    image_size = reader.size()
+    if image_size.isValid():
+        metadata.width = image_size.width()
+        metadata.height = image_size.height()
+    image_format = get_format_name(bytes(reader.format()).decode())
+    metadata.format = image_format or get_format_name(os.path.splitext(file_path)[1][1:])
+    # Unknown formats may be camera raw files, most of them are TIFF based
+    if image_format in _EXIF_FORMATS or not image_format:
+        metadata.capture_time = read_capture_time(file_path)
+    return metadata
+
+
+def get_name_sort_key(file_path: str) -> tuple:
+    return False, os.path.basename(file_path).lower()
+
+
+def _parse_number(text: str, units: dict) -> float:
+    # The unit is optional, so a bare B as in 100B is the byte suffix and not a unit
+    match = re.fullmatch(r"([0-9.]+)\s*([a-zA-Z]??)[bB]?", text.strip())
+    if match is None or match.group(2).lower() not in units:
+        raise ValueError(f"Invalid number {text}")
+    return float(match.group(1)) * units[match.group(2).lower()]
+
+
+def _parse_date(text: str) -> float:
+    return datetime.datetime.fromisoformat(text.strip()).timestamp()
+
+
+@dataclass
+class _FolderIndexing:
+    # A folder whose entries are being indexed, they may come in several parts
+    folder_path: str
+    generation: int
+    # file name -> metadata, as stored in the cache
+    cached_metadata: dict
+    folder_metadata: dict = field(default_factory=dict)
+    n_read: int = 0
+
+
+@dataclass
+class MetadataCondition:
+    field: str
+    operator: str
+    value: object
+
+    def matches(self, metadata: Optional[FileMetadata]) -> bool:
+        # Files without the needed metadata never match
+        if metadata is None:
+            return False
+        if self.field == "size":
+            value = metadata.size
+        elif self.field == "mtime":
+            value = metadata.mtime
+        elif self.field == "date":
+            value = metadata.capture_time
+        elif self.field == "width":
+            value = metadata.width or None
+        elif self.field == "height":
+            value = metadata.height or None
+        elif self.field == "resolution":
+            value = metadata.get_resolution() or None
+        else:
+            value = metadata.format
+        if value is None:
+            return False
+
+        if self.operator == "=":
+            return value == self.value
+        elif self.operator == "!=":
+            return value != self.value
+        elif self.operator == "<":
+            return value < self.value
+        elif self.operator == "<=":
+            return value <= self.value
+        elif self.operator == ">":
+            return value > self.value
+        return value >= self.value
+
+
+def parse_metadata_filter(text: str) -> list:
+    # Space separated conditions that all have to match, like "size>2M width>=1920 date>=2021-06-01 format=jpeg"
+    # Raises ValueError for conditions that can't be understood
+    conditions = []
+    for condition_text in text.split():
+        match = _CONDITION_SYNTAX.match(condition_text)
+        if match is None:
+            raise ValueError(f"Invalid condition {condition_text}")
+        field, operator, value_text = match.group(1).lower(), match.group(2), match.group(3)
+        if field == "size":
+            value = _parse_number(value_text, _SIZE_UNITS)
+        elif field in ("width", "height", "resolution"):
+            value = _parse_number(value_text, _COUNT_UNITS)
+        elif field in ("mtime", "date"):
+            value = _parse_date(value_text)
+        elif field == "format":
+            if operator not in ("=", "!="):
+                raise ValueError(f"Formats can only be compared with = and !=, not {operator}")
+            value = get_format_name(value_text)
+        else:
+            raise ValueError(f"Unknown field {field}, use size, width, height, resolution, mtime, date or format")
+        conditions.append(MetadataCondition(field, operator, value))
+    return conditions
+
+
+class MetadataIndex:
+    # Size, dates and dimensions of the files in the current folders. Stat results come from scandir and
+    # dimensions and the capture date from the file headers. The index of every folder is cached, so
+    # reopening a folder only reads the files that changed since.
+    def __init__(self, cache_folder_path: Optional[str] = None):
+        self._cache_folder_path = cache_folder_path
+        if cache_folder_path is not None:
+            os.makedirs(cache_folder_path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._folder_paths: list[str] = []
+        self._metadata: dict[str, FileMetadata] = {}
+        self._generation = 0
+        # Folders are indexed one after another by a single thread, more can be added while it runs.
+        # (folder path, entries, last part), the index lists the folder itself if there are no entries.
+        self._pending_folders: deque[tuple] = deque()
+        # The folder whose entries are being added, until its last part was added
+        self._receiving_folder: Optional[str] = None
+        self._indexed_folder: Optional[_FolderIndexing] = None
+        self._on_finished: Optional[Callable[[], None]] = None
+        self._indexing_thread: Optional[threading.Thread] = None
+        self._indexing = False
+
+    def set_folder(self, folder_path: Optional[str], on_finished: Optional[Callable[[], None]] = None):
+        self.set_folders([folder_path] if folder_path is not None else [], on_finished)
+
+    def set_folders(self, folder_paths: list, on_finished: Optional[Callable[[], None]] = None):
+        # Indexes the folders in the background, on_finished is called from the indexing thread
+        # every time it has no folders left
+        with self._lock:
+            self._generation += 1
+            self._folder_paths = []
+            self._metadata = {}
+            self._pending_folders = deque()
+            self._receiving_folder = None
+            self._on_finished = on_finished
+            self._indexing = False
+            self._indexing_thread = None
+        self.add_folders(folder_paths)
+
+    def add_folders(self, folder_paths: list):
+        # More folders to index along with the current ones, e.g. sub folders found while listing
+        with self._lock:
+            self._folder_paths.extend(folder_paths)
+            self._pending_folders.extend((folder_path, None, True) for folder_path in folder_paths)
+            self._start_indexing()
+
+    def add_entries(self, folder_path: str, entries: list, last: bool = True):
+        # Indexes the os.DirEntry objects of a folder the caller listed anyway, so it is not listed twice.
+        # A folder can be added in parts while it is listed, parts of different folders must not be mixed.
+        with self._lock:
+            if folder_path != self._receiving_folder:
+                self._folder_paths.append(folder_path)
+            self._receiving_folder = None if last else folder_path
+            self._pending_folders.append((folder_path, entries, last))
+            self._start_indexing()
+
+    def _start_indexing(self):
+        if self._indexing or not self._pending_folders:
+            return
+        self._indexing = True
+        self._indexing_thread = threading.Thread(target=self._index_pending_folders,
+                                                 args=(self._generation,), daemon=True)
+        self._indexing_thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._generation += 1
+            self._pending_folders = deque()
+            self._receiving_folder = None
+            self._indexing = False
+            indexing_thread = self._indexing_thread
+        if indexing_thread is not None:
+            indexing_thread.join()
+
+    def get_folder(self) -> Optional[str]:
+        return self._folder_paths[0] if self._folder_paths else None
+
+    def get_folders(self) -> list:
+        return list(self._folder_paths)
+
+    def get_metadata(self, file_path: str) -> Optional[FileMetadata]:
+        return self._metadata.get(file_path)
+
+    def get_n_of_indexed_files(self) -> int:
+        return len(self._metadata)
+
+    def is_indexing(self) -> bool:
+        indexing_thread = self._indexing_thread
+        return indexing_thread is not None and indexing_thread.is_alive()
+
+    def wait_for_indexing(self):
+        indexing_thread = self._indexing_thread
+        if indexing_thread is not None:
+            indexing_thread.join()
+
+    def update_files(self, file_paths: list):
+        # For the few files that change while the folder is open, read right away
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                self.remove_files([file_path])
+                continue
+            metadata = read_metadata(file_path, stat)
+            with self._lock:
+                self._metadata[file_path] = metadata
+
+    def remove_files(self, file_paths: list):
+        with self._lock:
+            for file_path in file_paths:
+                self._metadata.pop(file_path, None)
+
+    def get_sort_key(self, key: str) -> Callable[[str], tuple]:
+        # Files without metadata go last
+        if key == SORT_NAME:
+            return get_name_sort_key
+
+        def get_value(file_path: str):
+            metadata = self._metadata.get(file_path)
+            if metadata is None:
+                return None
+            if key == SORT_SIZE:
+                return metadata.size
+            elif key == SORT_MTIME:
+                return metadata.mtime
+            elif key == SORT_CAPTURE_TIME:
+                return metadata.capture_time
+            elif key == SORT_RESOLUTION:
+                return metadata.get_resolution()
+            elif key == SORT_FORMAT:
+                return metadata.format
+            raise Exception(f"Unknown sort key {key}")
+
+        def sort_key(file_path: str) -> tuple:
+            value = get_value(file_path)
+            return (True, 0) if value is None else (False, value)
+        return sort_key
+
+    def _get_cache_path(self, folder_path: str) -> str:
+        return os.path.join(self._cache_folder_path,
+                            hashlib.md5(os.path.abspath(folder_path).encode()).hexdigest() + ".pickle")
+
+    def _load_cache(self, folder_path: str) -> dict:
+        if self._cache_folder_path is None:
+            return {}
+        try:
+            with open(self._get_cache_path(folder_path), "rb") as cache_file:
+                version, cached_folder_path, metadata = pickle.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"Could not read the metadata cache of {folder_path}: {e}")
+            return {}
+        if version != METADATA_CACHE_VERSION or cached_folder_path != os.path.abspath(folder_path):
+            return {}
+        return metadata
+
+    def _save_cache(self, folder_path: str, metadata: dict):
+        if self._cache_folder_path is None:
+            return
+        cache_path = self._get_cache_path(folder_path)
+        temporary_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary_path, "wb") as cache_file:
+                pickle.dump((METADATA_CACHE_VERSION, os.path.abspath(folder_path), metadata), cache_file,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+        except OSError as e:
+            logging.warning(f"Could not save the metadata cache of {folder_path}: {e}")
+
+    def _index_pending_folders(self, generation: int):
+        while True:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                if not self._pending_folders:
+                    self._indexing = False
+                    # More parts of a folder are still being listed
+                    on_finished = self._on_finished if self._receiving_folder is None else None
+                    break
+                folder_path, entries, last = self._pending_folders.popleft()
+            self._index_folder(folder_path, entries, last, generation)
+        if on_finished is not None:
+            on_finished()
+
+    def _index_folder(self, folder_path: str, entries: Optional[list], last: bool, generation: int):
+        # Only the indexing thread of the generation uses its _indexed_folder
+        folder = self._indexed_folder
+        if folder is None or folder.generation != generation or folder.folder_path != folder_path:
+            folder = self._indexed_folder = _FolderIndexing(folder_path, generation, self._load_cache(folder_path))
+        try:
+            if entries is None:
+                with os.scandir(folder_path) as entries:
+                    completed = self._index_entries(folder, entries)
+            else:
+                completed = self._index_entries(folder, entries)
+        except OSError as e:
+            logging.warning(f"Could not index {folder_path}: {e}")
+            self._indexed_folder = None
+            return
+        if not completed or not last:
+            return
+        self._indexed_folder = None
+
+        if folder.n_read > 0 or len(folder.folder_metadata) != len(folder.cached_metadata):
+            self._save_cache(folder_path, folder.folder_metadata)
+        logging.info(f"Indexed {len(folder.folder_metadata)} files in {folder_path}, "
+                     f"{folder.n_read} read from disk")
+
+    def _index_entries(self, folder: _FolderIndexing, entries) -> bool:
+        # Returns False if the index was reset in the meantime
+        batch = {}
+        for entry in entries:
+            if folder.generation != self._generation:
+                return False
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            metadata = folder.cached_metadata.get(entry.name)
+            if metadata is None or metadata.size != stat.st_size or metadata.mtime != stat.st_mtime:
+                metadata = read_metadata(entry.path, stat)
+                folder.n_read += 1
+            folder.folder_metadata[entry.name] = metadata
+            batch[entry.path] = metadata
+            if len(batch) >= INDEXING_BATCH_SIZE:
+                self._extend_index(batch, folder.generation)
+                batch = {}
+        self._extend_index(batch, folder.generation)
+        return True
+
+    def _extend_index(self, metadata: dict, generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._metadata.update(metadata)
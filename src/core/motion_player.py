@@ -0,0 +1,108 @@
+import logging
+import os.path
+from typing import Optional
+
+from PySide6.QtCore import QObject, QTimer, QUrl, Signal
+from PySide6.QtGui import QImage, QMovie
+
+from src.core.video_preview import is_video
+
+try:
+    from PySide6.QtMultimedia import QMediaPlayer, QVideoSink
+except ImportError:
+    QMediaPlayer = None
+
+# Files with these extensions can be animated, QMovie tells whether they are
+ANIMATION_EXTENSIONS = {"gif", "webp", "mng"}
+# Playback starts once the file stayed on screen this long, files that are skipped past are never opened
+MOTION_START_DELAY_MS = 200
+
+
+class MotionPlayer(QObject):
+    # Plays animated images and videos. Frames are decoded one at a time as they are due, so playback
+    # starts with the first frame and nothing is decoded ahead. Videos need QtMultimedia.
+    frame_ready = Signal(str, QImage)
+
+    def __init__(self, start_delay_ms: int = MOTION_START_DELAY_MS):
+        super().__init__()
+        self._file_path: Optional[str] = None
+        self._movie: Optional[QMovie] = None
+        self._media_player = None
+        self._video_sink = None
+
+        self._start_timer = QTimer(self)
+        self._start_timer.setSingleShot(True)
+        self._start_timer.setInterval(start_delay_ms)
+        self._start_timer.timeout.connect(self._start)
+
+    @staticmethod
+    def can_play(file_path: str) -> bool:
+        if is_video(file_path):
+            return QMediaPlayer is not None
+        return os.path.splitext(file_path)[1][1:].lower() in ANIMATION_EXTENSIONS
+
+    def play(self, file_path: str):
+        self.stop()
+        if not self.can_play(file_path):
+            return
+        self._file_path = file_path
+        self._start_timer.start()
+
+    def stop(self):
+        self._start_timer.stop()
+        self._file_path = None
+        if self._movie is not None:
+            self._movie.stop()
+            self._movie.deleteLater()
+            self._movie = None
+        if self._media_player is not None:
+            self._media_player.stop()
+            self._media_player.setSource(QUrl())
+
+    def is_playing(self) -> bool:
+        return self._movie is not None or \
+            (self._media_player is not None and
+             self._media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState)
+
+    def _start(self):
+        if self._file_path is None:
+            return
+        if is_video(self._file_path):
+            self._start_video()
+        else:
+            self._start_animation()
+
+    def _start_animation(self):
+        movie = QMovie(self._file_path)
+        movie.setCacheMode(QMovie.CacheMode.CacheNone)
+        # Stills stay with the preview that is already shown
+        if not movie.isValid() or movie.frameCount() == 1:
+            movie.deleteLater()
+            return
+        movie.frameChanged.connect(lambda frame_number, playing_movie=movie: self._on_movie_frame(playing_movie))
+        self._movie = movie
+        movie.start()
+
+    def _on_movie_frame(self, movie: QMovie):
+        if movie is self._movie:
+            self.frame_ready.emit(self._file_path, movie.currentImage())
+
+    def _start_video(self):
+        if self._media_player is None:
+            # Without an audio output the video plays muted
+            self._media_player = QMediaPlayer(self)
+            self._video_sink = QVideoSink(self)
+            self._media_player.setVideoSink(self._video_sink)
+            self._media_player.setLoops(QMediaPlayer.Loops.Infinite)
+            self._video_sink.videoFrameChanged.connect(self._on_video_frame)
+            self._media_player.errorOccurred.connect(self._on_video_error)
+        self._media_player.setSource(QUrl.fromLocalFile(self._file_path))
+        self._media_player.play()
+
+    def _on_video_frame(self, frame):
+        if self._file_path is None or not frame.isValid():
+            return
+        self.frame_ready.emit(self._file_path, frame.toImage())
+
+    def _on_video_error(self, error, error_string: str):
+        logging.info(f"Could not play {self._file_path}: {error_string}")
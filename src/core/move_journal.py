@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_JOURNAL_FILE = "move_journal.log"
+GROUP_COMMIT_SIZE = 256
+GROUP_COMMIT_INTERVAL = 0.05
+KEPT_BATCHES = 20
+
+
+@dataclass
+class JournalBatch:
+    batch_id: int
+    moves: list
+    done: set = field(default_factory=set)
+    ended: bool = False
+    reverts: Optional[int] = None
+
+    def get_done_moves(self) -> list:
+        return [(source_path, destination_path) for source_path, destination_path in self.moves
+                if source_path in self.done]
+
+    def get_pending_moves(self) -> list:
+        return [(source_path, destination_path) for source_path, destination_path in self.moves
+                if source_path not in self.done]
+
+
+class MoveJournal:
+    # Append-only log of planned and completed moves. The plan of a batch is synced before anything
+    # is moved, completed moves are synced in groups, so a crash loses at most the last group. Those
+    # moves are recovered by checking only their source and destination paths.
+    def __init__(self, file_path: str, group_commit_size: int = GROUP_COMMIT_SIZE,
+                 group_commit_interval: float = GROUP_COMMIT_INTERVAL):
+        self._file_path = file_path
+        self._group_commit_size = group_commit_size
+        self._group_commit_interval = group_commit_interval
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_commit = time.monotonic()
+        self._batches = self._replay()
+        self._next_batch_id = max(self._batches, default=0) + 1
+
+    def begin_batch(self, moves: list, reverts: Optional[int] = None) -> int:
+        with self._lock:
+            batch_id = self._next_batch_id
+            self._next_batch_id += 1
+            self._batches[batch_id] = JournalBatch(batch_id, [tuple(move) for move in moves], reverts=reverts)
+            self._buffer.append({"type": "batch", "batch": batch_id, "moves": moves, "reverts": reverts})
+            self._commit()
+        return batch_id
+
+    def record_done(self, batch_id: int, source_path: str):
+        with self._lock:
+            self._batches[batch_id].done.add(source_path)
+            self._buffer.append({"type": "done", "batch": batch_id, "source": source_path})
+            if len(self._buffer) >= self._group_commit_size or \
+                    time.monotonic() - self._last_commit >= self._group_commit_interval:
+                self._commit()
+
+    def end_batch(self, batch_id: int):
+        with self._lock:
+            self._batches[batch_id].ended = True
+            self._buffer.append({"type": "end", "batch": batch_id})
+            self._commit()
+
+    def get_interrupted_batch(self) -> Optional[JournalBatch]:
+        for batch_id in sorted(self._batches, reverse=True):
+            if not self._batches[batch_id].ended:
+                return self._batches[batch_id]
+        return None
+
+    def get_last_undoable_batch(self) -> Optional[JournalBatch]:
+        reverted = {batch.reverts for batch in self._batches.values() if batch.reverts is not None and batch.ended}
+        for batch_id in sorted(self._batches, reverse=True):
+            batch = self._batches[batch_id]
+            if batch.reverts is None and batch.ended and batch_id not in reverted and batch.done:
+                return batch
+        return None
+
+    def resolve_pending_moves(self, batch: JournalBatch):
+        # Moves done after the last group commit are found by their paths, no folders are listed
+        for source_path, destination_path in batch.get_pending_moves():
+            if os.path.lexists(source_path) and os.path.lexists(destination_path) and \
+                    os.path.samefile(source_path, destination_path):
+                # Interrupted after the destination was linked, before the source was unlinked
+                os.unlink(source_path)
+            if not os.path.lexists(source_path) and os.path.lexists(destination_path):
+                self.record_done(batch.batch_id, source_path)
+        with self._lock:
+            self._commit()
+
+    def compact(self, kept_batches: int = KEPT_BATCHES):
+        # Keeps the newest batches and everything that is still needed to undo or resume them
+        with self._lock:
+            self._commit()
+            kept_ids = set(sorted(self._batches)[-kept_batches:])
+            kept_ids.update(batch_id for batch_id, batch in self._batches.items() if not batch.ended)
+            kept_ids.update(self._batches[batch_id].reverts for batch_id in list(kept_ids)
+                            if self._batches[batch_id].reverts in self._batches)
+            self._batches = {batch_id: self._batches[batch_id] for batch_id in sorted(kept_ids)}
+
+            temporary_path = self._file_path + ".tmp"
+            with open(temporary_path, "w") as journal_file:
+                for batch in self._batches.values():
+                    journal_file.write(json.dumps({"type": "batch", "batch": batch.batch_id,
+                                                   "moves": batch.moves, "reverts": batch.reverts}) + "\n")
+                    for source_path in batch.done:
+                        journal_file.write(json.dumps({"type": "done", "batch": batch.batch_id,
+                                                       "source": source_path}) + "\n")
+                    if batch.ended:
+                        journal_file.write(json.dumps({"type": "end", "batch": batch.batch_id}) + "\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            os.replace(temporary_path, self._file_path)
+
+    def commit(self):
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        self._last_commit = time.monotonic()
+        if not self._buffer:
+            return
+        with open(self._file_path, "a") as journal_file:
+            journal_file.write("".join(json.dumps(record) + "\n" for record in self._buffer))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self._buffer.clear()
+
+    def _replay(self) -> dict:
+        batches = {}
+        if not os.path.exists(self._file_path):
+            return batches
+        with open(self._file_path) as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn write at the end of the log, everything after it is lost anyway
+                    logging.warning(f"Skipping a damaged record in {self._file_path}")
+                    continue
+                batch_id = record["batch"]
+                if record["type"] == "batch":
+                    batches[batch_id] = JournalBatch(batch_id, [tuple(move) for move in record["moves"]],
+                                                     reverts=record.get("reverts"))
+                elif batch_id not in batches:
+                    continue
+                elif record["type"] == "done":
+                    batches[batch_id].done.add(record["source"])
+                elif record["type"] == "end":
+                    batches[batch_id].ended = True
+        return batches
@@ -0,0 +1,60 @@
+import logging
+import os.path
+from typing import Optional
+
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage, QPainter
+
+from src.core.preview_cache import CachedPreview
+
+try:
+    from PySide6.QtPdf import QPdfDocument
+except ImportError:
+    QPdfDocument = None
+
+PDF_EXTENSION = "pdf"
+# Size of the page when it is shown at full resolution, e.g. after zooming in
+PDF_FULL_RESOLUTION_DPI = 150
+_POINTS_PER_INCH = 72
+
+
+def is_pdf_supported() -> bool:
+    return QPdfDocument is not None
+
+
+def is_pdf(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1][1:].lower() == PDF_EXTENSION
+
+
+def load_pdf_preview(file_path: str, target_size: Optional[QSize] = None) -> Optional[CachedPreview]:
+    # Renders the first page only. pdfium reads the parts of the file a page needs, so a scan with
+    # hundreds of pages opens as fast as a single page. Safe to call from worker threads.
+    if QPdfDocument is None:
+        return None
+    document = QPdfDocument()
+    try:
+        error = document.load(file_path)
+        if error != QPdfDocument.Error.None_ or document.pageCount() < 1:
+            logging.info(f"Could not open {file_path}: {error.name}")
+            return None
+        page_size = document.pagePointSize(0)
+        source_size = QSize(round(page_size.width() * PDF_FULL_RESOLUTION_DPI / _POINTS_PER_INCH),
+                            round(page_size.height() * PDF_FULL_RESOLUTION_DPI / _POINTS_PER_INCH))
+        if source_size.isEmpty():
+            return None
+        render_size = source_size
+        if target_size is not None:
+            render_size = source_size.scaled(target_size, Qt.AspectRatioMode.KeepAspectRatio).boundedTo(source_size)
+        page = document.render(0, render_size)
+    finally:
+        document.close()
+    if page.isNull():
+        return None
+
+    # Pages are transparent where nothing is printed, they are shown on white paper
+    image = QImage(page.size(), QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.white)
+    painter = QPainter(image)
+    painter.drawImage(0, 0, page)
+    painter.end()
+    return CachedPreview(image, source_size)
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage
+
+DEFAULT_PREVIEW_CACHE_SIZE_MB = 256
+
+
+@dataclass
+class CachedPreview:
+    image: QImage
+    source_size: QSize
+
+    def get_size_in_bytes(self) -> int:
+        return self.image.sizeInBytes()
+
+    def covers(self, target_size: QSize) -> bool:
+        # The image is good enough if it has at least as many pixels as will be shown,
+        # images smaller than the target are shown upscaled from the full resolution
+        needed_size = self.source_size.scaled(target_size, Qt.AspectRatioMode.KeepAspectRatio)
+        needed_size = needed_size.boundedTo(self.source_size)
+        return self.image.width() >= needed_size.width() and self.image.height() >= needed_size.height()
+
+
+class PreviewCache:
+    def __init__(self, max_size_in_bytes: int = DEFAULT_PREVIEW_CACHE_SIZE_MB * 1024 * 1024):
+        self._entries: OrderedDict[str, CachedPreview] = OrderedDict()
+        self._max_size_in_bytes = max_size_in_bytes
+        self._size_in_bytes = 0
+
+    def get(self, file_path: str) -> Optional[CachedPreview]:
+        preview = self._entries.get(file_path)
+        if preview is not None:
+            self._entries.move_to_end(file_path)
+        return preview
+
+    def put(self, file_path: str, preview: CachedPreview):
+        self.invalidate(file_path)
+        if preview.get_size_in_bytes() > self._max_size_in_bytes:
+            return
+        self._entries[file_path] = preview
+        self._size_in_bytes += preview.get_size_in_bytes()
+        self._evict()
+
+    def invalidate(self, file_path: str):
+        preview = self._entries.pop(file_path, None)
+        if preview is not None:
+            self._size_in_bytes -= preview.get_size_in_bytes()
+
+    def clear(self):
+        self._entries.clear()
+        self._size_in_bytes = 0
+
+    def get_size_in_bytes(self) -> int:
+        return self._size_in_bytes
+
+    def get_max_size_in_bytes(self) -> int:
+        return self._max_size_in_bytes
+
+    def set_max_size_in_bytes(self, max_size_in_bytes: int):
+        self._max_size_in_bytes = max_size_in_bytes
+        self._evict()
+
+    def _evict(self):
+        while self._size_in_bytes > self._max_size_in_bytes and self._entries:
+            file_path, preview = self._entries.popitem(last=False)
+            self._size_in_bytes -= preview.get_size_in_bytes()
@@ -0,0 +1,89 @@
+import os.path
+from typing import Optional
+
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImageReader
+
+from src.core.pdf_preview import PDF_EXTENSION, is_pdf, is_pdf_supported, load_pdf_preview
+from src.core.preview_cache import CachedPreview
+from src.core.thumbnail_cache import ThumbnailCache
+from src.core.video_preview import VIDEO_EXTENSIONS, get_ffmpeg_path, is_video, load_video_preview
+
+# Below 50 the JPEG plugin uses the fast integer DCT while decoding at a reduced scale
+PREVIEW_DECODE_QUALITY = 40
+
+_supported_extensions: Optional[set] = None
+
+
+def get_supported_extensions() -> set:
+    global _supported_extensions
+    if _supported_extensions is None:
+        _supported_extensions = {bytes(image_format).decode().lower() for image_format in
+                                 QImageReader.supportedImageFormats()}
+        # The first page of PDFs is rendered instead of decoded
+        if is_pdf_supported():
+            _supported_extensions.add(PDF_EXTENSION)
+        # Videos are shown by a keyframe
+        if get_ffmpeg_path() is not None:
+            _supported_extensions.update(VIDEO_EXTENSIONS)
+    return _supported_extensions
+
+
+def is_previewable(file_path: str) -> bool:
+    name, extension = os.path.splitext(file_path)
+    return extension[1:].lower() in get_supported_extensions()
+
+
+def load_preview(file_path: str, target_size: Optional[QSize] = None,
+                 thumbnail_cache: Optional[ThumbnailCache] = None) -> Optional[CachedPreview]:
+    # Safe to call from worker threads, only QImage, QImageReader, QPdfDocument and ffmpeg are used. Without
+    # a target size the full resolution image is kept, otherwise it is only scaled down to fit the target.
+    decode_size = target_size
+    if target_size is not None and thumbnail_cache is not None:
+        preview = thumbnail_cache.load(file_path, target_size)
+        if preview is not None and preview.covers(target_size):
+            return preview
+        # Decode at the thumbnail size, so the result can be stored for the next session
+        bucket = thumbnail_cache.get_bucket(target_size)
+        if bucket is not None:
+            decode_size = QSize(bucket[1], bucket[1])
+
+    if is_pdf(file_path):
+        preview = load_pdf_preview(file_path, decode_size)
+    elif is_video(file_path):
+        preview = load_video_preview(file_path, decode_size)
+    else:
+        preview = _read_image(file_path, decode_size)
+    if preview is None:
+        return None
+
+    # Stored with the size and mtime of the file, a changed file is decoded again
+    if target_size is not None and thumbnail_cache is not None:
+        thumbnail_cache.save(file_path, preview)
+    return preview
+
+
+def _read_image(file_path: str, decode_size: Optional[QSize]) -> Optional[CachedPreview]:
+    # Formats that know their size up front (JPEG in the DCT domain, among others) can decode
+    # straight into the reduced size instead of building the full image first
+    reader = QImageReader(file_path)
+    source_size = reader.size()
+    if decode_size is not None and source_size.isValid():
+        needed_size = source_size.scaled(decode_size, Qt.AspectRatioMode.KeepAspectRatio).boundedTo(source_size)
+        if needed_size != source_size:
+            reader.setScaledSize(needed_size)
+            reader.setQuality(PREVIEW_DECODE_QUALITY)
+
+    image = reader.read()
+    if image.isNull():
+        return None
+
+    # The size was not known before decoding, scale the full image down instead
+    if not source_size.isValid():
+        source_size = image.size()
+    if decode_size is not None and image.size() == source_size:
+        needed_size = source_size.scaled(decode_size, Qt.AspectRatioMode.KeepAspectRatio).boundedTo(source_size)
+        if needed_size != source_size:
+            image = image.scaled(needed_size, Qt.AspectRatioMode.IgnoreAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+    return CachedPreview(image, source_size)
@@ -0,0 +1,89 @@
+import logging
+from typing import Optional
+
+from PySide6.QtCore import QObject, QRunnable, QSize, QThreadPool, Signal
+
+from src.core import tracing
+from src.core.preview_cache import PreviewCache, CachedPreview
+from src.core.preview_loader import load_preview, is_previewable
+from src.core.thumbnail_cache import ThumbnailCache
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, prefetcher: "PreviewPrefetcher", file_path: str, target_size: Optional[QSize]):
+        super().__init__()
+        self._prefetcher = prefetcher
+        self._file_path = file_path
+        self._target_size = target_size
+
+    def run(self):
+        preview = None
+        # Navigation might have moved on while the task was queued
+        if self._prefetcher.is_wanted(self._file_path):
+            try:
+                with tracing.span("decode", "preview",
+                                  {"file": self._file_path, "full_resolution": self._target_size is None}):
+                    preview = load_preview(self._file_path, self._target_size, self._prefetcher.get_thumbnail_cache())
+            except Exception as e:
+                logging.warning(f"Could not decode {self._file_path}: {e}")
+        self._prefetcher.decode_finished.emit(self._file_path, self._target_size is None, preview)
+
+
+class PreviewPrefetcher(QObject):
+    preview_ready = Signal(str, bool)
+    full_resolution_ready = Signal(str, object)
+    decode_finished = Signal(str, bool, object)
+
+    def __init__(self, cache: PreviewCache, thumbnail_cache: Optional[ThumbnailCache] = None,
+                 max_threads: Optional[int] = None):
+        super().__init__()
+        self._cache = cache
+        self._thumbnail_cache = thumbnail_cache
+        self._pool = QThreadPool(self)
+        if max_threads is not None:
+            self._pool.setMaxThreadCount(max_threads)
+        self._pending: set[str] = set()
+        self._pending_full_resolution: set[str] = set()
+        self._wanted: set[str] = set()
+        self.decode_finished.connect(self._on_decode_finished)
+
+    def get_thumbnail_cache(self) -> Optional[ThumbnailCache]:
+        return self._thumbnail_cache
+
+    def is_wanted(self, file_path: str) -> bool:
+        return file_path in self._wanted
+
+    def is_pending(self, file_path: str) -> bool:
+        return file_path in self._pending
+
+    def request(self, file_paths: list, target_size: QSize):
+        # file_paths are ordered by urgency, the first one is decoded first
+        self._wanted = set(file_paths)
+        for i, file_path in enumerate(file_paths):
+            if file_path in self._pending or not is_previewable(file_path):
+                continue
+            cached = self._cache.get(file_path)
+            if cached is not None and cached.covers(target_size):
+                continue
+            self._pending.add(file_path)
+            self._pool.start(_DecodeTask(self, file_path, QSize(target_size)), len(file_paths) - i)
+
+    def request_full_resolution(self, file_path: str):
+        # Full resolution images are too big for the cache, they are handed over directly
+        if file_path in self._pending_full_resolution:
+            return
+        self._pending_full_resolution.add(file_path)
+        self._pool.start(_DecodeTask(self, file_path, None), len(self._wanted) + 1)
+
+    def wait_for_done(self):
+        self._pool.waitForDone()
+
+    def _on_decode_finished(self, file_path: str, full_resolution: bool, preview: Optional[CachedPreview]):
+        if full_resolution:
+            self._pending_full_resolution.discard(file_path)
+            self.full_resolution_ready.emit(file_path, preview)
+            return
+        self._pending.discard(file_path)
+        if preview is not None:
+            self._cache.put(file_path, preview)
+        self.preview_ready.emit(file_path, preview is not None)
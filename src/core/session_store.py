@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_SESSION_FILE = "session.sqlite3"
+
+
+class SessionStore:
+    # Every assignment change is a small write to a SQLite database in WAL mode, so nothing
+    # has to be rewritten as a whole when a session grows
+    def __init__(self, database_path: str):
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(database_path, isolation_level=None, check_same_thread=False)
+        self._in_transaction = False
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS assignments ("
+                                 "source_folder TEXT NOT NULL, "
+                                 "file_path TEXT NOT NULL PRIMARY KEY, "
+                                 "destination TEXT NOT NULL, "
+                                 "size INTEGER NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS assignments_by_source ON assignments(source_folder)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS destinations ("
+                                 "folder_path TEXT NOT NULL PRIMARY KEY, "
+                                 "position INTEGER NOT NULL)")
+
+    @contextmanager
+    def batch(self):
+        # Groups many changes, like the ones after an apply, into one transaction
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self._connection.execute("BEGIN")
+            self._in_transaction = True
+            try:
+                yield
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            else:
+                self._connection.execute("COMMIT")
+            finally:
+                self._in_transaction = False
+
+    def record_assignment(self, source_folder: str, file_path: str, destination: str, size: int):
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO assignments VALUES (?, ?, ?, ?)",
+                                     (source_folder, file_path, destination, size))
+
+    def record_unassignment(self, file_path: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM assignments WHERE file_path = ?", (file_path,))
+
+    def record_clear(self, file_paths: list):
+        # Only the given files, assignments of folders that were not opened in this session are kept
+        with self._lock:
+            self._connection.executemany("DELETE FROM assignments WHERE file_path = ?",
+                                         [(file_path,) for file_path in file_paths])
+
+    def load_assignments(self, source_folder: str) -> list:
+        with self._lock:
+            return self._connection.execute("SELECT file_path, destination, size FROM assignments "
+                                            "WHERE source_folder = ?", (source_folder,)).fetchall()
+
+    def record_destination(self, folder_path: str):
+        with self._lock:
+            self._connection.execute("INSERT OR IGNORE INTO destinations VALUES "
+                                     "(?, (SELECT COALESCE(MAX(position), -1) + 1 FROM destinations))",
+                                     (folder_path,))
+
+    def record_destination_removal(self, folder_path: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM destinations WHERE folder_path = ?", (folder_path,))
+
+    def load_destinations(self) -> list:
+        with self._lock:
+            return [row[0] for row in
+                    self._connection.execute("SELECT folder_path FROM destinations ORDER BY position").fetchall()]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
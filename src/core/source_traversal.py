@@ -0,0 +1,113 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# Folders listed at the same time, listing is mostly waiting for the disk or the network share
+DEFAULT_TRAVERSAL_WORKERS = 8
+TRAVERSAL_BATCH_SIZE = 1000
+
+
+@dataclass
+class SourceRoot:
+    folder_path: str
+    # Levels of sub folders listed below the root, 0 for only the root and None for all of them
+    max_depth: Optional[int] = None
+
+
+class _Folder:
+    def __init__(self, folder_path: str, depth: int, max_depth: Optional[int], future: Future):
+        self.folder_path = folder_path
+        self.depth = depth
+        self.max_depth = max_depth
+        self.future = future
+        # Set once the folder is listed
+        self.sub_folders: Optional[list] = None
+
+
+def list_folder(folder_path: str) -> tuple:
+    # The os.DirEntry objects of the files and the paths of the sub folders of the folder, sorted by name.
+    # Links to folders are not followed.
+    file_entries = []
+    folder_paths = []
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        folder_paths.append(entry.path)
+                    elif not entry.is_dir():
+                        file_entries.append(entry)
+                except OSError as e:
+                    logging.warning(f"Could not read {entry.path}: {e}")
+    except OSError as e:
+        logging.warning(f"Could not list {folder_path}: {e}")
+    file_entries.sort(key=lambda entry: entry.name)
+    folder_paths.sort()
+    return file_entries, folder_paths
+
+
+def walk_sources(roots: list, on_files: Callable[[list], None],
+                 on_folder_listed: Optional[Callable[[str, list], None]] = None,
+                 cancelled: Optional[Callable[[], bool]] = None, excluded_folders: Optional[set] = None,
+                 n_workers: int = DEFAULT_TRAVERSAL_WORKERS, batch_size: int = TRAVERSAL_BATCH_SIZE) -> bool:
+    # Lists the roots and their sub folders in parallel, but hands the files to on_files in the same order
+    # every time: root by root, every folder's files by name followed by its sub folders by name.
+    # Files of a folder are passed on as soon as the folders before it are done, so the first files arrive
+    # long before the walk ends. on_folder_listed gets the os.DirEntry objects of the files of every folder
+    # before they are passed on. Returns False if it was cancelled.
+    excluded_folders = {os.path.abspath(folder_path) for folder_path in excluded_folders or ()}
+    batch = []
+    with ThreadPoolExecutor(n_workers) as executor:
+        listing: dict[Future, _Folder] = {}
+
+        def submit(folder_path: str, depth: int, max_depth: Optional[int]) -> _Folder:
+            folder = _Folder(folder_path, depth, max_depth, executor.submit(list_folder, folder_path))
+            listing[folder.future] = folder
+            return folder
+
+        def expand(folder: _Folder):
+            # Sub folders are listed as soon as their parent is, not when their turn to be passed on comes
+            listing.pop(folder.future, None)
+            if folder.sub_folders is not None:
+                return
+            folder.sub_folders = []
+            if folder.max_depth is not None and folder.depth >= folder.max_depth:
+                return
+            for folder_path in folder.future.result()[1]:
+                if os.path.abspath(folder_path) not in excluded_folders:
+                    folder.sub_folders.append(submit(folder_path, folder.depth + 1, folder.max_depth))
+
+        # Folders in the order their files are passed on, the next one last
+        to_pass_on = [submit(root.folder_path, 0, root.max_depth) for root in roots][::-1]
+        try:
+            while to_pass_on:
+                if cancelled is not None and cancelled():
+                    return False
+                folder = to_pass_on[-1]
+                if not folder.future.done():
+                    # Waiting for the disk, what was found so far is passed on in the meantime
+                    if batch:
+                        on_files(batch)
+                        batch = []
+                    done, _ = wait(list(listing), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        expand(listing[future])
+                    continue
+                to_pass_on.pop()
+                expand(folder)
+                file_entries = folder.future.result()[0]
+                if on_folder_listed is not None:
+                    on_folder_listed(folder.folder_path, file_entries)
+                batch.extend(entry.path for entry in file_entries)
+                if len(batch) >= batch_size:
+                    on_files(batch)
+                    batch = []
+                to_pass_on.extend(reversed(folder.sub_folders))
+        finally:
+            for future in listing:
+                future.cancel()
+    if batch:
+        on_files(batch)
+    return True
@@ -0,0 +1,144 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+from typing import Optional
+
+from PySide6.QtCore import QObject, QSocketNotifier, QTimer, Signal, QFileSystemWatcher
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    library_name = ctypes.util.find_library("c")
+    if not library_name:
+        return None
+    try:
+        libc = ctypes.CDLL(library_name, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class SourceWatcher(QObject):
+    # Reports changes in the watched folders as lists of full paths. Uses inotify where available
+    # and falls back to QFileSystemWatcher, which can only tell that something has changed.
+    files_added = Signal(list)
+    files_removed = Signal(list)
+    rescan_needed = Signal()
+
+    def __init__(self, flush_interval_ms: int = 200):
+        super().__init__()
+        self._added: dict[str, None] = {}
+        self._removed: dict[str, None] = {}
+        self._rescan = False
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval_ms)
+        self._flush_timer.timeout.connect(self._flush)
+
+        self._libc = _load_inotify()
+        self._inotify_fd = -1
+        self._notifier: Optional[QSocketNotifier] = None
+        self._watch_descriptors: dict[int, str] = {}
+        if self._libc is not None:
+            self._inotify_fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._inotify_fd >= 0:
+            self._notifier = QSocketNotifier(self._inotify_fd, QSocketNotifier.Type.Read, self)
+            self._notifier.activated.connect(self._read_inotify_events)
+            self._fallback_watcher = None
+        else:
+            logging.info("inotify is not available, falling back to rescanning on changes")
+            self._fallback_watcher = QFileSystemWatcher(self)
+            self._fallback_watcher.directoryChanged.connect(self._on_directory_changed)
+
+    def set_folders(self, folder_paths: list):
+        if self._fallback_watcher is not None:
+            if self._fallback_watcher.directories():
+                self._fallback_watcher.removePaths(self._fallback_watcher.directories())
+            if folder_paths:
+                self._fallback_watcher.addPaths(folder_paths)
+            return
+
+        for watch_descriptor in self._watch_descriptors:
+            self._libc.inotify_rm_watch(self._inotify_fd, watch_descriptor)
+        self._watch_descriptors.clear()
+        for folder_path in folder_paths:
+            watch_descriptor = self._libc.inotify_add_watch(self._inotify_fd, os.fsencode(folder_path), _WATCH_MASK)
+            if watch_descriptor < 0:
+                logging.warning(f"Could not watch {folder_path}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self._watch_descriptors[watch_descriptor] = folder_path
+
+    def close(self):
+        self.set_folders([])
+        if self._inotify_fd >= 0:
+            self._notifier.setEnabled(False)
+            os.close(self._inotify_fd)
+            self._inotify_fd = -1
+
+    def _read_inotify_events(self):
+        try:
+            data = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            watch_descriptor, mask, cookie, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._rescan = True
+                continue
+            folder_path = self._watch_descriptors.get(watch_descriptor)
+            if folder_path is None or not name:
+                continue
+            file_path = os.path.join(folder_path, os.fsdecode(name))
+            if mask & (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._removed.pop(file_path, None)
+                self._added[file_path] = None
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._added.pop(file_path, None)
+                self._removed[file_path] = None
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _on_directory_changed(self, folder_path: str):
+        self._rescan = True
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush(self):
+        if self._rescan:
+            self._rescan = False
+            self._added.clear()
+            self._removed.clear()
+            self.rescan_needed.emit()
+            return
+        if self._removed:
+            removed = list(self._removed)
+            self._removed.clear()
+            self.files_removed.emit(removed)
+        if self._added:
+            added = list(self._added)
+            self._added.clear()
+            self.files_added.emit(added)
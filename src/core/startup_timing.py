@@ -0,0 +1,101 @@
+import importlib.abc
+import logging
+import sys
+import time
+
+# The slowest modules listed in the report
+DEFAULT_REPORTED_MODULES = 15
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, timer: "StartupTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        start_time = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            # Includes the modules imported by this one
+            self._timer.add_import_time(module.__name__, time.perf_counter() - start_time)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimedFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, timer: "StartupTimer"):
+        self._timer = timer
+        self._finding = False
+
+    def find_spec(self, fullname, path, target=None):
+        if self._finding:
+            return None
+        self._finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self._timer)
+        return spec
+
+
+class StartupTimer:
+    # Records how long the phases of the start up take and how long every module took to import
+    def __init__(self):
+        self._start_time = time.perf_counter()
+        self._marks: list[tuple[str, float]] = []
+        self._import_times: dict[str, float] = {}
+        self._finder = None
+
+    def start_import_timing(self):
+        if self._finder is None:
+            self._finder = _TimedFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def stop_import_timing(self):
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def add_import_time(self, module_name: str, seconds: float):
+        self._import_times[module_name] = seconds
+
+    def mark(self, label: str):
+        self._marks.append((label, time.perf_counter()))
+
+    def get_marks(self) -> list:
+        # (label, seconds since the previous mark)
+        marks = []
+        previous_time = self._start_time
+        for label, mark_time in self._marks:
+            marks.append((label, mark_time - previous_time))
+            previous_time = mark_time
+        return marks
+
+    def get_import_times(self) -> dict:
+        return self._import_times
+
+    def log_report(self, addon_load_times: dict = None, n_modules: int = DEFAULT_REPORTED_MODULES):
+        total_time = self._marks[-1][1] - self._start_time if self._marks else 0
+        logging.info(f"Start up took {total_time * 1000:.0f} ms")
+        for label, seconds in self.get_marks():
+            logging.info(f"  {label}: {seconds * 1000:.0f} ms")
+        slowest_modules = sorted(self._import_times.items(), key=lambda item: item[1], reverse=True)[:n_modules]
+        logging.info(f"Slowest of {len(self._import_times)} imported modules, including their own imports:")
+        for module_name, seconds in slowest_modules:
+            logging.info(f"  {module_name}: {seconds * 1000:.1f} ms")
+        for addon_name, seconds in (addon_load_times or {}).items():
+            logging.info(f"Addon {addon_name} loaded in {seconds * 1000:.0f} ms")
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import struct
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import Optional
+
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage
+
+from src.core.preview_cache import CachedPreview
+
+# Layout of https://specifications.freedesktop.org/thumbnail-spec/latest/
+THUMBNAIL_BUCKETS = [("normal", 128), ("large", 256), ("x-large", 512), ("xx-large", 1024)]
+DEFAULT_THUMBNAIL_FOLDER = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                                        "thumbnails")
+DEFAULT_THUMBNAIL_CACHE_SIZE_MB = 512
+SOFTWARE_NAME = "informed-file-sorter"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Qt writes the text chunks ahead of the image data
+_PNG_HEADER_READ_SIZE = 64 * 1024
+
+
+def is_own_thumbnail(thumbnail_path: str) -> bool:
+    # The folder is shared with other applications, only thumbnails tagged by us are counted and evicted
+    try:
+        with open(thumbnail_path, "rb") as file:
+            header = file.read(_PNG_HEADER_READ_SIZE)
+    except OSError:
+        return False
+    if not header.startswith(_PNG_SIGNATURE):
+        return False
+    software_text = b"Software\0" + SOFTWARE_NAME.encode()
+    position = len(_PNG_SIGNATURE)
+    while position + 8 <= len(header):
+        length, chunk_type = struct.unpack_from(">I4s", header, position)
+        if chunk_type == b"IDAT":
+            return False
+        if chunk_type == b"tEXt" and header[position + 8:position + 8 + length] == software_text:
+            return True
+        position += length + 12
+    return False
+
+
+class ThumbnailCache:
+    def __init__(self, folder_path: str = DEFAULT_THUMBNAIL_FOLDER,
+                 max_size_in_bytes: int = DEFAULT_THUMBNAIL_CACHE_SIZE_MB * 1024 * 1024):
+        self._folder_path = folder_path
+        self._max_size_in_bytes = max_size_in_bytes
+        self._lock = threading.Lock()
+        # thumbnail path -> size in bytes, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size_in_bytes = 0
+        self._scanned = False
+
+        for bucket_name, bucket_size in THUMBNAIL_BUCKETS:
+            os.makedirs(os.path.join(folder_path, bucket_name), mode=0o700, exist_ok=True)
+        # Sizing up an existing cache can take a while, eviction waits until it is done
+        threading.Thread(target=self._scan, daemon=True).start()
+
+    @staticmethod
+    def get_bucket(target_size: QSize) -> Optional[tuple]:
+        longest_side = max(target_size.width(), target_size.height())
+        for bucket_name, bucket_size in THUMBNAIL_BUCKETS:
+            if bucket_size >= longest_side:
+                return bucket_name, bucket_size
+        return None
+
+    def get_thumbnail_path(self, file_path: str, bucket_name: str) -> str:
+        uri = "file://" + urllib.parse.quote(os.path.abspath(file_path))
+        return os.path.join(self._folder_path, bucket_name, hashlib.md5(uri.encode()).hexdigest() + ".png")
+
+    def load(self, file_path: str, target_size: QSize) -> Optional[CachedPreview]:
+        bucket = self.get_bucket(target_size)
+        if bucket is None:
+            return None
+        thumbnail_path = self.get_thumbnail_path(file_path, bucket[0])
+        if not os.path.exists(thumbnail_path):
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        image = QImage(thumbnail_path)
+        if image.isNull():
+            return None
+        if image.text("Thumb::MTime") != str(int(stat.st_mtime)) or image.text("Thumb::Size") != str(stat.st_size):
+            return None
+        try:
+            source_size = QSize(int(image.text("Thumb::Image::Width")), int(image.text("Thumb::Image::Height")))
+        except ValueError:
+            return None
+
+        try:
+            os.utime(thumbnail_path)
+        except OSError:
+            pass
+        with self._lock:
+            if thumbnail_path in self._entries:
+                self._entries.move_to_end(thumbnail_path)
+        return CachedPreview(image, source_size)
+
+    def save(self, file_path: str, preview: CachedPreview):
+        bucket = self.get_bucket(preview.image.size())
+        if bucket is None or preview.source_size == preview.image.size():
+            # Not a reduced image, reading the original is as cheap as reading the thumbnail
+            return
+        bucket_name, bucket_size = bucket
+        if os.path.abspath(file_path).startswith(os.path.abspath(self._folder_path) + os.sep):
+            return
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+
+        image = preview.image
+        if image.width() > bucket_size or image.height() > bucket_size:
+            image = image.scaled(QSize(bucket_size, bucket_size), Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        else:
+            image = image.copy()
+        image.setText("Thumb::URI", "file://" + urllib.parse.quote(os.path.abspath(file_path)))
+        image.setText("Thumb::MTime", str(int(stat.st_mtime)))
+        image.setText("Thumb::Size", str(stat.st_size))
+        image.setText("Thumb::Image::Width", str(preview.source_size.width()))
+        image.setText("Thumb::Image::Height", str(preview.source_size.height()))
+        image.setText("Software", SOFTWARE_NAME)
+
+        thumbnail_path = self.get_thumbnail_path(file_path, bucket_name)
+        temporary_path = f"{thumbnail_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if not image.save(temporary_path, "PNG"):
+                raise OSError(f"Could not write {temporary_path}")
+            os.chmod(temporary_path, 0o600)
+            os.replace(temporary_path, thumbnail_path)
+            thumbnail_size = os.path.getsize(thumbnail_path)
+        except OSError as e:
+            logging.warning(f"Could not save thumbnail for {file_path}: {e}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            return
+
+        with self._lock:
+            self._size_in_bytes -= self._entries.pop(thumbnail_path, 0)
+            self._entries[thumbnail_path] = thumbnail_size
+            self._size_in_bytes += thumbnail_size
+            self._evict()
+
+    def get_size_in_bytes(self) -> int:
+        return self._size_in_bytes
+
+    def _scan(self):
+        found = []
+        for bucket_name, bucket_size in THUMBNAIL_BUCKETS:
+            try:
+                with os.scandir(os.path.join(self._folder_path, bucket_name)) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".png") and entry.is_file() and is_own_thumbnail(entry.path):
+                            stat = entry.stat()
+                            found.append((stat.st_mtime, entry.path, stat.st_size))
+            except OSError as e:
+                logging.warning(f"Could not scan the thumbnail cache: {e}")
+        found.sort()
+
+        with self._lock:
+            # Thumbnails saved while scanning are the most recently used ones
+            scanned_entries = OrderedDict((path, size) for mtime, path, size in found if path not in self._entries)
+            scanned_entries.update(self._entries)
+            self._entries = scanned_entries
+            self._size_in_bytes = sum(self._entries.values())
+            self._scanned = True
+            self._evict()
+
+    def _evict(self):
+        if not self._scanned:
+            return
+        while self._size_in_bytes > self._max_size_in_bytes and self._entries:
+            thumbnail_path, thumbnail_size = self._entries.popitem(last=False)
+            self._size_in_bytes -= thumbnail_size
+            try:
+                os.remove(thumbnail_path)
+            except OSError:
+                pass
@@ -0,0 +1,186 @@
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+# The oldest events are dropped once there are this many, a long session can't run out of memory
+DEFAULT_MAX_EVENTS = 1000000
+# Latencies of the last frames the percentiles are computed from
+FRAME_HISTORY = 500
+FRAME_EVENT = "frame"
+
+
+class _NoSpan:
+    # Returned while tracing is disabled, entering and leaving it does nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_category", "_args", "_start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Optional[dict]):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+
+    def __enter__(self):
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._tracer.add_event(self._name, self._category, self._start_ns, time.perf_counter_ns(), self._args)
+        return False
+
+
+class Tracer:
+    # Collects timed spans from any thread. A frame is the time from a navigation step until its preview is
+    # on screen, see start_frame and end_frame.
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+        self._start_ns = time.perf_counter_ns()
+        # (name, category, start, end, thread id, args), appending to a deque is atomic
+        self._events: deque = deque(maxlen=max_events)
+        self._thread_names: dict[int, str] = {}
+        self._frame_start_ns: Optional[int] = None
+        self._frame_durations: deque = deque(maxlen=FRAME_HISTORY)
+
+    def add_event(self, name: str, category: str, start_ns: int, end_ns: int, args: Optional[dict] = None):
+        thread_id = threading.get_ident()
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        self._events.append((name, category, start_ns, end_ns, thread_id, args))
+
+    def start_frame(self):
+        # A step that is overtaken by the next one before its preview is shown is not counted
+        self._frame_start_ns = time.perf_counter_ns()
+
+    def end_frame(self):
+        start_ns = self._frame_start_ns
+        if start_ns is None:
+            return
+        self._frame_start_ns = None
+        end_ns = time.perf_counter_ns()
+        self.add_event(FRAME_EVENT, "frame", start_ns, end_ns)
+        self._frame_durations.append((end_ns - start_ns) / 1e6)
+
+    def get_frame_percentiles(self) -> dict:
+        # In milliseconds, empty until a frame was shown
+        durations = sorted(self._frame_durations)
+        if not durations:
+            return {}
+        return {"n": len(durations), "p50": durations[len(durations) // 2],
+                "p95": durations[min(len(durations) * 95 // 100, len(durations) - 1)],
+                "p99": durations[min(len(durations) * 99 // 100, len(durations) - 1)], "max": durations[-1]}
+
+    def get_recent_totals(self, seconds: float) -> dict:
+        # Span name -> milliseconds spent in it during the last seconds, frames excluded
+        since_ns = time.perf_counter_ns() - int(seconds * 1e9)
+        totals = {}
+        for name, category, start_ns, end_ns, thread_id, args in itertools.takewhile(
+                lambda event: event[3] >= since_ns, reversed(self._events.copy())):
+            if name != FRAME_EVENT:
+                totals[name] = totals.get(name, 0.0) + (end_ns - start_ns) / 1e6
+        return totals
+
+    def get_events(self) -> list:
+        return list(self._events)
+
+    def clear(self):
+        self._events.clear()
+        self._frame_durations.clear()
+
+    def to_chrome_trace(self) -> dict:
+        # The Trace Event Format read by chrome://tracing and ui.perfetto.dev, times in microseconds
+        process_id = os.getpid()
+        trace_events = [{"name": "thread_name", "ph": "M", "pid": process_id, "tid": thread_id,
+                         "args": {"name": thread_name}} for thread_id, thread_name in self._thread_names.items()]
+        for name, category, start_ns, end_ns, thread_id, args in self._events.copy():
+            trace_event = {"name": name, "cat": category, "ph": "X", "ts": (start_ns - self._start_ns) / 1000,
+                           "dur": (end_ns - start_ns) / 1000, "pid": process_id, "tid": thread_id}
+            if args:
+                trace_event["args"] = args
+            trace_events.append(trace_event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, file_path: str):
+        with open(file_path, "w") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable_tracing(max_events: int = DEFAULT_MAX_EVENTS) -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(max_events)
+    return _tracer
+
+
+def disable_tracing() -> Optional[Tracer]:
+    # Returns the tracer with what it collected
+    global _tracer
+    tracer = _tracer
+    _tracer = None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, category: str = "app", args: Optional[dict] = None):
+    # with span("decode", "preview", {"file": file_path}): ... While tracing is disabled this only costs a call
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    return _Span(tracer, name, category, args)
+
+
+def start_frame():
+    tracer = _tracer
+    if tracer is not None:
+        tracer.start_frame()
+
+
+def end_frame():
+    tracer = _tracer
+    if tracer is not None:
+        tracer.end_frame()
+
+
+def traced_slot(slot: Callable, name: str, category: str = "slot") -> Callable:
+    # Wraps a slot so each call is a span. Qt passes the signal arguments the slot can take, the wrapper
+    # takes any number of them, so it drops the ones the slot never accepted.
+    try:
+        parameters = inspect.signature(slot).parameters.values()
+        if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters):
+            n_arguments = None
+        else:
+            n_arguments = sum(parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+                              for parameter in parameters)
+    except (TypeError, ValueError):
+        n_arguments = None
+
+    @functools.wraps(slot)
+    def traced(*args):
+        if n_arguments is not None:
+            args = args[:n_arguments]
+        tracer = _tracer
+        if tracer is None:
+            return slot(*args)
+        with _Span(tracer, name, category, None):
+            return slot(*args)
+    return traced
@@ -14,6 +14,9 @@ class UserConfig:
         else:
             os.mkdir(config_folder_path)
 
+    def get_config_folder_path(self) -> str:
+        return self._config_folder_path
+
     def load_config(self, identifier: str):
         conf_file = f"{identifier}.cfg"
         unpickled = None
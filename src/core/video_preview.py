@@ -0,0 +1,63 @@
+import logging
+import os.path
+import re
+import shutil
+import subprocess
+from typing import Optional
+
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QImage
+
+from src.core.preview_cache import CachedPreview
+
+VIDEO_EXTENSIONS = {"mp4", "m4v", "mov", "mkv", "webm", "avi", "wmv", "mpg", "mpeg", "3gp"}
+# The most typical of the first keyframes is the thumbnail, the very first one is often a black title
+VIDEO_THUMBNAIL_KEYFRAMES = 5
+VIDEO_THUMBNAIL_TIMEOUT = 20
+
+_VIDEO_SIZE_PATTERN = re.compile(r"Stream #.*?: Video: .*?, (\d+)x(\d+)")
+
+_ffmpeg_path: Optional[str] = None
+_ffmpeg_looked_up = False
+
+
+def get_ffmpeg_path() -> Optional[str]:
+    global _ffmpeg_path, _ffmpeg_looked_up
+    if not _ffmpeg_looked_up:
+        _ffmpeg_path = shutil.which("ffmpeg")
+        _ffmpeg_looked_up = True
+    return _ffmpeg_path
+
+
+def is_video(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1][1:].lower() in VIDEO_EXTENSIONS
+
+
+def load_video_preview(file_path: str, target_size: Optional[QSize] = None) -> Optional[CachedPreview]:
+    # Only keyframes are decoded, so a frame of a long or large video is found without decoding the video.
+    # Safe to call from worker threads.
+    ffmpeg_path = get_ffmpeg_path()
+    if ffmpeg_path is None:
+        return None
+    filters = f"thumbnail={VIDEO_THUMBNAIL_KEYFRAMES}"
+    if target_size is not None:
+        filters += (f",scale='min(iw\\,{target_size.width()})':'min(ih\\,{target_size.height()})'"
+                    f":force_original_aspect_ratio=decrease")
+    command = [ffmpeg_path, "-hide_banner", "-nostdin", "-skip_frame", "nokey", "-i", file_path, "-an", "-sn",
+               "-vf", filters, "-frames:v", "1", "-f", "image2pipe", "-c:v", "png", "-"]
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 timeout=VIDEO_THUMBNAIL_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.warning(f"Could not get a frame of {file_path}: {e}")
+        return None
+    image = QImage.fromData(process.stdout, "png")
+    if process.returncode != 0 or image.isNull():
+        logging.info(f"Could not get a frame of {file_path}: {process.stderr.decode(errors='replace')[-300:]}")
+        return None
+
+    size_match = _VIDEO_SIZE_PATTERN.search(process.stderr.decode(errors="replace"))
+    source_size = QSize(int(size_match.group(1)), int(size_match.group(2))) if size_match else image.size()
+    if source_size.isEmpty():
+        source_size = image.size()
+    return CachedPreview(image, source_size)
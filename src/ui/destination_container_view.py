@@ -1,15 +1,70 @@
+from typing import Optional
+
 from PySide6 import QtCore
 from PySide6.QtWidgets import QHBoxLayout, QWidget
+from src.ui.destination_folder_view import DestinationFolderView
 
 
 class DestinationContainerLayout(QWidget):
     folders_dropped = QtCore.Signal(list)
+    destination_clicked = QtCore.Signal(str)
+    destination_removed = QtCore.Signal(str)
 
     def __init__(self):
         super().__init__()
         self.setAcceptDrops(True)
         self.setLayout(QHBoxLayout(self))
 
+        # Widgets are kept between reloads, only the changed ones are touched
+        self._destination_views: dict[str, DestinationFolderView] = {}
+        self._destination_paths = []
+        self._highlighted_path = None
+
+    def get_destination_view(self, folder_path: str) -> Optional[DestinationFolderView]:
+        return self._destination_views.get(folder_path)
+
+    def set_destinations(self, folder_paths: list):
+        if folder_paths == self._destination_paths:
+            return
+
+        for folder_path in self._destination_paths:
+            if folder_path not in folder_paths:
+                destination_view = self._destination_views.pop(folder_path)
+                self.layout().removeWidget(destination_view)
+                destination_view.setParent(None)
+                destination_view.deleteLater()
+                if folder_path == self._highlighted_path:
+                    self._highlighted_path = None
+
+        for i, folder_path in enumerate(folder_paths):
+            destination_view = self._destination_views.get(folder_path)
+            if destination_view is None:
+                destination_view = DestinationFolderView(folder_path, False, i)
+                destination_view.onClickWPath.connect(self.destination_clicked)
+                destination_view.onRemoveWPath.connect(self.destination_removed)
+                self._destination_views[folder_path] = destination_view
+            else:
+                destination_view.set_index(i)
+            if self.layout().indexOf(destination_view) != i:
+                self.layout().insertWidget(i, destination_view)
+
+        self._destination_paths = list(folder_paths)
+
+    def set_pending(self, folder_path: str, n_files: int, size_in_bytes: int):
+        if folder_path in self._destination_views:
+            self._destination_views[folder_path].set_pending(n_files, size_in_bytes)
+
+    def set_highlighted(self, folder_path: Optional[str]):
+        if folder_path == self._highlighted_path:
+            return
+        if self._highlighted_path in self._destination_views:
+            self._destination_views[self._highlighted_path].set_highlight(False)
+        if folder_path in self._destination_views:
+            self._destination_views[folder_path].set_highlight(True)
+            self._highlighted_path = folder_path
+        else:
+            self._highlighted_path = None
+
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls:
             event.accept()
@@ -1,4 +1,5 @@
 import os.path
+from typing import Optional
 
 from PySide6 import QtCore
 from PySide6.QtCore import QKeyCombination
@@ -7,6 +8,15 @@ from PySide6.QtWidgets import QWidget
 from src.ui.ui_destination_folder import Ui_destinationFolder
 
 
+def format_size(size_in_bytes: int) -> str:
+    size = float(size_in_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
 class DestinationFolderView(QWidget):
     onClickWPath = QtCore.Signal(str)
     onRemoveWPath = QtCore.Signal(str)
@@ -21,20 +31,57 @@ class DestinationFolderView(QWidget):
         self._ui.btRemove.clicked.connect(self.on_remove)
 
         self._shortcut = None
+        self._index = index
+        self._highlight = False
+        self._pending = (0, 0)
+
+        self._update_name()
+        self.set_highlight(highlight)
+
+    def get_folder_path(self) -> str:
+        return self._folder_path
+
+    def set_index(self, index: Optional[int]):
+        if index == self._index:
+            return
+        self._index = index
+        self._update_name()
 
-        number = None
-        if index is not None and index < 10:
-            number = (index + 1) % 10
-            self._shortcut = QShortcut(self)
+    def _update_name(self):
+        if self._index is not None and self._index < 10:
+            number = (self._index + 1) % 10
+            if self._shortcut is None:
+                self._shortcut = QShortcut(self)
+                self._shortcut.activated.connect(self.on_add)
             self._shortcut.setKey(str(number))
-            self._shortcut.activated.connect(self.on_add)
-            self._ui.lbName.setText(f"[{number}] {os.path.basename(folder_path)}")
+            self._ui.lbName.setText(f"[{number}] {os.path.basename(self._folder_path)}")
         else:
-            self._ui.lbName.setText(os.path.basename(folder_path))
+            if self._shortcut is not None:
+                self._shortcut.setParent(None)
+                self._shortcut.deleteLater()
+                self._shortcut = None
+            self._ui.lbName.setText(os.path.basename(self._folder_path))
+
+    def set_highlight(self, highlight: bool):
+        if highlight == self._highlight:
+            return
+        self._highlight = highlight
 
         if highlight:
             self._ui.lbName.setStyleSheet("font-weight: bold; text-decoration: underline")
             self._ui.btAdd.setStyleSheet("background: #555555")
+        else:
+            self._ui.lbName.setStyleSheet("")
+            self._ui.btAdd.setStyleSheet("")
+
+    def set_pending(self, n_files: int, size_in_bytes: int):
+        if (n_files, size_in_bytes) == self._pending:
+            return
+        self._pending = (n_files, size_in_bytes)
+        if n_files == 0:
+            self._ui.lbPending.setText("")
+        else:
+            self._ui.lbPending.setText(f"{n_files} {'file' if n_files == 1 else 'files'}, {format_size(size_in_bytes)}")
 
     def on_add(self):
         self.onClickWPath.emit(self._folder_path)
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+################################################################################
+## Form generated from reading UI file 'main_window.ui'
+##
+## Created by: Qt User Interface Compiler version 6.12.0
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
+    QMetaObject, QObject, QPoint, QRect,
+    QSize, QTime, QUrl, Qt)
+from PySide6.QtGui import (QAction, QBrush, QColor, QConicalGradient,
+    QCursor, QFont, QFontDatabase, QGradient,
+    QIcon, QImage, QKeySequence, QLinearGradient,
+    QPainter, QPalette, QPixmap, QRadialGradient,
+    QTransform)
+from PySide6.QtWidgets import (QApplication, QFrame, QHBoxLayout, QMainWindow,
+    QMenu, QMenuBar, QScrollArea, QSizePolicy,
+    QSplitter, QToolBar, QVBoxLayout, QWidget)
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        if not MainWindow.objectName():
+            MainWindow.setObjectName(u"MainWindow")
+        MainWindow.resize(800, 585)
+        self.actionNext_file = QAction(MainWindow)
+        self.actionNext_file.setObjectName(u"actionNext_file")
+        icon = QIcon()
+        iconThemeName = u"go-next"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon = QIcon.fromTheme(iconThemeName)
+        else:
+            icon.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionNext_file.setIcon(icon)
+        self.actionPrevious_file = QAction(MainWindow)
+        self.actionPrevious_file.setObjectName(u"actionPrevious_file")
+        icon1 = QIcon()
+        iconThemeName = u"go-previous"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon1 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon1.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionPrevious_file.setIcon(icon1)
+        self.actionDelete_file = QAction(MainWindow)
+        self.actionDelete_file.setObjectName(u"actionDelete_file")
+        icon2 = QIcon()
+        iconThemeName = u"emblem-unreadable"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon2 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon2.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionDelete_file.setIcon(icon2)
+        self.actionFilter = QAction(MainWindow)
+        self.actionFilter.setObjectName(u"actionFilter")
+        icon3 = QIcon()
+        iconThemeName = u"edit-find"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon3 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon3.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionFilter.setIcon(icon3)
+        self.actionOpen_source = QAction(MainWindow)
+        self.actionOpen_source.setObjectName(u"actionOpen_source")
+        icon4 = QIcon()
+        iconThemeName = u"document-open"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon4 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon4.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionOpen_source.setIcon(icon4)
+        self.actionOpen_new_destination = QAction(MainWindow)
+        self.actionOpen_new_destination.setObjectName(u"actionOpen_new_destination")
+        icon5 = QIcon()
+        iconThemeName = u"folder-new"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon5 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon5.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionOpen_new_destination.setIcon(icon5)
+        self.actionConfirm = QAction(MainWindow)
+        self.actionConfirm.setObjectName(u"actionConfirm")
+        icon6 = QIcon()
+        iconThemeName = u"document-save"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon6 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon6.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionConfirm.setIcon(icon6)
+        self.actionZoom_in = QAction(MainWindow)
+        self.actionZoom_in.setObjectName(u"actionZoom_in")
+        icon7 = QIcon()
+        iconThemeName = u"zoom-in"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon7 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon7.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionZoom_in.setIcon(icon7)
+        self.actionZoom_out = QAction(MainWindow)
+        self.actionZoom_out.setObjectName(u"actionZoom_out")
+        icon8 = QIcon()
+        iconThemeName = u"zoom-out"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon8 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon8.addFile(u"../../../../../../../../home/imat/.designer/backup", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionZoom_out.setIcon(icon8)
+        self.actionClear_assignments = QAction(MainWindow)
+        self.actionClear_assignments.setObjectName(u"actionClear_assignments")
+        icon9 = QIcon()
+        iconThemeName = u"edit-undo"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon9 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon9.addFile(u".", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.actionClear_assignments.setIcon(icon9)
+        self.actionReload_source = QAction(MainWindow)
+        self.actionReload_source.setObjectName(u"actionReload_source")
+        icon10 = QIcon(QIcon.fromTheme(u"view-refresh"))
+        self.actionReload_source.setIcon(icon10)
+        self.actionUndo_apply = QAction(MainWindow)
+        self.actionUndo_apply.setObjectName(u"actionUndo_apply")
+        icon11 = QIcon(QIcon.fromTheme(u"document-revert"))
+        self.actionUndo_apply.setIcon(icon11)
+        self.actionMetadata_filter = QAction(MainWindow)
+        self.actionMetadata_filter.setObjectName(u"actionMetadata_filter")
+        icon12 = QIcon(QIcon.fromTheme(u"view-filter"))
+        self.actionMetadata_filter.setIcon(icon12)
+        self.actionSort = QAction(MainWindow)
+        self.actionSort.setObjectName(u"actionSort")
+        icon13 = QIcon(QIcon.fromTheme(u"view-sort-ascending"))
+        self.actionSort.setIcon(icon13)
+        self.actionInclude_sub_folders = QAction(MainWindow)
+        self.actionInclude_sub_folders.setObjectName(u"actionInclude_sub_folders")
+        self.actionInclude_sub_folders.setCheckable(True)
+        self.actionTiming_overlay = QAction(MainWindow)
+        self.actionTiming_overlay.setObjectName(u"actionTiming_overlay")
+        self.actionTiming_overlay.setCheckable(True)
+        self.centralwidget = QWidget(MainWindow)
+        self.centralwidget.setObjectName(u"centralwidget")
+        self.verticalLayout_2 = QVBoxLayout(self.centralwidget)
+        self.verticalLayout_2.setObjectName(u"verticalLayout_2")
+        self.spAddons = QSplitter(self.centralwidget)
+        self.spAddons.setObjectName(u"spAddons")
+        self.spAddons.setOrientation(Qt.Horizontal)
+        self.spAddons.setHandleWidth(15)
+        self.spPreview = QSplitter(self.spAddons)
+        self.spPreview.setObjectName(u"spPreview")
+        sizePolicy = QSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Expanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.spPreview.sizePolicy().hasHeightForWidth())
+        self.spPreview.setSizePolicy(sizePolicy)
+        self.spPreview.setOrientation(Qt.Vertical)
+        self.spPreview.setHandleWidth(15)
+        self.saPreview = QScrollArea(self.spPreview)
+        self.saPreview.setObjectName(u"saPreview")
+        sizePolicy1 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.MinimumExpanding)
+        sizePolicy1.setHorizontalStretch(0)
+        sizePolicy1.setVerticalStretch(0)
+        sizePolicy1.setHeightForWidth(self.saPreview.sizePolicy().hasHeightForWidth())
+        self.saPreview.setSizePolicy(sizePolicy1)
+        self.saPreview.setWidgetResizable(True)
+        self.saPreview.setAlignment(Qt.AlignCenter)
+        self.vbPreviewContainer = QWidget()
+        self.vbPreviewContainer.setObjectName(u"vbPreviewContainer")
+        self.vbPreviewContainer.setGeometry(QRect(0, 0, 695, 244))
+        self.verticalLayout_3 = QVBoxLayout(self.vbPreviewContainer)
+        self.verticalLayout_3.setObjectName(u"verticalLayout_3")
+        self.saPreview.setWidget(self.vbPreviewContainer)
+        self.spPreview.addWidget(self.saPreview)
+        self.saDestinations = QScrollArea(self.spPreview)
+        self.saDestinations.setObjectName(u"saDestinations")
+        sizePolicy1.setHeightForWidth(self.saDestinations.sizePolicy().hasHeightForWidth())
+        self.saDestinations.setSizePolicy(sizePolicy1)
+        self.saDestinations.setFrameShadow(QFrame.Sunken)
+        self.saDestinations.setLineWidth(1)
+        self.saDestinations.setWidgetResizable(True)
+        self.hlDestinations = QWidget()
+        self.hlDestinations.setObjectName(u"hlDestinations")
+        self.hlDestinations.setGeometry(QRect(0, 0, 695, 243))
+        self.horizontalLayout = QHBoxLayout(self.hlDestinations)
+        self.horizontalLayout.setObjectName(u"horizontalLayout")
+        self.saDestinations.setWidget(self.hlDestinations)
+        self.spPreview.addWidget(self.saDestinations)
+        self.spAddons.addWidget(self.spPreview)
+        self.verticalLayoutWidget = QWidget(self.spAddons)
+        self.verticalLayoutWidget.setObjectName(u"verticalLayoutWidget")
+        self.vlAddonsBar = QVBoxLayout(self.verticalLayoutWidget)
+        self.vlAddonsBar.setObjectName(u"vlAddonsBar")
+        self.vlAddonsBar.setContentsMargins(0, 0, 0, 0)
+        self.spAddons.addWidget(self.verticalLayoutWidget)
+
+        self.verticalLayout_2.addWidget(self.spAddons)
+
+        MainWindow.setCentralWidget(self.centralwidget)
+        self.toolBar = QToolBar(MainWindow)
+        self.toolBar.setObjectName(u"toolBar")
+        MainWindow.addToolBar(Qt.ToolBarArea.TopToolBarArea, self.toolBar)
+        self.menuBar = QMenuBar(MainWindow)
+        self.menuBar.setObjectName(u"menuBar")
+        self.menuBar.setGeometry(QRect(0, 0, 800, 22))
+        self.menuFile = QMenu(self.menuBar)
+        self.menuFile.setObjectName(u"menuFile")
+        self.menuView = QMenu(self.menuBar)
+        self.menuView.setObjectName(u"menuView")
+        MainWindow.setMenuBar(self.menuBar)
+
+        self.toolBar.addAction(self.actionPrevious_file)
+        self.toolBar.addAction(self.actionNext_file)
+        self.toolBar.addAction(self.actionDelete_file)
+        self.toolBar.addAction(self.actionFilter)
+        self.toolBar.addAction(self.actionMetadata_filter)
+        self.toolBar.addAction(self.actionSort)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.actionOpen_source)
+        self.toolBar.addAction(self.actionOpen_new_destination)
+        self.toolBar.addAction(self.actionReload_source)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.actionConfirm)
+        self.toolBar.addAction(self.actionClear_assignments)
+        self.toolBar.addAction(self.actionUndo_apply)
+        self.toolBar.addSeparator()
+        self.toolBar.addAction(self.actionZoom_in)
+        self.toolBar.addAction(self.actionZoom_out)
+        self.menuBar.addAction(self.menuFile.menuAction())
+        self.menuBar.addAction(self.menuView.menuAction())
+        self.menuFile.addAction(self.actionOpen_source)
+        self.menuFile.addAction(self.actionOpen_new_destination)
+        self.menuFile.addAction(self.actionReload_source)
+        self.menuFile.addAction(self.actionInclude_sub_folders)
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionConfirm)
+        self.menuFile.addAction(self.actionClear_assignments)
+        self.menuFile.addAction(self.actionUndo_apply)
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionNext_file)
+        self.menuFile.addAction(self.actionPrevious_file)
+        self.menuFile.addAction(self.actionDelete_file)
+        self.menuFile.addAction(self.actionFilter)
+        self.menuFile.addAction(self.actionMetadata_filter)
+        self.menuFile.addAction(self.actionSort)
+        self.menuView.addAction(self.actionZoom_in)
+        self.menuView.addAction(self.actionZoom_out)
+        self.menuView.addSeparator()
+        self.menuView.addAction(self.actionTiming_overlay)
+
+        self.retranslateUi(MainWindow)
+
+        QMetaObject.connectSlotsByName(MainWindow)
+    # setupUi
+
+    def retranslateUi(self, MainWindow):
+        MainWindow.setWindowTitle(QCoreApplication.translate("MainWindow", u"File sorter", None))
+        self.actionNext_file.setText(QCoreApplication.translate("MainWindow", u"Next file", None))
+#if QT_CONFIG(shortcut)
+        self.actionNext_file.setShortcut(QCoreApplication.translate("MainWindow", u"Right", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionPrevious_file.setText(QCoreApplication.translate("MainWindow", u"Previous file", None))
+#if QT_CONFIG(shortcut)
+        self.actionPrevious_file.setShortcut(QCoreApplication.translate("MainWindow", u"Left", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionDelete_file.setText(QCoreApplication.translate("MainWindow", u"Delete file", None))
+#if QT_CONFIG(shortcut)
+        self.actionDelete_file.setShortcut(QCoreApplication.translate("MainWindow", u"X", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionFilter.setText(QCoreApplication.translate("MainWindow", u"Filter", None))
+#if QT_CONFIG(shortcut)
+        self.actionFilter.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+F", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionOpen_source.setText(QCoreApplication.translate("MainWindow", u"Open source folder", None))
+#if QT_CONFIG(shortcut)
+        self.actionOpen_source.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+N", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionOpen_new_destination.setText(QCoreApplication.translate("MainWindow", u"Open new destination", None))
+#if QT_CONFIG(shortcut)
+        self.actionOpen_new_destination.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+O", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionConfirm.setText(QCoreApplication.translate("MainWindow", u"Confirm", None))
+#if QT_CONFIG(shortcut)
+        self.actionConfirm.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+S", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionZoom_in.setText(QCoreApplication.translate("MainWindow", u"Zoom in", None))
+#if QT_CONFIG(shortcut)
+        self.actionZoom_in.setShortcut(QCoreApplication.translate("MainWindow", u"+", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionZoom_out.setText(QCoreApplication.translate("MainWindow", u"Zoom out", None))
+#if QT_CONFIG(shortcut)
+        self.actionZoom_out.setShortcut(QCoreApplication.translate("MainWindow", u"-", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionClear_assignments.setText(QCoreApplication.translate("MainWindow", u"Clear assignments", None))
+        self.actionReload_source.setText(QCoreApplication.translate("MainWindow", u"Reload source", None))
+#if QT_CONFIG(shortcut)
+        self.actionReload_source.setShortcut(QCoreApplication.translate("MainWindow", u"F5", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionUndo_apply.setText(QCoreApplication.translate("MainWindow", u"Undo last apply", None))
+#if QT_CONFIG(shortcut)
+        self.actionUndo_apply.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Z", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionMetadata_filter.setText(QCoreApplication.translate("MainWindow", u"Filter by metadata", None))
+#if QT_CONFIG(shortcut)
+        self.actionMetadata_filter.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Shift+F", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionSort.setText(QCoreApplication.translate("MainWindow", u"Sort", None))
+#if QT_CONFIG(shortcut)
+        self.actionSort.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Shift+S", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionInclude_sub_folders.setText(QCoreApplication.translate("MainWindow", u"Include sub folders", None))
+#if QT_CONFIG(shortcut)
+        self.actionInclude_sub_folders.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Shift+R", None))
+#endif // QT_CONFIG(shortcut)
+        self.actionTiming_overlay.setText(QCoreApplication.translate("MainWindow", u"Timing overlay", None))
+#if QT_CONFIG(shortcut)
+        self.actionTiming_overlay.setShortcut(QCoreApplication.translate("MainWindow", u"Ctrl+Shift+T", None))
+#endif // QT_CONFIG(shortcut)
+        self.toolBar.setWindowTitle(QCoreApplication.translate("MainWindow", u"toolBar", None))
+        self.menuFile.setTitle(QCoreApplication.translate("MainWindow", u"File", None))
+        self.menuView.setTitle(QCoreApplication.translate("MainWindow", u"View", None))
+    # retranslateUi
+
@@ -1,21 +1,44 @@
 import logging
 import os.path
+from typing import Optional
 
 from PySide6 import QtCore
-from PySide6.QtCore import QSize
-from PySide6.QtGui import QPixmap, QImageReader
+from PySide6.QtCore import QSize, QTimer
+from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import QLabel, QSizePolicy, QVBoxLayout
+from src.core import tracing
+from src.core.motion_player import MotionPlayer
+from src.core.preview_cache import PreviewCache, DEFAULT_PREVIEW_CACHE_SIZE_MB
+from src.core.preview_loader import is_previewable
+from src.core.preview_prefetcher import PreviewPrefetcher
+from src.core.thumbnail_cache import ThumbnailCache
 
 
 class PreviewPictureView(QLabel):
     folders_dropped = QtCore.Signal(list)
 
-    def __init__(self, zoom_level:float = 1.0):
+    def __init__(self, zoom_level:float = 1.0, cache_size_mb: int = DEFAULT_PREVIEW_CACHE_SIZE_MB,
+                 thumbnail_cache: Optional[ThumbnailCache] = None):
         super().__init__()
         self.setAcceptDrops(True)
         self._image_base_size = QSize(400, 400)
         self._zoom_level = zoom_level
         self._current_file_path = None
+        self._preview_cache = PreviewCache(cache_size_mb * 1024 * 1024)
+        self._prefetcher = PreviewPrefetcher(self._preview_cache, thumbnail_cache)
+        self._prefetcher.preview_ready.connect(self._on_preview_ready)
+        self._prefetcher.full_resolution_ready.connect(self._on_full_resolution_ready)
+        self._current_preview = None
+        # Animated images and videos replace the still preview with their frames once they play
+        self._motion_player = MotionPlayer()
+        self._motion_player.frame_ready.connect(self._on_motion_frame)
+        self._current_frame: Optional[QImage] = None
+
+        # Zoom steps arriving while the key is held down are rendered together
+        self._zoom_timer = QTimer(self)
+        self._zoom_timer.setSingleShot(True)
+        self._zoom_timer.setInterval(30)
+        self._zoom_timer.timeout.connect(self._show_current_preview)
         self.setSizePolicy(QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.MinimumExpanding))
         self.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
 
@@ -33,6 +56,7 @@ class PreviewPictureView(QLabel):
 
     def zoom_in(self):
         self._zoom_level *= 1.2
+        self._schedule_zoom()
 
     def mouseDoubleClickEvent(self, event) -> None:
         if self._current_file_path:
@@ -40,30 +64,108 @@ class PreviewPictureView(QLabel):
 
     def zoom_out(self):
         self._zoom_level /= 1.2
+        self._schedule_zoom()
 
+    def _schedule_zoom(self):
+        if (self._current_preview is not None or self._current_frame is not None) and not self._zoom_timer.isActive():
+            self._zoom_timer.start()
 
     def get_zoom(self):
         return self._zoom_level
 
     def no_files_found(self):
         self.setText("NO MATCHING FILES FOUND")
+        self._current_file_path = None
+        self._current_preview = None
+        self._current_frame = None
+        self._motion_player.stop()
         self._on_preview_filename.hide()
 
-    def set_preview(self, file_path: str):
+    def get_target_size(self) -> QSize:
+        return self._zoom_level * self._image_base_size
+
+    def get_preview_cache(self) -> PreviewCache:
+        return self._preview_cache
+
+    def set_preview(self, file_path: str, neighbour_file_paths: list = None):
+        with tracing.span("set_preview", "preview"):
+            self._set_preview(file_path, neighbour_file_paths)
+
+    def _set_preview(self, file_path: str, neighbour_file_paths: Optional[list]):
+        # The sources are reloaded after every assignment, a file that is already playing keeps playing
+        if file_path != self._current_file_path:
+            self._current_frame = None
+            # The still preview or keyframe is shown until the first frame arrives
+            self._motion_player.play(file_path)
         self._current_file_path = file_path
-        path, filename = os.path.split(file_path)
-        name, extension = os.path.splitext(filename)
-
-        if extension[1:] in QImageReader.supportedImageFormats():
-            pix_map = QPixmap(file_path).scaled(self._zoom_level * self._image_base_size, QtCore.Qt.AspectRatioMode.KeepAspectRatio,
-                                                QtCore.Qt.TransformationMode.SmoothTransformation)
-            self.setPixmap(pix_map)
-            self._on_preview_filename.setText(os.path.basename(self._current_file_path))
-            self._on_preview_filename.show()
-        else:
+        self._current_preview = None
+        self._on_preview_filename.setText(os.path.basename(self._current_file_path))
+        self._on_preview_filename.show()
+
+        if not is_previewable(file_path):
             self.setText("No preview available!")
-            self._on_preview_filename.setText(os.path.basename(self._current_file_path))
-            self._on_preview_filename.show()
+            tracing.end_frame()
+            return
+
+        # The current file goes first, the neighbours are decoded ahead of navigation
+        to_decode = [file_path]
+        if neighbour_file_paths:
+            to_decode.extend(neighbour_file_paths)
+        self._prefetcher.request(to_decode, self.get_target_size())
+        self._current_preview = self._preview_cache.get(file_path)
+        self._show_current_preview()
+
+    def _show_current_preview(self):
+        if self._current_frame is not None:
+            self._show_image(self._current_frame, self._current_frame.size())
+            return
+        preview = self._current_preview
+        if preview is None:
+            if self._prefetcher.is_pending(self._current_file_path):
+                self.setText("Loading...")
+            else:
+                self.setText("No preview available!")
+                tracing.end_frame()
+            return
+
+        if not preview.covers(self.get_target_size()):
+            # Zoomed past the decoded size, show the upscaled image until the full one arrives
+            self._prefetcher.request_full_resolution(self._current_file_path)
+        self._show_image(preview.image, preview.source_size)
+
+    def _show_image(self, image: QImage, source_size: QSize):
+        with tracing.span("show_image", "preview"):
+            display_size = source_size.scaled(self.get_target_size(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+            if image.size() != display_size:
+                image = image.scaled(display_size, QtCore.Qt.AspectRatioMode.IgnoreAspectRatio,
+                                     QtCore.Qt.TransformationMode.SmoothTransformation)
+            self.setPixmap(QPixmap.fromImage(image))
+        # The navigation step that asked for this file is done once its preview is on screen
+        tracing.end_frame()
+
+    def _on_preview_ready(self, file_path: str, success: bool):
+        if file_path != self._current_file_path:
+            return
+        if not success:
+            if self._current_frame is None:
+                self.setText("No preview available!")
+                tracing.end_frame()
+            return
+        if self._current_preview is None or not self._current_preview.covers(self.get_target_size()):
+            self._current_preview = self._preview_cache.get(file_path) or self._current_preview
+        self._show_current_preview()
+
+    def _on_motion_frame(self, file_path: str, frame: QImage):
+        if file_path != self._current_file_path or frame.isNull():
+            return
+        self._current_frame = frame
+        self._show_current_preview()
+
+    def _on_full_resolution_ready(self, file_path: str, preview):
+        if file_path != self._current_file_path or preview is None:
+            return
+        self._current_preview = preview
+        self._show_current_preview()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls:
@@ -0,0 +1,57 @@
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QLabel, QSizePolicy
+
+from src.core import tracing
+
+TIMING_OVERLAY_INTERVAL_MS = 500
+# The spans that took the most time during this many seconds are listed under the frame latencies
+TIMING_OVERLAY_WINDOW_S = 5
+TIMING_OVERLAY_N_SPANS = 5
+
+
+class TimingOverlay(QLabel):
+    # Shows the latencies of the last frames and where the time went recently, while tracing is enabled
+    def __init__(self):
+        super().__init__()
+        self.setStyleSheet("background: rgba(0, 0, 0, 160); color: #e0e0e0; font-family: monospace")
+        self.setContentsMargins(5, 5, 5, 5)
+        self.setSizePolicy(QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed))
+        self._timer = QTimer(self)
+        self._timer.setInterval(TIMING_OVERLAY_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh)
+        # Tracing is only disabled again if the overlay enabled it, not while --trace records
+        self._enabled_tracing = False
+        self.hide()
+
+    def set_enabled(self, enabled: bool):
+        if enabled:
+            if tracing.get_tracer() is None:
+                tracing.enable_tracing()
+                self._enabled_tracing = True
+            self.refresh()
+            self._timer.start()
+            self.show()
+        else:
+            self._timer.stop()
+            self.hide()
+            if self._enabled_tracing:
+                tracing.disable_tracing()
+                self._enabled_tracing = False
+
+    def refresh(self):
+        tracer = tracing.get_tracer()
+        if tracer is None:
+            self.setText("Tracing is disabled")
+            self.adjustSize()
+            return
+        percentiles = tracer.get_frame_percentiles()
+        if percentiles:
+            lines = [f"frame p50 {percentiles['p50']:.1f} p95 {percentiles['p95']:.1f} "
+                     f"p99 {percentiles['p99']:.1f} max {percentiles['max']:.1f} ms (n={percentiles['n']})"]
+        else:
+            lines = ["frame -"]
+        totals = tracer.get_recent_totals(TIMING_OVERLAY_WINDOW_S)
+        for name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:TIMING_OVERLAY_N_SPANS]:
+            lines.append(f"{name:<24} {total:8.1f} ms")
+        self.setText("\n".join(lines))
+        self.adjustSize()
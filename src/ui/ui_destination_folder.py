@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+################################################################################
+## Form generated from reading UI file 'destination_folder.ui'
+##
+## Created by: Qt User Interface Compiler version 6.12.0
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
+    QMetaObject, QObject, QPoint, QRect,
+    QSize, QTime, QUrl, Qt)
+from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
+    QFont, QFontDatabase, QGradient, QIcon,
+    QImage, QKeySequence, QLinearGradient, QPainter,
+    QPalette, QPixmap, QRadialGradient, QTransform)
+from PySide6.QtWidgets import (QApplication, QHBoxLayout, QLabel, QPushButton,
+    QSizePolicy, QSpacerItem, QVBoxLayout, QWidget)
+
+class Ui_destinationFolder(object):
+    def setupUi(self, destinationFolder):
+        if not destinationFolder.objectName():
+            destinationFolder.setObjectName(u"destinationFolder")
+        destinationFolder.resize(158, 184)
+        sizePolicy = QSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(destinationFolder.sizePolicy().hasHeightForWidth())
+        destinationFolder.setSizePolicy(sizePolicy)
+        destinationFolder.setMaximumSize(QSize(158, 16777215))
+        self.verticalLayout = QVBoxLayout(destinationFolder)
+        self.verticalLayout.setSpacing(0)
+        self.verticalLayout.setObjectName(u"verticalLayout")
+        self.vs1 = QSpacerItem(20, 0, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
+
+        self.verticalLayout.addItem(self.vs1)
+
+        self.btAdd = QPushButton(destinationFolder)
+        self.btAdd.setObjectName(u"btAdd")
+        sizePolicy1 = QSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+        sizePolicy1.setHorizontalStretch(0)
+        sizePolicy1.setVerticalStretch(0)
+        sizePolicy1.setHeightForWidth(self.btAdd.sizePolicy().hasHeightForWidth())
+        self.btAdd.setSizePolicy(sizePolicy1)
+        icon = QIcon()
+        iconThemeName = u"folder"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon = QIcon.fromTheme(iconThemeName)
+        else:
+            icon.addFile(u".", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.btAdd.setIcon(icon)
+        self.btAdd.setIconSize(QSize(128, 128))
+
+        self.verticalLayout.addWidget(self.btAdd)
+
+        self.horizontalLayout = QHBoxLayout()
+        self.horizontalLayout.setObjectName(u"horizontalLayout")
+        self.horizontalLayout.setContentsMargins(-1, 6, -1, -1)
+        self.lbName = QLabel(destinationFolder)
+        self.lbName.setObjectName(u"lbName")
+        sizePolicy2 = QSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        sizePolicy2.setHorizontalStretch(0)
+        sizePolicy2.setVerticalStretch(0)
+        sizePolicy2.setHeightForWidth(self.lbName.sizePolicy().hasHeightForWidth())
+        self.lbName.setSizePolicy(sizePolicy2)
+        self.lbName.setAlignment(Qt.AlignCenter)
+        self.lbName.setWordWrap(True)
+
+        self.horizontalLayout.addWidget(self.lbName)
+
+        self.btRemove = QPushButton(destinationFolder)
+        self.btRemove.setObjectName(u"btRemove")
+        sizePolicy1.setHeightForWidth(self.btRemove.sizePolicy().hasHeightForWidth())
+        self.btRemove.setSizePolicy(sizePolicy1)
+        icon1 = QIcon()
+        iconThemeName = u"edit-delete"
+        if QIcon.hasThemeIcon(iconThemeName):
+            icon1 = QIcon.fromTheme(iconThemeName)
+        else:
+            icon1.addFile(u".", QSize(), QIcon.Mode.Normal, QIcon.State.Off)
+
+        self.btRemove.setIcon(icon1)
+
+        self.horizontalLayout.addWidget(self.btRemove)
+
+
+        self.verticalLayout.addLayout(self.horizontalLayout)
+
+        self.lbPending = QLabel(destinationFolder)
+        self.lbPending.setObjectName(u"lbPending")
+        self.lbPending.setAlignment(Qt.AlignCenter)
+
+        self.verticalLayout.addWidget(self.lbPending)
+
+        self.vs2 = QSpacerItem(20, 0, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
+
+        self.verticalLayout.addItem(self.vs2)
+
+
+        self.retranslateUi(destinationFolder)
+
+        QMetaObject.connectSlotsByName(destinationFolder)
+    # setupUi
+
+    def retranslateUi(self, destinationFolder):
+        destinationFolder.setWindowTitle(QCoreApplication.translate("destinationFolder", u"Form", None))
+        self.btAdd.setText("")
+        self.lbName.setText(QCoreApplication.translate("destinationFolder", u"TEXT", None))
+        self.btRemove.setText("")
+        self.lbPending.setText("")
+    # retranslateUi
+
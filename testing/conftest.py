@@ -0,0 +1,17 @@
+import os
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+
+@pytest.fixture(scope="module")
+def qt_application() -> QApplication:
+    # One application for the tests of a module that need Qt's event loop or painting, offscreen unless
+    # another platform is set. It is shut down after the module, so later modules can create their own.
+    application = QApplication.instance()
+    if application is not None:
+        yield application
+        return
+    application = QApplication(["pytest", "-platform", os.environ.get("QT_QPA_PLATFORM", "offscreen")])
+    yield application
+    application.shutdown()
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from src.core.addon_job import JobRunner
+
+
+def count_to(job, n_total: int) -> int:
+    for n_done in range(1, n_total + 1):
+        job.set_progress(n_done, n_total)
+    return n_total
+
+
+def wait_until_cancelled(job, started: threading.Event):
+    started.set()
+    while not job.is_cancelled():
+        time.sleep(0.01)
+    return "stopped"
+
+
+def test_results_are_handed_to_the_gui_thread(qt_application):
+    runner = JobRunner()
+    results = []
+    progress = []
+    job = runner.submit(count_to, (3,),
+                        on_finished=lambda result: results.append((result, threading.current_thread())),
+                        on_progress=lambda n_done, n_total: progress.append(n_done))
+    job.wait_for_done(5)
+    qt_application.processEvents()
+    assert results == [(3, threading.main_thread())]
+    assert progress == [1, 2, 3]
+    assert runner.get_jobs() == []
+
+
+def test_cancelled_jobs_stop(qt_application):
+    runner = JobRunner(max_jobs=1)
+    results = []
+    started = threading.Event()
+    running_job = runner.submit(wait_until_cancelled, (started,), on_finished=results.append)
+    queued_job = runner.submit(count_to, (3,), on_finished=results.append)
+    assert started.wait(5)
+    # Only one job runs at a time
+    assert not queued_job.is_done()
+    runner.shut_down()
+    qt_application.processEvents()
+    assert running_job.is_done() and queued_job.is_done()
+    # The running job decides what to return, the queued one never ran
+    assert results == ["stopped", None]
@@ -0,0 +1,11 @@
+from src.core.addon_loader import read_addon_info
+
+
+def test_addon_info_is_read_without_import(tmp_path):
+    addon_path = tmp_path / "addon.py"
+    addon_path.write_text('import missing_module\n\n'
+                          'ADDON_INFO = {"name": "Test", "extensions": [".webp"], "shortcuts": ["Ctrl+P"]}\n')
+    assert read_addon_info(str(addon_path)) == {"name": "Test", "extensions": [".webp"], "shortcuts": ["Ctrl+P"]}
+
+    addon_path.write_text('NAME = "Test"\n')
+    assert read_addon_info(str(addon_path)) is None
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from src.core import apply_engine
+from src.core.apply_engine import ApplyEngine, copy_file, move_file, get_resume_assignments, get_undo_assignments
+from src.core.move_journal import MoveJournal
+
+
+def test_copy_file(tmp_path):
+    source = tmp_path / "a.bin"
+    source.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    copy_file(str(source), str(tmp_path / "b.bin"))
+    assert (tmp_path / "b.bin").read_bytes() == source.read_bytes()
+
+    (tmp_path / "c.bin").write_text("c")
+    with pytest.raises(FileExistsError):
+        copy_file(str(source), str(tmp_path / "c.bin"))
+    assert (tmp_path / "c.bin").read_text() == "c"
+
+
+def test_move_file_does_not_overwrite(tmp_path):
+    (tmp_path / "a.jpg").write_text("a")
+    (tmp_path / "destination").mkdir()
+    (tmp_path / "destination" / "a.jpg").write_text("b")
+    with pytest.raises(FileExistsError):
+        move_file(str(tmp_path / "a.jpg"), str(tmp_path / "destination" / "a.jpg"))
+    assert (tmp_path / "a.jpg").read_text() == "a"
+    assert (tmp_path / "destination" / "a.jpg").read_text() == "b"
+
+
+@pytest.mark.parametrize("with_renameat2", [True, False])
+def test_move_file_moves_files_and_folders(tmp_path, monkeypatch, with_renameat2):
+    if not with_renameat2:
+        monkeypatch.setattr(apply_engine, "_renameat2", None)
+    (tmp_path / "destination").mkdir()
+    (tmp_path / "a.jpg").write_text("a")
+    (tmp_path / "folder").mkdir()
+    (tmp_path / "folder" / "b.jpg").write_text("b")
+    move_file(str(tmp_path / "a.jpg"), str(tmp_path / "destination" / "a.jpg"))
+    move_file(str(tmp_path / "folder"), str(tmp_path / "destination" / "folder"))
+    assert (tmp_path / "destination" / "a.jpg").read_text() == "a"
+    assert (tmp_path / "destination" / "folder" / "b.jpg").read_text() == "b"
+    assert not (tmp_path / "a.jpg").exists() and not (tmp_path / "folder").exists()
+
+    (tmp_path / "a.jpg").write_text("c")
+    with pytest.raises(FileExistsError):
+        move_file(str(tmp_path / "a.jpg"), str(tmp_path / "destination" / "a.jpg"))
+    assert (tmp_path / "destination" / "a.jpg").read_text() == "a"
+
+
+def test_engine_moves_assigned_folders(tmp_path):
+    (tmp_path / "source" / "album").mkdir(parents=True)
+    (tmp_path / "source" / "album" / "a.jpg").write_text("a")
+    (tmp_path / "destination").mkdir()
+    result = ApplyEngine().run({str(tmp_path / "source" / "album"): str(tmp_path / "destination")})
+    assert result.failed == []
+    assert (tmp_path / "destination" / "album" / "a.jpg").read_text() == "a"
+    assert not (tmp_path / "source" / "album").exists()
+
+
+def test_engine_rejects_duplicate_destinations(tmp_path):
+    (tmp_path / "first").mkdir()
+    (tmp_path / "second").mkdir()
+    (tmp_path / "destination").mkdir()
+    (tmp_path / "first" / "a.jpg").write_text("first")
+    (tmp_path / "second" / "a.jpg").write_text("second")
+    assignments = {str(tmp_path / "first" / "a.jpg"): str(tmp_path / "destination"),
+                   str(tmp_path / "second" / "a.jpg"): str(tmp_path / "destination")}
+
+    result = ApplyEngine().run(assignments)
+    assert result.moved == [(str(tmp_path / "first" / "a.jpg"), str(tmp_path / "destination" / "a.jpg"))]
+    assert [file_path for file_path, _ in result.failed] == [str(tmp_path / "second" / "a.jpg")]
+    assert (tmp_path / "destination" / "a.jpg").read_text() == "first"
+    assert (tmp_path / "second" / "a.jpg").read_text() == "second"
+
+
+def test_engine_reports_progress(tmp_path):
+    (tmp_path / "destination").mkdir()
+    assignments = {}
+    for i in range(20):
+        (tmp_path / f"{i}.jpg").write_text(str(i))
+        assignments[str(tmp_path / f"{i}.jpg")] = str(tmp_path / "destination")
+
+    reports = []
+    result = ApplyEngine().run(assignments, reports.append)
+    assert len(result.moved) == 20 and not result.failed
+    assert reports[-1].n_done == 20
+    assert len(os.listdir(tmp_path / "destination")) == 20
+
+
+def test_journal_recovers_interrupted_batch(tmp_path):
+    (tmp_path / "destination").mkdir()
+    moves = []
+    for i in range(3):
+        (tmp_path / f"{i}.jpg").write_text(str(i))
+        moves.append((str(tmp_path / f"{i}.jpg"), str(tmp_path / "destination" / f"{i}.jpg")))
+
+    # The process dies after the first move, before its group was committed
+    journal = MoveJournal(str(tmp_path / "journal.log"))
+    batch_id = journal.begin_batch(moves)
+    os.rename(*moves[0])
+
+    journal = MoveJournal(str(tmp_path / "journal.log"))
+    batch = journal.get_interrupted_batch()
+    assert batch.batch_id == batch_id
+    journal.resolve_pending_moves(batch)
+    assert batch.get_done_moves() == [moves[0]]
+
+    ApplyEngine().run(get_resume_assignments(batch), journal=journal, batch_id=batch_id)
+    assert journal.get_interrupted_batch() is None
+    assert sorted(os.listdir(tmp_path / "destination")) == ["0.jpg", "1.jpg", "2.jpg"]
+
+    undoable = journal.get_last_undoable_batch()
+    ApplyEngine().run(get_undo_assignments(undoable), journal=journal, reverts=undoable.batch_id)
+    assert os.listdir(tmp_path / "destination") == []
+    assert journal.get_last_undoable_batch() is None
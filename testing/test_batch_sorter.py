@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from src.core.batch_sorter import BatchSorter, parse_rule
+from src.core.move_journal import MoveJournal
+
+
+def make_files(folder, names):
+    for name in names:
+        os.makedirs(os.path.dirname(os.path.join(folder, name)), exist_ok=True)
+        with open(os.path.join(folder, name), "w") as file:
+            file.write(name)
+
+
+def test_rules_are_parsed():
+    rule = parse_rule("ext:JPG,.png name:^IMG_ size>=1k -> /photos")
+    assert rule.destination == os.path.abspath("/photos")
+    assert rule.extensions == {"jpg", "png"}
+    assert not rule.needs_header()
+    assert parse_rule("width>100 -> /wide").needs_header()
+    with pytest.raises(ValueError):
+        parse_rule("ext:jpg")
+    with pytest.raises(ValueError):
+        parse_rule("colour=red -> /red")
+
+
+def test_first_matching_rule_moves_the_files(tmp_path):
+    source = tmp_path / "source"
+    make_files(source, ["IMG_1.jpg", "a.jpg", "b.txt", "sub/IMG_2.jpg"])
+    rules = [parse_rule(f"name:IMG_ -> {tmp_path / 'camera'}"), parse_rule(f"ext:jpg -> {tmp_path / 'jpg'}")]
+
+    planned = []
+    result = BatchSorter(rules).run([str(source)], recursive=True, dry_run=True,
+                                    on_planned=lambda file_path, folder_path: planned.append(file_path))
+    assert result.n_files == 4 and len(planned) == 3
+    assert not os.path.exists(tmp_path / "camera")
+
+    journal = MoveJournal(str(tmp_path / "journal.log"))
+    result = BatchSorter(rules, journal=journal, apply_batch_size=1).run([str(source)])
+    assert result.n_planned == {str(tmp_path / "camera"): 1, str(tmp_path / "jpg"): 1}
+    assert sorted(os.listdir(tmp_path / "camera")) == ["IMG_1.jpg"]
+    assert sorted(os.listdir(tmp_path / "jpg")) == ["a.jpg"]
+    assert sorted(os.listdir(source)) == ["b.txt", "sub"]
+    assert journal.get_last_undoable_batch() is not None
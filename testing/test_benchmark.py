@@ -0,0 +1,25 @@
+import os
+
+from benchmark import compare_results, generate_source_tree, run_benchmarks
+
+
+def test_generated_tree_is_reused(tmp_path):
+    source_folder_path = generate_source_tree(str(tmp_path), 50)
+    names = sorted(os.listdir(source_folder_path))
+    assert len(names) == 51
+    os.remove(os.path.join(source_folder_path, names[-1]))
+    assert generate_source_tree(str(tmp_path), 50) == source_folder_path
+    assert len(os.listdir(source_folder_path)) == 50
+
+
+def test_results_are_compared_with_the_baseline(tmp_path):
+    results = run_benchmarks(str(tmp_path), [100], ["listing", "filtering"], repeat=1)
+    assert {"listing@100", "listing.first_file@100", "filtering.typing@100"} <= set(results)
+    assert all(result["seconds"] >= 0 for result in results.values())
+
+    baseline = {"listing@100": {"seconds": results["listing@100"]["seconds"] / 2},
+                "filtering.typing@100": {"seconds": results["filtering.typing@100"]["seconds"] * 2},
+                "removed@100": {"seconds": 1.0}}
+    comparison = {name: regressed for name, baseline_seconds, seconds, ratio, regressed in
+                  compare_results(results, baseline, 0.2)}
+    assert comparison == {"listing@100": True, "filtering.typing@100": False}
@@ -0,0 +1,196 @@
+import os
+
+import pytest
+
+from src.core.file_moving_manager import FileMovingManager, FILTER_SYNTAX_GLOB, is_filter_refinement
+from src.core.session_store import SessionStore
+
+
+def make_source(folder, names):
+    for name in names:
+        with open(os.path.join(folder, name), "w") as file:
+            file.write(name)
+
+
+def test_incremental_source_updates(tmp_path):
+    make_source(tmp_path, ["a.jpg", "b.jpg", "c.png"])
+    manager = FileMovingManager(".*jpg$")
+    manager.set_current_source(str(tmp_path))
+    manager.wait_for_listing()
+    assert sorted(manager.get_all_files_in_current_source()) == [str(tmp_path / "a.jpg"), str(tmp_path / "b.jpg")]
+
+    manager.add_source_files([str(tmp_path / "d.jpg"), str(tmp_path / "e.png"), str(tmp_path / "a.jpg")])
+    assert manager.get_n_of_source_files() == 3
+    assert manager.get_index_of_file(str(tmp_path / "d.jpg")) == 2
+    assert manager.get_files_in_current_source([str(tmp_path / name) for name in ["d.jpg", "c.png", "x.jpg"]]) == \
+           [str(tmp_path / "d.jpg")]
+
+    manager.add_assignment(str(tmp_path / "d.jpg"), "/somewhere")
+    manager.remove_source_files([str(tmp_path / "d.jpg")])
+    assert manager.get_index_of_file(str(tmp_path / "d.jpg")) is None
+    assert manager.get_assignment(str(tmp_path / "d.jpg")) is None
+
+
+def test_sync_source_keeps_order(tmp_path):
+    make_source(tmp_path, ["a.jpg", "b.jpg", "c.jpg"])
+    manager = FileMovingManager()
+    manager.set_current_source(str(tmp_path))
+    manager.wait_for_listing()
+    before = manager.get_all_files_in_current_source().copy()
+
+    os.remove(tmp_path / "b.jpg")
+    make_source(tmp_path, ["d.jpg"])
+    manager.sync_source()
+    assert manager.get_all_files_in_current_source() == [path for path in before if not path.endswith("b.jpg")] + \
+           [str(tmp_path / "d.jpg")]
+
+
+def test_renamed_files_keep_place_and_assignment(tmp_path):
+    make_source(tmp_path, ["a.webp", "b.webp", "c.jpg"])
+    manager = FileMovingManager()
+    manager.set_current_source(str(tmp_path))
+    manager.wait_for_listing()
+    before = manager.get_all_files_in_current_source().copy()
+    manager.add_assignment(str(tmp_path / "b.webp"), "/somewhere")
+
+    # The source watcher notices the change before the renaming is finished
+    manager.start_renaming({str(tmp_path / "b.webp"): str(tmp_path / "b.png")})
+    os.rename(tmp_path / "b.webp", tmp_path / "b.png")
+    manager.remove_source_files([str(tmp_path / "b.webp")])
+    manager.add_source_files([str(tmp_path / "b.png")])
+    manager.finish_renaming({str(tmp_path / "b.webp"): str(tmp_path / "b.png")})
+    assert manager.get_all_files_in_current_source() == [str(tmp_path / "b.png") if path.endswith("b.webp") else path
+                                                         for path in before]
+    assert manager.get_all_assignments() == {str(tmp_path / "b.png"): "/somewhere"}
+
+
+def test_apply_assignments_updates_sources(tmp_path):
+    source = tmp_path / "source"
+    destination = tmp_path / "destination"
+    source.mkdir()
+    destination.mkdir()
+    make_source(source, ["a.jpg", "b.jpg"])
+    manager = FileMovingManager()
+    manager.set_current_source(str(source))
+    manager.wait_for_listing()
+    manager.add_destination(str(destination))
+    manager.add_assignment(str(source / "a.jpg"), str(destination))
+
+    manager.apply_assignments()
+    assert os.path.exists(destination / "a.jpg")
+    assert manager.get_all_files_in_current_source() == [str(source / "b.jpg")]
+
+
+def test_streaming_listing(tmp_path):
+    make_source(tmp_path, [f"{i}.jpg" for i in range(3000)] + ["skip.txt"])
+    manager = FileMovingManager(".*jpg$")
+    manager.set_current_source(str(tmp_path))
+    assert manager.get_n_of_source_files() >= 1
+    first_file = manager.get_file_on_index(0)
+
+    manager.wait_for_listing()
+    assert not manager.is_listing()
+    assert manager.get_n_of_source_files() == 3000
+    assert manager.get_file_on_index(0) == first_file
+
+
+def test_filter_in_memory(tmp_path):
+    make_source(tmp_path, ["cat_1.jpg", "cat_2.png", "dog_1.jpg"])
+    manager = FileMovingManager()
+    manager.set_current_source(str(tmp_path))
+    manager.wait_for_listing()
+
+    manager.set_filter("cat", match_basename=True)
+    assert sorted(map(os.path.basename, manager.get_all_files_in_current_source())) == ["cat_1.jpg", "cat_2.png"]
+    manager.set_filter("cat_1", match_basename=True)
+    assert list(map(os.path.basename, manager.get_all_files_in_current_source())) == ["cat_1.jpg"]
+    manager.set_filter("*.jpg", FILTER_SYNTAX_GLOB, match_basename=True)
+    assert sorted(map(os.path.basename, manager.get_all_files_in_current_source())) == ["cat_1.jpg", "dog_1.jpg"]
+
+
+def test_filter_refinement():
+    assert is_filter_refinement(".*cat", ".*cat_1")
+    assert not is_filter_refinement(".*cat", ".*cat|dog")
+    assert not is_filter_refinement(".*cat", ".*cat?")
+    assert not is_filter_refinement(".*cat", ".*dog")
+
+
+def test_assignment_index():
+    manager = FileMovingManager()
+    manager.add_destination("/destination/a")
+    manager.add_destination("/destination/b")
+    manager.add_assignment("/source/1.jpg", "/destination/a", 10)
+    manager.add_assignment("/source/2.jpg", "/destination/a", 20)
+    manager.add_assignment("/source/3.jpg", "/destination/b", 5)
+    assert manager.get_n_of_assignments_to("/destination/a") == 2
+    assert manager.get_size_of_assignments_to("/destination/a") == 30
+
+    manager.add_assignment("/source/2.jpg", "/destination/b", 20)
+    assert manager.get_size_of_assignments_to("/destination/a") == 10
+    assert manager.get_files_assigned_to("/destination/b") == {"/source/2.jpg", "/source/3.jpg"}
+
+    manager.remove_assignment("/source/1.jpg")
+    manager.remove_destination("/destination/a")
+    with pytest.raises(Exception):
+        manager.remove_destination("/destination/b")
+
+
+def test_session_is_restored(tmp_path):
+    source = tmp_path / "source"
+    destination = tmp_path / "destination"
+    source.mkdir()
+    destination.mkdir()
+    make_source(source, ["a.jpg", "b.jpg", "c.jpg"])
+    session_store = SessionStore(str(tmp_path / "session.sqlite3"))
+    manager = FileMovingManager(session_store=session_store)
+    manager.add_destination(str(destination))
+    manager.set_current_source(str(source))
+    manager.wait_for_listing()
+    manager.add_assignment(str(source / "a.jpg"), str(destination))
+    manager.add_assignment(str(source / "b.jpg"), str(destination))
+    session_store.close()
+
+    os.remove(source / "b.jpg")
+    session_store = SessionStore(str(tmp_path / "session.sqlite3"))
+    manager = FileMovingManager(session_store=session_store)
+    assert manager.get_all_destinations() == [str(destination)]
+    manager.set_current_source(str(source))
+    manager.wait_for_listing()
+    assert manager.get_all_assignments() == {str(source / "a.jpg"): str(destination)}
+    assert manager.get_size_of_assignments_to(str(destination)) == len("a.jpg")
+
+    # Clearing only forgets the assignments of the folders that were opened
+    session_store.record_assignment("/other", "/other/d.jpg", str(destination), 1)
+    manager.clear_assignments()
+    manager.stop_listing()
+    assert session_store.load_assignments(str(source)) == []
+    assert session_store.load_assignments("/other") == [("/other/d.jpg", str(destination), 1)]
+
+
+def test_assignments_outlive_listings(tmp_path):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    make_source(first, ["a.jpg", "b.jpg", "c.jpg"])
+    make_source(second, ["d.jpg"])
+    manager = FileMovingManager()
+    manager.set_current_source(str(first))
+    manager.wait_for_listing()
+    manager.add_assignment(str(first / "b.jpg"), "/destination", 7)
+
+    # Only the assigned file stays in memory once another folder is listed
+    manager.set_current_source(str(second))
+    manager.wait_for_listing()
+    assert manager.get_all_files_in_current_source() == [str(second / "d.jpg")]
+    assert manager.get_all_assignments() == {str(first / "b.jpg"): "/destination"}
+    assert len(manager._files) == 2
+
+    manager.set_current_source(str(first))
+    manager.wait_for_listing()
+    assert sorted(manager.get_all_files_in_current_source()) == [str(first / name)
+                                                                 for name in ["a.jpg", "b.jpg", "c.jpg"]]
+    assert manager.get_assignment(str(first / "b.jpg")) == "/destination"
+    assert manager.get_size_of_assignments_to("/destination") == 7
+    manager.clear_assignments()
+    assert manager.get_n_of_assignments() == 0 and manager.get_assignment(str(first / "b.jpg")) is None
@@ -0,0 +1,46 @@
+from src.core.file_table import FileTable
+
+
+def test_paths_round_trip_and_keep_their_ids():
+    file_paths = ["/photos/2023/a.jpg", "/photos/2023/b.jpg", "/photos/a.jpg", "relative.jpg", "/photos/2023/",
+                  "/photos/été \U0001f600.png", "/photos/\udcff.jpg"]
+    table = FileTable()
+    file_ids = table.add_all(file_paths)
+    assert len(set(file_ids)) == len(file_paths) == len(table)
+    assert table.get_paths(file_ids) == file_paths
+    assert list(table.add_all(reversed(file_paths))) == list(reversed(file_ids))
+    assert [table.get_id(file_path) for file_path in file_paths] == list(file_ids)
+    assert table.get_id("/photos/2023/c.jpg") is None and table.get_id("/elsewhere/a.jpg") is None
+    assert table.get_name(file_ids[0]) == "a.jpg" and table.get_folder(file_ids[0]) == "/photos/2023"
+
+
+def test_released_ids_are_reused():
+    table = FileTable()
+    file_ids = table.add_all([f"/photos/{i}.jpg" for i in range(1000)])
+    for file_id in file_ids[::2]:
+        table.release(file_id)
+    assert len(table) == 500
+    assert table.get_id("/photos/0.jpg") is None
+    assert table.get_path(table.get_id("/photos/999.jpg")) == "/photos/999.jpg"
+
+    new_file_ids = table.add_all([f"/other/{i}.jpg" for i in range(500)])
+    assert table.get_capacity() == 1000 and set(new_file_ids) == set(file_ids[::2])
+    assert table.get_paths(new_file_ids) == [f"/other/{i}.jpg" for i in range(500)]
+    assert table.get_paths(file_ids[1::2]) == [f"/photos/{i}.jpg" for i in range(1, 1000, 2)]
+
+
+def test_files_of_one_folder_are_split_like_any_path():
+    table = FileTable()
+    file_ids = table.add_all(["/photos/a.jpg", "/photos/b.jpg", "/photos/2023/a.jpg"])
+    assert [table.get_folder(file_id) for file_id in file_ids] == ["/photos", "/photos", "/photos/2023"]
+    assert list(table.add_all(["/photos/b.jpg", "/photos/c.jpg"]))[0] == file_ids[1]
+    assert table.get_paths(file_ids) == ["/photos/a.jpg", "/photos/b.jpg", "/photos/2023/a.jpg"]
+
+
+def test_duplicate_paths_in_one_call_share_their_id():
+    table = FileTable()
+    file_ids = table.add_all(["/photos/a.jpg", "/photos/b.jpg", "/photos/a.jpg", "/other/a.jpg", "/other/a.jpg"])
+    assert list(file_ids) == [0, 1, 0, 2, 2] and len(table) == 3
+    assert table.get_paths(file_ids) == ["/photos/a.jpg", "/photos/b.jpg", "/photos/a.jpg", "/other/a.jpg",
+                                         "/other/a.jpg"]
+    assert list(table.add_all(["/photos/c.jpg", "/photos/c.jpg"])) == [3, 3]
@@ -0,0 +1,17 @@
+import numpy as np
+
+from addons.lib.image_features import cluster_features, suggest_destinations
+
+
+def test_clusters_get_the_destination_of_similar_files():
+    rng = np.random.default_rng(0)
+    centers = rng.random((3, 16))
+    features = np.concatenate([center + rng.normal(0, 0.01, (50, 16)) for center in centers])
+    labels, centroids = cluster_features(features, 3)
+    assert len(set(labels[:50])) == len(set(labels[50:100])) == len(set(labels[100:])) == 1
+    assert len(set(labels)) == 3
+
+    sorted_features = np.stack([centers[0], centers[0], centers[2]])
+    suggestions = suggest_destinations(centroids, sorted_features, ["/a", "/a", "/c"], n_neighbours=1)
+    assert suggestions[labels[0]] == "/a"
+    assert suggestions[labels[100]] == "/c"
@@ -0,0 +1,94 @@
+import datetime
+import os
+import struct
+
+from PySide6.QtGui import QImage
+
+from src.core import metadata_index
+from src.core.file_moving_manager import FileMovingManager
+from src.core.metadata_index import FileMetadata, MetadataIndex, parse_metadata_filter, read_capture_time, SORT_SIZE
+
+
+def make_exif_block(capture_date: bytes) -> bytes:
+    # IFD0 points to the EXIF IFD, which holds DateTimeOriginal
+    tiff = b"II*\0" + struct.pack("<I", 8)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, 26) + struct.pack("<I", 0)
+    tiff += struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, len(capture_date), 44) + struct.pack("<I", 0)
+    return b"Exif\0\0" + tiff + capture_date
+
+
+def make_image(file_path, width, height, capture_date: bytes = None):
+    # Filled, so the file size only depends on the resolution
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(0xff808080)
+    image.save(str(file_path), "JPEG")
+    if capture_date is not None:
+        with open(file_path, "rb") as image_file:
+            data = image_file.read()
+        exif_block = make_exif_block(capture_date)
+        with open(file_path, "wb") as image_file:
+            image_file.write(data[:2] + b"\xff\xe1" + struct.pack(">H", len(exif_block) + 2) + exif_block + data[2:])
+
+
+def test_exif_capture_time(tmp_path):
+    make_image(tmp_path / "a.jpg", 40, 30, b"2021:06:01 12:30:00\0")
+    make_image(tmp_path / "b.jpg", 40, 30)
+    assert read_capture_time(str(tmp_path / "a.jpg")) == datetime.datetime(2021, 6, 1, 12, 30).timestamp()
+    assert read_capture_time(str(tmp_path / "b.jpg")) is None
+
+
+def test_index_is_cached(tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    source.mkdir()
+    make_image(source / "small.jpg", 40, 30)
+    make_image(source / "large.jpg", 400, 300)
+    index = MetadataIndex(str(tmp_path / "metadata"))
+    index.set_folder(str(source))
+    index.wait_for_indexing()
+    assert index.get_metadata(str(source / "large.jpg")).get_resolution() == 400 * 300
+
+    # A second index reads the cache, only the changed file is read again
+    make_image(source / "small.jpg", 80, 60)
+    read_files = []
+    monkeypatch.setattr(metadata_index, "read_metadata",
+                        lambda file_path, stat: read_files.append(file_path) or FileMetadata(stat.st_size, stat.st_mtime))
+    index = MetadataIndex(str(tmp_path / "metadata"))
+    index.set_folder(str(source))
+    index.wait_for_indexing()
+    assert index.get_metadata(str(source / "large.jpg")).width == 400
+    assert read_files == [str(source / "small.jpg")]
+
+
+def test_sort_and_filter_by_metadata(tmp_path):
+    make_image(tmp_path / "a.jpg", 40, 30, b"2021:06:01 12:30:00\0")
+    make_image(tmp_path / "b.jpg", 400, 300, b"2019:01:01 00:00:00\0")
+    make_image(tmp_path / "c.jpg", 200, 100)
+    # The sort order below relies on the images being filled, see make_image
+    sizes = [os.path.getsize(tmp_path / name) for name in ["b.jpg", "c.jpg", "a.jpg"]]
+    assert sizes == sorted(sizes, reverse=True)
+    manager = FileMovingManager(metadata_index=MetadataIndex())
+    manager.set_sort(SORT_SIZE, True)
+    manager.set_current_source(str(tmp_path))
+    manager.wait_for_listing()
+    assert list(map(os.path.basename, manager.get_all_files_in_current_source())) == ["b.jpg", "c.jpg", "a.jpg"]
+
+    manager.set_metadata_filter(parse_metadata_filter("width>=100 format=jpg"))
+    assert list(map(os.path.basename, manager.get_all_files_in_current_source())) == ["b.jpg", "c.jpg"]
+    manager.set_metadata_filter(parse_metadata_filter("date<2020-01-01"))
+    assert list(map(os.path.basename, manager.get_all_files_in_current_source())) == ["b.jpg"]
+    manager.set_metadata_filter(parse_metadata_filter(f"size>{os.path.getsize(tmp_path / 'c.jpg')}B"))
+    assert list(map(os.path.basename, manager.get_all_files_in_current_source())) == ["b.jpg"]
+
+
+def test_index_reads_given_entries(tmp_path):
+    make_image(tmp_path / "a.jpg", 40, 30)
+    entries = list(os.scandir(tmp_path))
+    # Files that are not among the entries are not found, the folder is not listed again
+    make_image(tmp_path / "b.jpg", 40, 30)
+    index = MetadataIndex()
+    index.set_folders([])
+    index.add_entries(str(tmp_path), entries)
+    index.wait_for_indexing()
+    assert index.get_folders() == [str(tmp_path)]
+    assert index.get_metadata(str(tmp_path / "a.jpg")).width == 40
+    assert index.get_metadata(str(tmp_path / "b.jpg")) is None
@@ -0,0 +1,59 @@
+import os
+import shutil
+import struct
+import time
+
+import pytest
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QColor, QImage
+
+from src.core.motion_player import MotionPlayer
+from src.core.video_preview import load_video_preview
+
+
+def make_gif(file_path, n_frames):
+    # 1x1 frames alternating between the two colours of the palette, shown for 20 ms each
+    data = b"GIF89a" + struct.pack("<HHBBB", 1, 1, 0x80, 0, 0) + bytes([255, 0, 0, 0, 0, 255])
+    data += b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+    for frame in range(n_frames):
+        data += b"\x21\xf9\x04\x00\x02\x00\x00\x00"
+        data += b"\x2c" + struct.pack("<HHHHB", 0, 0, 1, 1, 0)
+        data += b"\x02\x02" + (b"\x44\x01" if frame % 2 == 0 else b"\x4c\x01") + b"\x00"
+    with open(file_path, "wb") as gif_file:
+        gif_file.write(data + b"\x3b")
+
+
+def play(application, player, file_path, seconds):
+    frames = []
+    player.frame_ready.connect(lambda played_file_path, frame: frames.append(frame.pixelColor(0, 0)))
+    player.play(str(file_path))
+    end = time.time() + seconds
+    while time.time() < end:
+        application.processEvents()
+        time.sleep(0.005)
+    player.stop()
+    return frames
+
+
+def test_animation_plays_frame_by_frame(tmp_path, qt_application):
+    make_gif(tmp_path / "animated.gif", 2)
+    make_gif(tmp_path / "still.gif", 1)
+    player = MotionPlayer(start_delay_ms=0)
+
+    frames = play(qt_application, player, tmp_path / "animated.gif", 0.5)
+    assert frames[0] == QColor(255, 0, 0)
+    assert QColor(0, 0, 255) in frames
+    assert not play(qt_application, player, tmp_path / "still.gif", 0.1)
+    assert not player.is_playing()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_video_keyframe(tmp_path):
+    image = QImage(64, 48, QImage.Format.Format_RGB32)
+    image.fill(QColor(0, 255, 0))
+    image.save(str(tmp_path / "frame.png"))
+    os.system(f"ffmpeg -loglevel error -loop 1 -i {tmp_path / 'frame.png'} -t 1 -pix_fmt yuv420p "
+              f"{tmp_path / 'video.mp4'}")
+
+    preview = load_video_preview(str(tmp_path / "video.mp4"), QSize(32, 32))
+    assert preview.source_size == QSize(64, 48) and preview.image.size() == QSize(32, 24)
@@ -0,0 +1,49 @@
+import os
+import time
+
+import pytest
+from PySide6.QtCore import QRect, QSize
+from PySide6.QtGui import QColor, QPageSize, QPainter, QPdfWriter
+
+from src.core.pdf_preview import PDF_FULL_RESOLUTION_DPI, is_pdf_supported
+from src.core.preview_loader import is_previewable, load_preview
+from src.core.thumbnail_cache import ThumbnailCache
+
+pytestmark = pytest.mark.skipif(not is_pdf_supported(), reason="QtPdf is not available")
+
+
+def make_pdf(file_path, n_pages, color):
+    # Painting into a PDF needs the application, see qt_application
+    writer = QPdfWriter(str(file_path))
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    painter = QPainter(writer)
+    for page in range(n_pages):
+        if page:
+            writer.newPage()
+        painter.fillRect(QRect(0, 0, writer.width(), writer.height() // 2), color)
+    painter.end()
+
+
+def test_first_page_preview(tmp_path, qt_application):
+    file_path = tmp_path / "scan.PDF"
+    make_pdf(file_path, 200, QColor(255, 0, 0))
+    assert is_previewable(str(file_path))
+
+    preview = load_preview(str(file_path), QSize(400, 400))
+    assert preview.image.height() == 400 and preview.source_size.width() == round(595 * PDF_FULL_RESOLUTION_DPI / 72)
+    assert preview.image.pixelColor(100, 50) == QColor(255, 0, 0)
+    # Blank paper is white, not transparent
+    assert preview.image.pixelColor(100, 350) == QColor(255, 255, 255)
+    assert load_preview(str(file_path)).image.size() == preview.source_size
+
+
+def test_rendered_page_is_cached_until_the_file_changes(tmp_path, qt_application):
+    file_path = tmp_path / "document.pdf"
+    make_pdf(file_path, 1, QColor(255, 0, 0))
+    thumbnail_cache = ThumbnailCache(str(tmp_path / "thumbnails"))
+    assert load_preview(str(file_path), QSize(256, 256), thumbnail_cache).image.pixelColor(50, 20) == QColor(255, 0, 0)
+    assert os.path.exists(thumbnail_cache.get_thumbnail_path(str(file_path), "large"))
+
+    make_pdf(file_path, 1, QColor(0, 0, 255))
+    os.utime(file_path, (time.time() + 10, time.time() + 10))
+    assert load_preview(str(file_path), QSize(256, 256), thumbnail_cache).image.pixelColor(50, 20) == QColor(0, 0, 255)
@@ -0,0 +1,30 @@
+import numpy as np
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+
+from addons.lib.perceptual_hash import compute_hash, find_duplicate_groups
+
+
+def make_image(file_path, seed: int, width: int, height: int):
+    # A smooth image, scaled up from a few random pixels
+    pixels = np.random.default_rng(seed).integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    image = QImage(pixels.data, 8, 6, 8 * 3, QImage.Format.Format_RGB888)
+    image.scaled(width, height, Qt.AspectRatioMode.IgnoreAspectRatio,
+                 Qt.TransformationMode.SmoothTransformation).save(str(file_path), "JPEG")
+
+
+def test_resized_copy_has_a_close_hash(tmp_path):
+    make_image(tmp_path / "original.jpg", 1, 1600, 1200)
+    make_image(tmp_path / "resized.jpg", 1, 400, 300)
+    make_image(tmp_path / "other.jpg", 2, 1600, 1200)
+    original_hash = compute_hash(str(tmp_path / "original.jpg"))
+    assert bin(original_hash ^ compute_hash(str(tmp_path / "resized.jpg"))).count("1") <= 2
+    assert bin(original_hash ^ compute_hash(str(tmp_path / "other.jpg"))).count("1") > 10
+
+
+def test_duplicate_groups():
+    hashes = np.random.default_rng(0).integers(0, 2 ** 63, 10000, dtype=np.uint64)
+    hashes[10] = hashes[5] ^ np.uint64(0b101)
+    hashes[20] = hashes[10] ^ np.uint64(1 << 40)
+    hashes[30] = hashes[5] ^ np.uint64(0b111111 << 20)
+    assert find_duplicate_groups(hashes, 4) == [[5, 10, 20]]
@@ -0,0 +1,28 @@
+import os
+
+from PySide6.QtGui import QImage
+
+from addons.lib.png_conversion import convert_all_to_png
+
+
+def test_webp_files_are_replaced_by_png(tmp_path):
+    image = QImage(16, 8, QImage.Format.Format_RGB32)
+    image.fill(0xff204080)
+    image.save(str(tmp_path / "a.webp"), "WEBP")
+    image.save(str(tmp_path / "b.jpg"), "JPEG")
+
+    converted_files = convert_all_to_png([str(tmp_path / "a.webp"), str(tmp_path / "b.jpg")])
+    assert converted_files == {str(tmp_path / "a.webp"): str(tmp_path / "a.png")}
+    assert sorted(os.listdir(tmp_path)) == ["a.png", "b.jpg"]
+    assert QImage(str(tmp_path / "a.png")).size() == image.size()
+
+
+def test_existing_png_is_not_replaced(tmp_path):
+    image = QImage(16, 8, QImage.Format.Format_RGB32)
+    image.fill(0xff204080)
+    image.save(str(tmp_path / "a.webp"), "WEBP")
+    (tmp_path / "a.png").write_bytes(b"png")
+
+    assert convert_all_to_png([str(tmp_path / "a.webp")]) == {}
+    assert sorted(os.listdir(tmp_path)) == ["a.png", "a.webp"]
+    assert (tmp_path / "a.png").read_bytes() == b"png"
@@ -0,0 +1,57 @@
+import os
+
+from src.core.file_moving_manager import FileMovingManager
+from src.core.session_store import SessionStore
+from src.core.source_traversal import SourceRoot, walk_sources
+
+
+def make_tree(root, file_paths):
+    for file_path in file_paths:
+        path = os.path.join(root, file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(file_path)
+
+
+def test_walk_order_and_depth(tmp_path):
+    make_tree(tmp_path / "one", ["b.jpg", "a.jpg", "sub/c.jpg", "sub/deeper/d.jpg", "other/e.jpg"])
+    make_tree(tmp_path / "two", ["f.jpg", "sub/g.jpg"])
+    roots = [SourceRoot(str(tmp_path / "two"), 0), SourceRoot(str(tmp_path / "one"), 1)]
+
+    # Small batches and many workers, the order must not depend on which folder is listed first
+    for n_workers in (1, 8):
+        walked = []
+        assert walk_sources(roots, walked.extend, n_workers=n_workers, batch_size=1)
+        assert walked == [str(tmp_path / path) for path in
+                          ["two/f.jpg", "one/a.jpg", "one/b.jpg", "one/other/e.jpg", "one/sub/c.jpg"]]
+
+    walked = []
+    assert walk_sources([SourceRoot(str(tmp_path / "one"))], walked.extend,
+                        excluded_folders={str(tmp_path / "one" / "other")})
+    assert walked == [str(tmp_path / path) for path in
+                      ["one/a.jpg", "one/b.jpg", "one/sub/c.jpg", "one/sub/deeper/d.jpg"]]
+    assert not walk_sources([SourceRoot(str(tmp_path / "one"))], walked.extend, cancelled=lambda: True)
+
+
+def test_several_sources_with_filter_and_session(tmp_path):
+    make_tree(tmp_path / "one", ["a.jpg", "a.png", "sub/b.jpg"])
+    make_tree(tmp_path / "two", ["c.jpg", "sub/d.png"])
+    roots = [SourceRoot(str(tmp_path / "one")), SourceRoot(str(tmp_path / "two"))]
+    session_store = SessionStore(str(tmp_path / "session.sqlite"))
+
+    manager = FileMovingManager(".*/sub/.*", session_store=session_store)
+    manager.set_current_sources(roots)
+    manager.wait_for_listing()
+    assert manager.get_all_files_in_current_source() == [str(tmp_path / "one/sub/b.jpg"),
+                                                         str(tmp_path / "two/sub/d.png")]
+    assert manager.get_listed_folders() == sorted(str(tmp_path / path) for path in
+                                                  ["one", "one/sub", "two", "two/sub"])
+    manager.add_assignment(str(tmp_path / "two/sub/d.png"), "/somewhere")
+
+    # Assignments are restored in every listed folder
+    restored = FileMovingManager(session_store=session_store)
+    restored.set_current_sources(roots)
+    restored.wait_for_listing()
+    assert restored.get_n_of_source_files() == 5
+    assert restored.get_assignment(str(tmp_path / "two/sub/d.png")) == "/somewhere"
+    session_store.close()
@@ -0,0 +1,39 @@
+import os
+import time
+
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QColor, QImage
+
+from src.core.preview_cache import CachedPreview
+from src.core.thumbnail_cache import ThumbnailCache, is_own_thumbnail
+
+
+def make_preview(color) -> CachedPreview:
+    image = QImage(QSize(200, 100), QImage.Format.Format_RGB32)
+    image.fill(color)
+    return CachedPreview(image, QSize(2000, 1000))
+
+
+def test_only_own_thumbnails_are_evicted(tmp_path):
+    folder_path = tmp_path / "thumbnails"
+    (folder_path / "large").mkdir(parents=True)
+    foreign_path = folder_path / "large" / "0123456789abcdef0123456789abcdef.png"
+    foreign_image = QImage(QSize(256, 256), QImage.Format.Format_RGB32)
+    foreign_image.fill(QColor(0, 255, 0))
+    foreign_image.setText("Software", "another-viewer")
+    foreign_image.save(str(foreign_path), "PNG")
+    os.utime(foreign_path, (0, 0))
+
+    thumbnail_cache = ThumbnailCache(str(folder_path), max_size_in_bytes=0)
+    while not thumbnail_cache._scanned:
+        time.sleep(0.01)
+    for index in range(3):
+        (tmp_path / f"{index}.jpg").write_text(str(index))
+        thumbnail_cache.save(str(tmp_path / f"{index}.jpg"), make_preview(QColor(255, 0, 0)))
+    assert not os.path.exists(thumbnail_cache.get_thumbnail_path(str(tmp_path / "0.jpg"), "large"))
+    assert foreign_path.exists() and not is_own_thumbnail(str(foreign_path))
+    assert thumbnail_cache.get_size_in_bytes() == 0
+
+    thumbnail_cache = ThumbnailCache(str(folder_path), max_size_in_bytes=1024 * 1024)
+    thumbnail_cache.save(str(tmp_path / "0.jpg"), make_preview(QColor(255, 0, 0)))
+    assert is_own_thumbnail(thumbnail_cache.get_thumbnail_path(str(tmp_path / "0.jpg"), "large"))
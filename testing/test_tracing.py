@@ -0,0 +1,89 @@
+import json
+import threading
+
+from src.core import tracing
+from src.core.tracing import Tracer
+
+
+def test_spans_are_recorded_only_while_enabled():
+    tracing.disable_tracing()
+    with tracing.span("ignored"):
+        pass
+    assert tracing.get_tracer() is None
+
+    tracer = tracing.enable_tracing()
+    try:
+        with tracing.span("outer", "test", {"n": 1}):
+            with tracing.span("inner", "test"):
+                pass
+        thread = threading.Thread(target=lambda: tracing.span("worker").__enter__().__exit__(None, None, None),
+                                  name="worker-thread")
+        thread.start()
+        thread.join()
+    finally:
+        assert tracing.disable_tracing() is tracer
+
+    names = [event[0] for event in tracer.get_events()]
+    assert names == ["inner", "outer", "worker"]
+    inner, outer, worker = tracer.get_events()
+    assert outer[2] <= inner[2] <= inner[3] <= outer[3]
+    assert worker[4] != outer[4]
+
+
+def test_chrome_trace(tmp_path):
+    tracer = Tracer()
+    tracer.add_event("decode", "preview", tracer._start_ns + 2000, tracer._start_ns + 5000, {"file": "a.jpg"})
+    file_path = tmp_path / "trace.json"
+    tracer.export_chrome_trace(str(file_path))
+    with open(file_path) as trace_file:
+        trace = json.load(trace_file)
+
+    metadata = [event for event in trace["traceEvents"] if event["ph"] == "M"]
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert metadata[0]["name"] == "thread_name" and metadata[0]["tid"] == spans[0]["tid"]
+    assert spans == [{"name": "decode", "cat": "preview", "ph": "X", "ts": 2.0, "dur": 3.0,
+                      "pid": spans[0]["pid"], "tid": spans[0]["tid"], "args": {"file": "a.jpg"}}]
+
+
+def test_frame_percentiles():
+    tracer = Tracer()
+    assert tracer.get_frame_percentiles() == {}
+    tracer.end_frame()
+    assert tracer.get_frame_percentiles() == {}
+    tracer._frame_durations.extend(float(duration) for duration in range(1, 101))
+    percentiles = tracer.get_frame_percentiles()
+    assert percentiles == {"n": 100, "p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0}
+
+
+def test_traced_slot_drops_extra_arguments():
+    calls = []
+
+    def on_clicked(item):
+        calls.append(item)
+
+    traced = tracing.traced_slot(on_clicked, "clicked")
+    traced("item", 0)
+    tracer = tracing.enable_tracing()
+    try:
+        traced("other", 1, 2)
+    finally:
+        tracing.disable_tracing()
+    assert calls == ["item", "other"]
+    assert [event[0] for event in tracer.get_events()] == ["clicked"]
+
+
+def test_timing_overlay_only_disables_its_own_tracing(qt_application):
+    from src.ui.timing_overlay import TimingOverlay
+
+    overlay = TimingOverlay()
+    overlay.set_enabled(True)
+    overlay.set_enabled(False)
+    assert tracing.get_tracer() is None
+
+    tracer = tracing.enable_tracing()
+    try:
+        overlay.set_enabled(True)
+        overlay.set_enabled(False)
+        assert tracing.get_tracer() is tracer
+    finally:
+        tracing.disable_tracing()